@@ -0,0 +1,997 @@
+"""
+Frozen copies of replaced extraction code, kept so the benchmarks can compare
+against them: Amazon's BeautifulSoup parser (now scraper/extraction.py),
+Reliance Digital's per-field Playwright calls (now one page snapshot) and
+Snapdeal's find_element chains (now one page_source parse). Do not "fix"
+these - they are the reference.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+
+from scraper.common_utils import wait_for_selector, wait_until
+from scraper.location_sessions import ensure_location
+from scraper.reliancedigital_scraper import (
+    DEFAULT_TIMEOUT, PLACEHOLDER_IMAGE as RELIANCE_PLACEHOLDER_IMAGE, VALID_PRICE_MAX, VALID_PRICE_MIN,
+    clean_price_text as reliance_clean_price_text, make_empty_details as reliance_empty_details,
+    safe_wait_for_function, safe_wait_for_selector,
+)
+from scraper.snapdeal_scraper import (
+    PLACEHOLDER_IMAGE as SNAPDEAL_PLACEHOLDER_IMAGE, clean_price_text as snapdeal_clean_price_text,
+    enter_pincode_snapdeal, parse_delivery_info as snapdeal_parse_delivery_info,
+)
+from scraper.structured_data import apply_fast_path
+
+
+# ---------- Amazon (BeautifulSoup, html.parser) ----------
+PLACEHOLDER_IMAGE = "https://placehold.co/300x400/EEE/31343C?text=No+Image"
+
+def clean_price_text(price_text: str) -> int:
+    if not price_text:
+        return 0
+    m = re.search(r'[\d,]+', str(price_text).replace('₹','').replace('Rs',''))
+    if m:
+        return int(m.group(0).replace(',', ''))
+    return 0
+
+
+def amazon_search_bs4(html: str):
+    soup = BeautifulSoup(html, "html.parser")
+
+    results = []
+    for div in soup.select("div[data-component-type='s-search-result']"):
+        try:
+            link = div.select_one("a.a-link-normal.s-no-outline")
+            if not link:
+                continue
+            href = link.get("href")
+            product_url = "https://www.amazon.in" + href
+            price_el = div.select_one("span.a-price-whole")
+            price = clean_price_text(price_el.text if price_el else "")
+            img = div.select_one("img.s-image")
+            image_url = img.get("src") if img else PLACEHOLDER_IMAGE
+            if price > 0:
+                results.append({"price": price, "url": product_url, "image": image_url})
+        except Exception:
+            continue
+    return results
+
+
+def amazon_product_bs4(html: str, product_url: str):
+    soup = BeautifulSoup(html, "html.parser")
+
+    details = {
+        "url": product_url,
+        "title": "",
+        "price": 0,
+        "original_price": 0,
+        "discount": "",
+        "rating": 0.0,
+        "review_count": 0,
+        "image": PLACEHOLDER_IMAGE,
+        "images": [],
+        "delivery_date": "",
+        "delivery_info": "",
+        "availability": "",
+        "brand": "",
+        "description": "",
+        "features": [],
+        "specifications": {},
+        "seller": "",
+        "in_stock": False
+    }
+
+    title_el = soup.select_one("#productTitle")
+    if title_el:
+        details["title"] = title_el.text.strip()
+
+    price_el = soup.select_one("span.a-price.aok-align-center.reinventPricePriceToPayMargin.priceToPay span.a-price-whole")
+    if not price_el:
+        price_el = soup.select_one("span.a-price-whole")
+    if price_el:
+        details["price"] = clean_price_text(price_el.text)
+
+    mrp_el = soup.select_one("span.a-price.a-text-price span.a-offscreen")
+    if mrp_el:
+        details["original_price"] = clean_price_text(mrp_el.text)
+
+    discount_el = soup.select_one("span.savingsPercentage")
+    if discount_el:
+        details["discount"] = discount_el.text.strip()
+
+    rating_el = soup.select_one("span.a-icon-alt")
+    if rating_el:
+        rating_text = rating_el.text.strip()
+        match = re.search(r'([\d.]+)\s*out of', rating_text)
+        if match:
+            details["rating"] = float(match.group(1))
+
+    review_el = soup.select_one("#acrCustomerReviewText")
+    if review_el:
+        review_text = review_el.text.strip()
+        match = re.search(r'([\d,]+)', review_text)
+        if match:
+            details["review_count"] = int(match.group(1).replace(',', ''))
+
+    img_el = soup.select_one("#landingImage")
+    if not img_el:
+        img_el = soup.select_one("#imgBlkFront")
+    if img_el:
+        details["image"] = img_el.get("src", PLACEHOLDER_IMAGE)
+
+    img_thumbs = soup.select("img.a-dynamic-image")
+    for img in img_thumbs[:6]:
+        img_url = img.get("src", "")
+        if img_url and img_url not in details["images"]:
+            details["images"].append(img_url)
+
+    delivery_el = soup.select_one("#mir-layout-DELIVERY_BLOCK-slot-PRIMARY_DELIVERY_MESSAGE_LARGE b")
+    if not delivery_el:
+        delivery_el = soup.select_one("span[data-csa-c-delivery-time]")
+    if delivery_el:
+        details["delivery_date"] = delivery_el.text.strip()
+
+    delivery_info_el = soup.select_one("#mir-layout-DELIVERY_BLOCK-slot-PRIMARY_DELIVERY_MESSAGE_LARGE")
+    if delivery_info_el:
+        details["delivery_info"] = delivery_info_el.text.strip()
+
+    avail_el = soup.select_one("#availability span")
+    if avail_el:
+        avail_text = avail_el.text.strip()
+        details["availability"] = avail_text
+        details["in_stock"] = "in stock" in avail_text.lower() or "available" in avail_text.lower()
+
+    brand_el = soup.select_one("#bylineInfo")
+    if brand_el:
+        details["brand"] = brand_el.text.strip().replace("Visit the ", "").replace(" Store", "").replace("Brand: ", "")
+
+    desc_el = soup.select_one("#feature-bullets ul")
+    if desc_el:
+        features = []
+        for li in desc_el.select("li"):
+            text = li.text.strip()
+            if text:
+                features.append(text)
+        details["features"] = features
+
+    if not details["features"]:
+        desc_el = soup.select_one("#productDescription p")
+        if desc_el:
+            details["description"] = desc_el.text.strip()
+
+    spec_tables = soup.select("table.a-keyvalue")
+    for table in spec_tables:
+        rows = table.select("tr")
+        for row in rows:
+            cells = row.select("td")
+            if len(cells) == 2:
+                key = cells[0].text.strip()
+                value = cells[1].text.strip()
+                if key and value:
+                    details["specifications"][key] = value
+
+    seller_el = soup.select_one("#sellerProfileTriggerId")
+    if seller_el:
+        details["seller"] = seller_el.text.strip()
+
+    return details
+
+
+# ---------- Reliance Digital (one Playwright call per field) ----------
+def reliance_product_playwright(page, product_url: str, navigate: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Visit the product URL and extract all details into the details dict.
+    Pass navigate=False when the page is already loading product_url.
+    """
+    details = reliance_empty_details(product_url)
+    try:
+        if navigate:
+            try:
+                page.goto(product_url, timeout=DEFAULT_TIMEOUT)
+            except PlaywrightTimeoutError:
+                # proceed even if navigation timed out (partial content may exist)
+                pass
+            except Exception:
+                pass
+
+        # Wait for the SPA to hydrate far enough to render a title and a price
+        safe_wait_for_selector(page, "h1", timeout=8000)
+        safe_wait_for_function(page, "() => !!document.body && document.body.innerText.includes('₹')", timeout=4000)
+
+        # Structured data (JSON-LD / app state) first; the DOM fallbacks below only fill gaps
+        try:
+            html = page.content()
+        except Exception:
+            html = ""
+        # No location flow on Reliance product pages, so the pincode does not gate this
+        if apply_fast_path("reliance", details, html, fill_partial=True):
+            return details
+
+        # Title fallback
+        if not details["title"]:
+            title_selectors = [
+                "h1.pdp__title",
+                "h1[class*='title']",
+                "h1.product-title",
+                ".pdp__product-name",
+                "h1",
+                ".product-name"
+            ]
+            for sel in title_selectors:
+                try:
+                    el = page.query_selector(sel)
+                    if el:
+                        txt = el.inner_text().strip()
+                        if txt:
+                            details["title"] = txt
+                            break
+                except Exception:
+                    continue
+
+        # Brand fallback
+        if not details["brand"]:
+            brand_selectors = [
+                ".pdp__brand",
+                "[class*='brand']",
+                ".product-brand",
+                "meta[itemprop='brand']"
+            ]
+            for sel in brand_selectors:
+                try:
+                    el = page.query_selector(sel)
+                    if el:
+                        if sel.startswith("meta"):
+                            v = el.get_attribute("content") or ""
+                        else:
+                            v = el.inner_text().strip()
+                        if v and len(v) < 100:
+                            details["brand"] = v
+                            break
+                except Exception:
+                    continue
+
+        # Price extraction (smart)
+        if not details["price"]:
+            price_candidates: List[int] = []
+            try:
+                js_collect = r"""
+                () => {
+                    const out = [];
+                    const nodes = Array.from(document.querySelectorAll('span, div, p, strong'));
+                    for (const n of nodes) {
+                        try {
+                            const txt = n.innerText || '';
+                            if (!txt || txt.indexOf('₹') === -1) continue;
+                            if (txt.length > 120) continue;
+                            out.push(txt.trim());
+                        } catch(e){}
+                    }
+                    return out.slice(0, 80);
+                }
+                """
+                price_texts = []
+                try:
+                    price_texts = page.evaluate(js_collect) or []
+                except Exception:
+                    price_texts = []
+
+                for pt in price_texts:
+                    try:
+                        low = pt.lower()
+                        if any(word in low for word in ['emi', '/mo', 'month', 'per month', 'mrp', 'was', 'save', 'exchange']):
+                            continue
+                        val = reliance_clean_price_text(pt)
+                        if VALID_PRICE_MIN < val < VALID_PRICE_MAX:
+                            price_candidates.append(val)
+                    except Exception:
+                        continue
+
+                price_candidates = sorted(set(price_candidates))
+                if price_candidates:
+                    details["price"] = price_candidates[0]
+            except Exception:
+                pass
+
+        # Original price / MRP
+        try:
+            mrp_texts = []
+            try:
+                mrp_texts = page.evaluate(r"""
+                    () => {
+                        const out = [];
+                        const els = Array.from(document.querySelectorAll('*'));
+                        for (const el of els) {
+                            try {
+                                const txt = el.innerText || '';
+                                if (!txt) continue;
+                                if (/(mrp|m.r.p|strikedown|strike)/i.test(txt) || (el.className || '').toString().toLowerCase().includes('old') || (el.className || '').toString().toLowerCase().includes('strike')) {
+                                    if (txt.indexOf('₹') !== -1) out.push(txt.trim());
+                                }
+                            } catch(e){}
+                        }
+                        return out.slice(0,20);
+                    }
+                """)
+            except Exception:
+                mrp_texts = []
+
+            if mrp_texts:
+                for txt in mrp_texts:
+                    try:
+                        v = reliance_clean_price_text(txt)
+                        if v and v > details.get("price", 0):
+                            details["original_price"] = v
+                            break
+                    except Exception:
+                        continue
+        except Exception:
+            pass
+
+        # Discount detection via JS
+        try:
+            disc_txts = []
+            try:
+                disc_txts = page.evaluate(r"""
+                    () => {
+                        const out = [];
+                        const nodes = Array.from(document.querySelectorAll('span, div, p, strong'));
+                        for (const n of nodes) {
+                            try {
+                                const t = (n.innerText || '').trim();
+                                if (!t) continue;
+                                if (/%\s*off/i.test(t) || /\bSave\b/i.test(t) || /\bsave\b/.test(t)) {
+                                    if (t.length < 120) out.push(t);
+                                }
+                            } catch(e){}
+                        }
+                        return out.slice(0, 20);
+                    }
+                """)
+            except Exception:
+                disc_txts = []
+
+            if disc_txts:
+                details["discount"] = disc_txts[0]
+        except Exception:
+            pass
+
+        # Images (gallery)
+        try:
+            imgs = []
+            try:
+                imgs = page.evaluate(r"""
+                    () => {
+                        const out = [];
+                        const gallery = Array.from(document.querySelectorAll('img'));
+                        for (const img of gallery) {
+                            try {
+                                const src = img.src || img.getAttribute('data-src') || img.getAttribute('data-lazy-src') || img.getAttribute('data-srcset') || '';
+                                if (!src) continue;
+                                if (/thumb|icon|logo|50x50|100x100/i.test(src)) continue;
+                                out.push(src.startsWith('//') ? window.location.protocol + src : src);
+                            } catch(e){}
+                        }
+                        return Array.from(new Set(out)).slice(0, 20);
+                    }
+                """)
+            except Exception:
+                imgs = []
+
+            if imgs:
+                details["images"] = imgs
+                if not details.get("image") or details["image"] == RELIANCE_PLACEHOLDER_IMAGE:
+                    details["image"] = imgs[0]
+        except Exception:
+            pass
+
+        # Rating & Reviews
+        try:
+            rating_txts = []
+            try:
+                rating_txts = page.evaluate(r"""
+                    () => {
+                        const out = [];
+                        const nodes = Array.from(document.querySelectorAll('*'));
+                        for (const n of nodes) {
+                            try {
+                                const t = (n.innerText || '').trim();
+                                if (!t) continue;
+                                if (/\d+(\.\d+)?\s*\/\s*5/.test(t) || /\d+(\.\d+)?\s*out of\s*5/i.test(t) || (/rating/i.test(t) && /[0-5](\.\d)?/.test(t))) {
+                                    out.push(t);
+                                }
+                            } catch(e){}
+                        }
+                        return out.slice(0, 20);
+                    }
+                """)
+            except Exception:
+                rating_txts = []
+
+            if rating_txts:
+                for rt in rating_txts:
+                    try:
+                        m = re.search(r'(\d+(?:\.\d+)?)', rt)
+                        if m:
+                            val = float(m.group(1))
+                            if 0 < val <= 5:
+                                details["rating"] = val
+                                break
+                    except Exception:
+                        continue
+
+            review_texts = []
+            try:
+                review_texts = page.evaluate(r"""
+                    () => {
+                        const out = [];
+                        const nodes = Array.from(document.querySelectorAll('*'));
+                        for (const n of nodes) {
+                            try {
+                                const t = (n.innerText || '').trim();
+                                if (!t) continue;
+                                if (/\d+\s+(?:reviews|review|ratings|rating)/i.test(t)) out.push(t);
+                            } catch(e){}
+                        }
+                        return out.slice(0, 20);
+                    }
+                """)
+            except Exception:
+                review_texts = []
+
+            if review_texts:
+                for rt in review_texts:
+                    try:
+                        m = re.search(r'(\d+)\s*(?:reviews|review|ratings|rating)', rt, re.I)
+                        if m:
+                            details["review_count"] = int(m.group(1))
+                            break
+                    except Exception:
+                        continue
+        except Exception:
+            pass
+
+        # Stock status
+        try:
+            body_text = ""
+            try:
+                body_text = page.inner_text("body") or ""
+            except Exception:
+                body_text = ""
+
+            if any(x in body_text.lower() for x in ["out of stock", "sold out", "currently unavailable", "not available"]):
+                details["in_stock"] = False
+                details["availability"] = "Out of stock"
+            else:
+                add_cart_selectors = [
+                    "//button[contains(translate(., 'abcdefghijklmnopqrstuvwxyz','ABCDEFGHIJKLMNOPQRSTUVWXYZ'), 'ADD TO CART')]",
+                    "//button[contains(translate(., 'abcdefghijklmnopqrstuvwxyz','ABCDEFGHIJKLMNOPQRSTUVWXYZ'), 'BUY NOW')]",
+                    "button[class*='add-to-cart'], button[class*='buy-now'], button[id*='add'], button[id*='buy']"
+                ]
+                found = False
+                for sel in add_cart_selectors:
+                    try:
+                        if sel.startswith("//"):
+                            els = page.query_selector_all(f"xpath={sel}")
+                            if els and len(els) > 0:
+                                found = True
+                                break
+                        else:
+                            els = page.query_selector_all(sel)
+                            if els and len(els) > 0:
+                                found = True
+                                break
+                    except Exception:
+                        continue
+                details["in_stock"] = found
+                details["availability"] = "In stock" if found else details["availability"]
+        except Exception:
+            pass
+
+        # Delivery info
+        try:
+            delivery_txts = []
+            try:
+                delivery_txts = page.evaluate(r"""
+                    () => {
+                        const out = [];
+                        const nodes = Array.from(document.querySelectorAll('*'));
+                        for (const n of nodes) {
+                            try {
+                                const t = (n.innerText || '').trim();
+                                if (!t) continue;
+                                if (/delivery|delivered by|get it by|arrive|dispatch/i.test(t) && t.length < 250) out.push(t);
+                            } catch(e){}
+                        }
+                        return out.slice(0, 20);
+                    }
+                """)
+            except Exception:
+                delivery_txts = []
+
+            if delivery_txts:
+                details["delivery_info"] = delivery_txts[0]
+                try:
+                    m = re.search(r'\b\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\b.*\d{4}?', delivery_txts[0], re.I)
+                    if m:
+                        details["delivery_date"] = m.group(0)
+                except Exception:
+                    pass
+        except Exception:
+            pass
+
+        # EMI availability
+        try:
+            emi_text = ""
+            try:
+                emi_text = page.inner_text("body") or ""
+            except Exception:
+                emi_text = ""
+            details["emi_available"] = 'emi' in emi_text.lower() or 'easy emi' in emi_text.lower()
+        except Exception:
+            pass
+
+        # Warranty
+        try:
+            warranty_txts = []
+            try:
+                warranty_txts = page.evaluate(r"""
+                    () => {
+                        const out = [];
+                        const nodes = Array.from(document.querySelectorAll('*'));
+                        for (const n of nodes) {
+                            try {
+                                const t = (n.innerText || '').trim();
+                                if (!t) continue;
+                                if (/warranty/i.test(t) && t.length < 200) out.push(t);
+                            } catch(e){}
+                        }
+                        return out.slice(0, 20);
+                    }
+                """)
+            except Exception:
+                warranty_txts = []
+
+            if warranty_txts:
+                details["warranty"] = warranty_txts[0]
+        except Exception:
+            pass
+
+        # Description fallback
+        if not details["description"]:
+            try:
+                desc_candidates = []
+                try:
+                    desc_candidates = page.query_selector_all("div[class*='description'], div[class*='product-desc'], #product-description, .productDetails, .pdp-description")
+                except Exception:
+                    desc_candidates = []
+                for d in desc_candidates:
+                    try:
+                        txt = d.inner_text().strip()
+                        if txt and len(txt) > 40:
+                            details["description"] = txt
+                            break
+                    except Exception:
+                        continue
+            except Exception:
+                pass
+
+        # Features
+        try:
+            features = []
+            try:
+                feat_nodes = page.query_selector_all("ul[class*='features'] li, .highlights li, .feature-list li, .product-highlights li")
+            except Exception:
+                feat_nodes = []
+            for f in feat_nodes[:20]:
+                try:
+                    txt = f.inner_text().strip()
+                    if txt and len(txt) > 4:
+                        features.append(txt)
+                except Exception:
+                    continue
+            if features:
+                details["features"] = features
+        except Exception:
+            pass
+
+        # Specifications
+        try:
+            spec: Dict[str, str] = {}
+            try:
+                trs = page.query_selector_all("table.specs tr, table[class*='spec'] tr, .specification tr")
+            except Exception:
+                trs = []
+            for tr in trs[:40]:
+                try:
+                    tds = tr.query_selector_all("td, th")
+                    if len(tds) >= 2:
+                        k = tds[0].inner_text().strip()
+                        v = tds[1].inner_text().strip()
+                        if k and v:
+                            spec[k] = v
+                except Exception:
+                    continue
+
+            if not spec:
+                try:
+                    items = page.query_selector_all(".specification li, .specs li, .product-specs li")
+                except Exception:
+                    items = []
+                for it in items[:60]:
+                    try:
+                        txt = it.inner_text().strip()
+                        if ':' in txt:
+                            k, v = txt.split(':', 1)
+                            spec[k.strip()] = v.strip()
+                    except Exception:
+                        continue
+
+            if spec:
+                details["specifications"] = spec
+        except Exception:
+            pass
+
+        # Final adjustments
+        details["url"] = product_url
+        return details
+
+    except Exception:
+        # Return None on a page-level failure
+        return None
+
+
+# ---------- Snapdeal (find_element chains, one WebDriver round trip per lookup) ----------
+def snapdeal_delivery_webdriver(driver, pincode_entered=False):
+    # Delivery estimates are rendered after the serviceability check returns
+    wait_until(
+        lambda: re.search(r'deliver|get it by', driver.find_element(By.TAG_NAME, "body").text, re.IGNORECASE),
+        timeout=3
+    )
+    return snapdeal_parse_delivery_info(driver.find_element(By.TAG_NAME, "body").text, pincode_entered)
+
+
+def snapdeal_product_webdriver(driver, product_url: str, pincode: str = None, navigate: bool = False):
+    """Fetch comprehensive product details from Snapdeal product page.
+
+    Pass navigate=False when the page is already loading in the current tab.
+    """
+    try:
+        if navigate:
+            driver.get(product_url)
+        if not wait_for_selector(driver, "h1", timeout=15):
+            raise TimeoutException("Product page did not render a title")
+        
+        details = {
+            "url": product_url,
+            "title": "",
+            "price": 0,
+            "original_price": 0,
+            "discount": "",
+            "rating": 0.0,
+            "review_count": 0,
+            "image": SNAPDEAL_PLACEHOLDER_IMAGE,
+            "images": [],
+            "delivery_date": "",
+            "delivery_info": "",
+            "availability": "",
+            "brand": "",
+            "description": "",
+            "features": [],
+            "specifications": {},
+            "seller": "",
+            "in_stock": False,
+            "highlights": [],
+            "offers": []
+        }
+
+        # JSON-LD / embedded state is enough when no location flow is needed
+        if apply_fast_path("snapdeal", details, driver.page_source, pincode):
+            return details
+        
+        # Enter pincode if provided
+        pincode_entered = False
+        if pincode:
+            pincode_entered = ensure_location(driver, "snapdeal", pincode,
+                                              lambda: enter_pincode_snapdeal(driver, pincode))
+        
+        # ==================== TITLE ====================
+        title_selectors = [
+            "h1.pdp-e-i-head",
+            "h1[itemprop='name']",
+            "h1.product-title",
+            "h1.pdpTitle",
+            "h1"
+        ]
+        for selector in title_selectors:
+            try:
+                elem = driver.find_element(By.CSS_SELECTOR, selector)
+                title = elem.text.strip()
+                if title and len(title) > 10:
+                    details['title'] = title
+                    break
+            except:
+                continue
+        
+        # ==================== IMAGES ====================
+        try:
+            # Main image
+            image_selectors = [
+                "img.cloudzoom",
+                "img[itemprop='image']",
+                "img.product-image",
+                "img.pdpCarouselImg"
+            ]
+            for selector in image_selectors:
+                try:
+                    img = driver.find_element(By.CSS_SELECTOR, selector)
+                    src = img.get_attribute('src')
+                    if src:
+                        details['image'] = src
+                        break
+                except:
+                    continue
+            
+            # Additional images
+            img_elements = driver.find_elements(By.CSS_SELECTOR, 
+                "img.pdpCarouselImg, div.bx-viewport img, ul.bx-list img")
+            collected = []
+            for img in img_elements:
+                src = img.get_attribute('src') or img.get_attribute('data-src') or ""
+                if src and src.startswith('http') and src not in collected:
+                    collected.append(src)
+                if len(collected) >= 8:
+                    break
+            
+            if collected:
+                details['images'] = collected
+                if not details['image'] or details['image'] == SNAPDEAL_PLACEHOLDER_IMAGE:
+                    details['image'] = collected[0]
+        except:
+            pass
+        
+        # ==================== PRICE ====================
+        price_selectors = [
+            "span.pdp-final-price",
+            "span.payBlkBig",
+            "span[itemprop='price']",
+            "span.lfloat.product-price",
+            "span.selling-price"
+        ]
+        for selector in price_selectors:
+            try:
+                elem = driver.find_element(By.CSS_SELECTOR, selector)
+                price_text = elem.text.strip()
+                price = snapdeal_clean_price_text(price_text)
+                if price > 0:
+                    details['price'] = price
+                    break
+            except:
+                continue
+        
+        # ==================== ORIGINAL PRICE ====================
+        mrp_selectors = [
+            "span.pdp-mrp",
+            "span.lfloat.markedPrice",
+            "span.strikedPriceText",
+            "span.list-price"
+        ]
+        for selector in mrp_selectors:
+            try:
+                elem = driver.find_element(By.CSS_SELECTOR, selector)
+                mrp_text = elem.text.strip()
+                original = snapdeal_clean_price_text(mrp_text)
+                if original > details['price']:
+                    details['original_price'] = original
+                    break
+            except:
+                continue
+        
+        # ==================== DISCOUNT ====================
+        discount_selectors = [
+            "span.percent-desc",
+            "div.percent-desc",
+            "span.pdp-discount",
+            "div.discount-badge"
+        ]
+        for selector in discount_selectors:
+            try:
+                elem = driver.find_element(By.CSS_SELECTOR, selector)
+                discount = elem.text.strip()
+                if discount and '%' in discount:
+                    details['discount'] = discount
+                    break
+            except:
+                continue
+        
+        # ==================== RATING ====================
+        rating_selectors = [
+            "span[itemprop='ratingValue']",
+            "span.avrg-rating",
+            "div.rating-value",
+            "span.filled-stars"
+        ]
+        for selector in rating_selectors:
+            try:
+                elem = driver.find_element(By.CSS_SELECTOR, selector)
+                rating_text = elem.text.strip()
+                match = re.search(r'(\d+\.?\d*)', rating_text)
+                if match:
+                    rating_val = float(match.group(1))
+                    if 0 <= rating_val <= 5:
+                        details['rating'] = rating_val
+                        break
+            except:
+                continue
+        
+        # ==================== REVIEW COUNT ====================
+        review_selectors = [
+            "span[itemprop='ratingCount']",
+            "span.total-rating",
+            "span.review-count",
+            "p.rating-count"
+        ]
+        for selector in review_selectors:
+            try:
+                elem = driver.find_element(By.CSS_SELECTOR, selector)
+                review_text = elem.text.strip()
+                match = re.search(r'(\d+)', review_text.replace(',', ''))
+                if match:
+                    details['review_count'] = int(match.group(1))
+                    break
+            except:
+                continue
+        
+        # ==================== DELIVERY INFO ====================
+        delivery_info = snapdeal_delivery_webdriver(driver, pincode_entered)
+        if delivery_info['delivery_date']:
+            details['delivery_date'] = delivery_info['delivery_date']
+            details['delivery_info'] = delivery_info['delivery_text']
+        else:
+            details['delivery_date'] = "Check on website"
+            details['delivery_info'] = "Enter pincode on website for delivery details"
+        
+        # ==================== STOCK STATUS ====================
+        try:
+            add_to_cart = driver.find_element(By.CSS_SELECTOR, 
+                "div#add-cart-button-id, button.buy-button, div.cart-button")
+            details['in_stock'] = add_to_cart.is_displayed() and add_to_cart.is_enabled()
+            details['availability'] = "In stock" if details['in_stock'] else "Out of stock"
+        except:
+            # Check for out of stock indicators
+            try:
+                oos = driver.find_elements(By.XPATH, 
+                    "//*[contains(text(), 'Out of Stock') or contains(text(), 'Sold Out')]")
+                details['in_stock'] = len(oos) == 0
+                details['availability'] = "In stock" if details['in_stock'] else "Out of stock"
+            except:
+                details['in_stock'] = False
+                details['availability'] = "Check website"
+        
+        # ==================== SELLER ====================
+        seller_selectors = [
+            "div.seller-name",
+            "a.seller-link",
+            "span[itemprop='seller']",
+            "div.sold-by"
+        ]
+        for selector in seller_selectors:
+            try:
+                elem = driver.find_element(By.CSS_SELECTOR, selector)
+                seller = elem.text.strip()
+                if seller and len(seller) < 100:
+                    details['seller'] = seller
+                    break
+            except:
+                continue
+        
+        # ==================== BRAND ====================
+        try:
+            brand_patterns = [
+                "//tr//td[contains(text(),'Brand')]/following-sibling::td",
+                "//div[contains(@class, 'spec')]//td[contains(text(),'Brand')]/following-sibling::td",
+                "//span[@itemprop='brand']",
+            ]
+            for xpath in brand_patterns:
+                try:
+                    elem = driver.find_element(By.XPATH, xpath)
+                    brand = elem.text.strip()
+                    if brand and len(brand) < 50:
+                        details['brand'] = brand
+                        break
+                except:
+                    continue
+        except:
+            pass
+        
+        # ==================== HIGHLIGHTS/FEATURES ====================
+        try:
+            highlight_elements = driver.find_elements(By.XPATH, 
+                "//div[contains(@class, 'key-features')]//li | " +
+                "//div[contains(@class, 'highlights')]//li | " +
+                "//ul[contains(@class, 'features')]//li"
+            )
+            
+            highlights = []
+            for elem in highlight_elements[:10]:
+                text = elem.text.strip()
+                if text and len(text) > 5 and len(text) < 300:
+                    highlights.append(text)
+            
+            if highlights:
+                details['highlights'] = highlights
+                details['features'] = highlights
+        except:
+            pass
+        
+        # ==================== SPECIFICATIONS ====================
+        try:
+            spec_dict = {}
+            spec_rows = driver.find_elements(By.XPATH, 
+                "//table[contains(@class, 'spec')]//tr | " +
+                "//div[contains(@class, 'specification')]//tr"
+            )
+            
+            for row in spec_rows[:20]:
+                try:
+                    cells = row.find_elements(By.TAG_NAME, "td")
+                    if len(cells) >= 2:
+                        key = cells[0].text.strip()
+                        val = cells[1].text.strip()
+                        if key and val:
+                            spec_dict[key] = val
+                except:
+                    continue
+            
+            if spec_dict:
+                details['specifications'] = spec_dict
+        except:
+            pass
+        
+        # ==================== DESCRIPTION ====================
+        try:
+            desc_selectors = [
+                "div.product-desc-content",
+                "div[itemprop='description']",
+                "div.description-text",
+                "div.product-description p"
+            ]
+            
+            for selector in desc_selectors:
+                try:
+                    elem = driver.find_element(By.CSS_SELECTOR, selector)
+                    desc = elem.text.strip()
+                    if desc and len(desc) > 50:
+                        details['description'] = desc
+                        break
+                except:
+                    continue
+        except:
+            pass
+        
+        # ==================== OFFERS ====================
+        try:
+            offer_elements = driver.find_elements(By.XPATH, 
+                "//div[contains(@class, 'offer')]//li | " +
+                "//div[contains(@class, 'bank-offer')]"
+            )
+            
+            offers = []
+            for elem in offer_elements[:5]:
+                text = elem.text.strip()
+                if text and len(text) > 10 and len(text) < 200:
+                    offers.append(text)
+            
+            if offers:
+                details['offers'] = offers
+        except:
+            pass
+        
+        return details
+        
+    except Exception as e:
+        print(f"   ❌ Error fetching details: {e}")
+        return None
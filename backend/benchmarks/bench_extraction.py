@@ -0,0 +1,249 @@
+"""
+Extraction benchmark over saved pages in benchmarks/fixtures/<site>/*.html.
+
+Compares the compiled lxml specs in scraper/extraction.py with:
+    - the previous BeautifulSoup parser for Amazon (frozen in baselines.py),
+    - the scrapers' own WebDriver extraction for Flipkart / Snapdeal (page_source
+      + lxml) and, for Snapdeal, the frozen find_element chains it replaced (only
+      with --webdriver: loads each fixture into a pooled Chrome via file://).
+    - for Reliance Digital, the one-round-trip page snapshot against the frozen
+      per-field Playwright extraction (only with --playwright: loads each fixture
+      into a pooled Chromium context via file://).
+
+The parity column shows the fields whose values differ; --check turns any
+difference into exit status 1:
+
+    python -m benchmarks.bench_extraction --site reliance --playwright --check
+    python -m benchmarks.bench_extraction --site snapdeal --webdriver --check
+
+--fields prints where the lxml extraction of each product page spends its time,
+field by field.
+
+The bundled fixtures are synthetic pages that mirror the markup the selectors
+target. Capture real pages for representative numbers:
+
+    python -m benchmarks.bench_extraction --capture amazon product_tv "https://www.amazon.in/dp/..."
+
+Run from backend/:
+
+    python -m benchmarks.bench_extraction [--iterations 50] [--webdriver] [--fields]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks import baselines
+from scraper.amazon_scraper import AmazonSearchRunnable
+from scraper.extraction import AMAZON_PRODUCT, FLIPKART_PRODUCT, SNAPDEAL_PRODUCT, timing_report
+from scraper.flipkart_scraper import parse_product_details as parse_flipkart_product
+from scraper.snapdeal_scraper import parse_product_details as parse_snapdeal_product
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def time_call(fn: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+    """Run fn repeatedly; returns median/min in milliseconds and the last result."""
+    samples = []
+    result = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples), "result": result}
+
+
+def diff_fields(new: Any, old: Any) -> List[str]:
+    """Names of top-level fields whose values differ between two results."""
+    if isinstance(new, list) and isinstance(old, list):
+        if len(new) != len(old):
+            return [f"items ({len(new)} vs {len(old)})"]
+        return sorted({f for a, b in zip(new, old) for f in diff_fields(a, b)})
+    if isinstance(new, dict) and isinstance(old, dict):
+        return [k for k in sorted(set(new) | set(old)) if new.get(k) != old.get(k)]
+    return [] if new == old else ["value"]
+
+
+def webdriver_extract(site: str, path: Path) -> Dict[str, Dict[str, Any]]:
+    """Time the scraper's own WebDriver extraction on a fixture, excluding navigation and readiness waits.
+
+    For Snapdeal the frozen find_element chains are timed too, on the same driver.
+    """
+    from scraper.driver_pool import lease_driver
+    from scraper.scrape_context import ScrapeContext, use_context
+
+    url = path.resolve().as_uri()
+    if site == "flipkart":
+        from scraper.flipkart_scraper import get_product_details
+        methods = {"webdriver page_source": lambda driver: get_product_details(driver, url, navigate=False)}
+    else:
+        from scraper.snapdeal_scraper import get_snapdeal_product_details
+        methods = {
+            "webdriver page_source": lambda driver: get_snapdeal_product_details(driver, url, navigate=False),
+            "webdriver find_element": lambda driver: baselines.snapdeal_product_webdriver(driver, url),
+        }
+
+    timings = {}
+    with lease_driver(site, headless=True) as driver:
+        for method, extract in methods.items():
+            driver.get(url)
+            ctx = ScrapeContext(site)
+            with use_context(ctx):
+                start = time.perf_counter()
+                result = extract(driver)
+                elapsed = time.perf_counter() - start - ctx.metrics["idle_seconds"]
+            timings[method] = {"median_ms": elapsed * 1000, "min_ms": elapsed * 1000, "result": result}
+    return timings
+
+
+def playwright_extract(path: Path, iterations: int) -> Dict[str, Dict[str, Any]]:
+    """Time Reliance's one-snapshot extraction against the frozen per-field one, excluding navigation."""
+    from scraper.playwright_pool import run_in_context
+    from scraper.reliancedigital_scraper import CONTEXT_OPTIONS, get_product_details
+
+    url = path.resolve().as_uri()
+    methods = {
+        "playwright snapshot": lambda page: get_product_details(page, url, navigate=False),
+        "playwright per-field": lambda page: baselines.reliance_product_playwright(page, url),
+    }
+
+    def run(context):
+        page = context.new_page()
+        timings = {}
+        try:
+            for method, extract in methods.items():
+                samples, result = [], None
+                for _ in range(iterations):
+                    page.goto(url)
+                    start = time.perf_counter()
+                    result = extract(page)
+                    samples.append((time.perf_counter() - start) * 1000)
+                timings[method] = {"median_ms": statistics.median(samples), "min_ms": min(samples), "result": result}
+        finally:
+            page.close()
+        return timings
+
+    return run_in_context(run, context_options=CONTEXT_OPTIONS, site="reliance")
+
+
+def bench_fixture(site: str, path: Path, iterations: int, use_webdriver: bool,
+                  use_playwright: bool = False) -> List[Dict[str, Any]]:
+    html = path.read_text(encoding="utf-8")
+    rows = []
+
+    def row(method: str, timing: Dict[str, Any], parity: Optional[List[str]] = None):
+        rows.append({
+            "site": site, "fixture": path.name, "method": method,
+            "median_ms": timing["median_ms"], "min_ms": timing["min_ms"],
+            "parity": parity,
+        })
+
+    if site == "amazon" and path.name.startswith("search"):
+        new = time_call(lambda: AmazonSearchRunnable.parse_search_results(html), iterations)
+        old = time_call(lambda: baselines.amazon_search_bs4(html), iterations)
+        # The bs4 baseline predates listing titles (used by preview offers)
+        listings = [{k: v for k, v in item.items() if k != "title"} for item in new["result"]]
+        row("lxml", new, diff_fields(listings, old["result"]))
+        row("bs4 html.parser", old)
+    elif site == "amazon":
+        url = "https://www.amazon.in/dp/fixture"
+        new = time_call(lambda: AmazonSearchRunnable.parse_product_details(html, url), iterations)
+        old = time_call(lambda: baselines.amazon_product_bs4(html, url), iterations)
+        row("lxml", new, diff_fields(new["result"], old["result"]))
+        row("bs4 html.parser", old)
+    elif site == "reliance":
+        if use_playwright:
+            timings = playwright_extract(path, iterations)
+            new, old = timings["playwright snapshot"], timings["playwright per-field"]
+            row("playwright snapshot", new, diff_fields(new["result"], old["result"]))
+            row("playwright per-field", old)
+    else:
+        parse = parse_flipkart_product if site == "flipkart" else parse_snapdeal_product
+        url = path.resolve().as_uri()
+        new = time_call(lambda: parse(html, url), iterations)
+        if not use_webdriver:
+            row("lxml", new)
+        else:
+            # lxml on the saved file against the scraper on the live DOM, and
+            # for Snapdeal the scraper against its old find_element chains
+            timings = webdriver_extract(site, path)
+            live = timings["webdriver page_source"]
+            row("lxml", new, diff_fields(new["result"], live["result"]))
+            old = timings.get("webdriver find_element")
+            row("webdriver page_source", live, diff_fields(live["result"], old["result"]) if old else None)
+            if old:
+                row("webdriver find_element", old)
+
+    return rows
+
+
+def field_report(site: str, path: Path, iterations: int) -> Optional[str]:
+    """Mean time per step of a product page spec's extraction (parse + each field)."""
+    spec = {"amazon": AMAZON_PRODUCT, "flipkart": FLIPKART_PRODUCT, "snapdeal": SNAPDEAL_PRODUCT}.get(site)
+    if spec is None or path.name.startswith("search"):
+        return None
+    html = path.read_text(encoding="utf-8")
+    timings: Dict[str, float] = {}
+    for _ in range(iterations):
+        spec.extract(html, timings=timings)
+    return timing_report({k: v / iterations for k, v in timings.items()}, f"{site}/{path.name}")
+
+
+def capture(site: str, name: str, url: str):
+    """Save a live page as a fixture using the scrapers' HTTP session."""
+    from scraper.http_client import fetch_html
+
+    html = fetch_html(site, url)
+    if not html:
+        sys.exit(f"Could not fetch {url}")
+    target = FIXTURES_DIR / site / f"{name}.html"
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(html, encoding="utf-8")
+    print(f"Saved {len(html):,} bytes to {target}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=int(os.getenv("BENCH_ITERATIONS", "50")))
+    parser.add_argument("--webdriver", action="store_true", help="also time WebDriver extraction (needs Chrome)")
+    parser.add_argument("--playwright", action="store_true",
+                        help="also run the Reliance fixtures through Playwright (needs Chromium)")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if any parity check differs")
+    parser.add_argument("--fields", action="store_true", help="per-field timing of the product page specs")
+    parser.add_argument("--site", help="only run fixtures for this site")
+    parser.add_argument("--capture", nargs=3, metavar=("SITE", "NAME", "URL"), help="save a live page as a fixture")
+    args = parser.parse_args()
+
+    if args.capture:
+        capture(*args.capture)
+        return
+
+    rows = []
+    reports = []
+    for site_dir in sorted(p for p in FIXTURES_DIR.iterdir() if p.is_dir()):
+        if args.site and site_dir.name != args.site:
+            continue
+        for path in sorted(site_dir.glob("*.html")):
+            rows.extend(bench_fixture(site_dir.name, path, args.iterations, args.webdriver, args.playwright))
+            if args.fields:
+                reports.append(field_report(site_dir.name, path, args.iterations))
+
+    print(f"{'site':<10} {'fixture':<22} {'method':<24} {'median ms':>10} {'min ms':>9}  parity")
+    print("-" * 90)
+    for r in rows:
+        parity = "" if r["parity"] is None else ("identical" if not r["parity"] else "differs: " + ", ".join(r["parity"]))
+        print(f"{r['site']:<10} {r['fixture']:<22} {r['method']:<24} {r['median_ms']:>10.2f} {r['min_ms']:>9.2f}  {parity}")
+
+    for report in filter(None, reports):
+        print()
+        print(report)
+
+    if args.check and any(r["parity"] for r in rows):
+        sys.exit("Parity check failed")
+
+
+if __name__ == "__main__":
+    main()
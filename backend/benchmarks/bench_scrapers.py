@@ -0,0 +1,384 @@
+"""
+End-to-end scraper benchmark over recorded pages, served offline.
+
+Each site gets a local HTTP server that replays the pages listed in
+benchmarks/fixtures/replay/<site>/routes.json:
+
+    {"query": "acme phone 7",
+     "routes": [{"path": "^/search$", "file": "search.html"},
+                {"path": "/p/", "file": "../../flipkart/product_phone.html"}]}
+
+Routes are regexes tried in order against the request path; anything else gets
+an empty 404. The scraper is pointed at its server with SCRAPER_BASE_URL_<SITE>
+(scraper/site_urls.py) and run unchanged, through the real driver / Playwright
+pools and HTTP sessions. Per scraper it reports the median over --iterations
+runs (after --warmup runs, which absorb browser start-up) of:
+
+    wall      total time of the scrape
+    browser   time spent inside WebDriver commands / Playwright sync calls
+    idle      time blocked in readiness waits and pauses (ScrapeContext metrics)
+    scrolls   search page scrolls, and the estimated time adaptive scrolling
+              saved over each scraper's fixed scroll budget (ScrapeContext metrics)
+    trips     DOM round trips: WebDriver commands + Playwright sync calls
+    http      requests made through scraper/http_client.py
+    peak RSS  this process plus its children (chromedriver, Chrome, Playwright)
+
+Browser time includes the commands issued while polling in a wait, so it
+overlaps idle. Save a run with --output and pass it to a later run with
+--compare to get per-metric deltas; runs are comparable when they use the same
+fixtures, --iterations and machine (recorded in the output's "meta").
+
+Run from backend/ (needs Chrome for the Selenium sites, Playwright's Chromium
+for Reliance):
+
+    python -m benchmarks.bench_scrapers [--site croma] [--iterations 5] [--latency-ms 50]
+    python -m benchmarks.bench_scrapers --output before.json
+    python -m benchmarks.bench_scrapers --compare before.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+from scraper import http_client
+from scraper.scrape_context import ScrapeContext, use_context
+
+REPLAY_DIR = Path(__file__).parent / "fixtures" / "replay"
+
+# site -> (module, scraper function), as wired up in price_fetcher.get_scrapers_for_query
+SCRAPERS = {
+    "amazon": ("scraper.amazon_scraper", "scrape_amazon_lowest_price"),
+    "flipkart": ("scraper.flipkart_scraper", "scrape_flipkart"),
+    "snapdeal": ("scraper.snapdeal_scraper", "scrape_snapdeal"),
+    "croma": ("scraper.croma_scraper", "scrape_croma"),
+    "reliance": ("scraper.reliancedigital_scraper", "scrape_reliance_digital_playwright"),
+    "ajio": ("scraper.ajio_scraper", "scrape_ajio"),
+}
+
+METRICS = ("wall_s", "browser_s", "idle_s", "scrolls", "scroll_saved_s", "round_trips", "http_requests",
+           "peak_rss_mb")
+
+
+# ---------- Replay server ----------
+class ReplayServer:
+    """Serves one site's fixtures on 127.0.0.1 (random port) from a background thread."""
+
+    def __init__(self, site: str, latency_ms: float = 0.0):
+        spec = json.loads((REPLAY_DIR / site / "routes.json").read_text(encoding="utf-8"))
+        self.site = site
+        self.query = spec["query"]
+        # Bodies are read once so disk I/O doesn't show up in the timings
+        self.routes: List[Tuple[re.Pattern, bytes]] = [
+            (re.compile(route["path"]), (REPLAY_DIR / site / route["file"]).read_bytes())
+            for route in spec["routes"]
+        ]
+        self.latency = latency_ms / 1000
+        self.hits = {"served": 0, "not_found": 0}
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=f"replay-{site}", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def lookup(self, path: str) -> Optional[bytes]:
+        path = path.split("?", 1)[0]
+        for pattern, body in self.routes:
+            if pattern.search(path):
+                return body
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                body = server.lookup(self.path)
+                if body is None:
+                    server.hits["not_found"] += 1
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                server.hits["served"] += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        os.environ[f"SCRAPER_BASE_URL_{self.site.upper()}"] = self.base_url
+        return self
+
+    def __exit__(self, *exc):
+        os.environ.pop(f"SCRAPER_BASE_URL_{self.site.upper()}", None)
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+# ---------- Instrumentation ----------
+class BrowserCalls:
+    """Counts and times WebDriver commands and Playwright sync-API calls while installed.
+
+    Every Selenium call ends in WebDriver.execute() and every Playwright sync
+    call in SyncBase._sync(), one browser round trip each.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._patched: List[Tuple[Any, str, Any]] = []
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.seconds = 0.0
+
+    def _wrap(self, original):
+        calls = self
+
+        def timed(*args, **kwargs):
+            # Nested calls (e.g. a Playwright call made from a route handler) count once
+            if getattr(calls._local, "depth", 0):
+                return original(*args, **kwargs)
+            calls._local.depth = 1
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                calls._local.depth = 0
+                elapsed = time.perf_counter() - start
+                with calls._lock:
+                    calls.count += 1
+                    calls.seconds += elapsed
+
+        return timed
+
+    def install(self):
+        targets = [("selenium.webdriver.remote.webdriver", "WebDriver", "execute"),
+                   ("playwright._impl._sync_base", "SyncBase", "_sync")]
+        for module_name, class_name, attr in targets:
+            try:
+                cls = getattr(importlib.import_module(module_name), class_name)
+            except (ImportError, AttributeError):
+                continue
+            original = getattr(cls, attr)
+            setattr(cls, attr, self._wrap(original))
+            self._patched.append((cls, attr, original))
+
+    def uninstall(self):
+        for cls, attr, original in self._patched:
+            setattr(cls, attr, original)
+        self._patched.clear()
+
+
+class RssSampler:
+    """Peak resident memory of this process and all of its children, sampled in the background."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process = psutil.Process()
+
+    def sample(self) -> int:
+        total = 0
+        for proc in [self._process] + self._process.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.sample())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self.sample()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.sample())
+
+
+# ---------- Runs ----------
+def run_once(site: str, scrape, query: str, pincode: Optional[str], timeout: float,
+             calls: BrowserCalls) -> Dict[str, Any]:
+    ctx = ScrapeContext(site, timeout=timeout)
+    calls.reset()
+    http_before = http_client.stats["requests"]
+    with RssSampler() as rss, use_context(ctx):
+        start = time.perf_counter()
+        try:
+            result = scrape(query, pincode)
+            error = None
+        except Exception as e:
+            result, error = None, str(e)
+        wall = time.perf_counter() - start
+
+    ok = isinstance(result, dict) and (result.get("price") or 0) > 0
+    return {
+        "wall_s": wall,
+        "browser_s": calls.seconds,
+        "idle_s": ctx.metrics["idle_seconds"],
+        "scrolls": ctx.metrics["scrolls"],
+        "scroll_saved_s": ctx.metrics["scroll_seconds_saved"],
+        "round_trips": calls.count,
+        "http_requests": http_client.stats["requests"] - http_before,
+        "peak_rss_mb": rss.peak / (1024 * 1024),
+        "ok": ok,
+        "price": result.get("price") if isinstance(result, dict) else None,
+        "error": error or (result.get("error") if isinstance(result, dict) else None),
+    }
+
+
+def bench_site(site: str, iterations: int, warmup: int, pincode: Optional[str], timeout: float,
+               latency_ms: float, calls: BrowserCalls) -> Dict[str, Any]:
+    module_name, func_name = SCRAPERS[site]
+    scrape = getattr(importlib.import_module(module_name), func_name)
+
+    with ReplayServer(site, latency_ms) as server:
+        for _ in range(warmup):
+            run_once(site, scrape, server.query, pincode, timeout, calls)
+        runs = [run_once(site, scrape, server.query, pincode, timeout, calls) for _ in range(iterations)]
+        hits = dict(server.hits)
+
+    row = {metric: statistics.median(r[metric] for r in runs) for metric in METRICS}
+    row["peak_rss_mb"] = max(r["peak_rss_mb"] for r in runs)
+    row.update({
+        "site": site,
+        "query": server.query,
+        "ok_runs": sum(r["ok"] for r in runs),
+        "runs": len(runs),
+        "prices": sorted({r["price"] for r in runs if r["price"]}),
+        "errors": sorted({r["error"] for r in runs if r["error"]}),
+        "requests_served": hits["served"],
+        "requests_not_found": hits["not_found"],
+    })
+    return row
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).parent, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def print_report(rows: List[Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]] = None):
+    print(f"{'site':<10} {'ok':>5} {'wall s':>8} {'browser s':>10} {'idle s':>8} {'scrolls':>8} {'saved s':>8} "
+          f"{'trips':>7} {'http':>5} {'peak RSS MB':>12}  price")
+    print("-" * 108)
+    for r in rows:
+        print(f"{r['site']:<10} {r['ok_runs']:>2}/{r['runs']:<2} {r['wall_s']:>8.2f} {r['browser_s']:>10.2f} "
+              f"{r['idle_s']:>8.2f} {r['scrolls']:>8.0f} {r['scroll_saved_s']:>8.2f} "
+              f"{r['round_trips']:>7.0f} {r['http_requests']:>5.0f} "
+              f"{r['peak_rss_mb']:>12.1f}  {', '.join(map(str, r['prices'])) or '-'}")
+        for error in r["errors"]:
+            print(f"{'':<10} ⚠️ {error[:80]}")
+
+        before = (baseline or {}).get(r["site"])
+        if before:
+            deltas = []
+            for metric in METRICS:
+                old, new = before.get(metric), r[metric]
+                if old:
+                    deltas.append(f"{metric} {(new - old) / old * 100:+.1f}%")
+            if before.get("prices") and before["prices"] != r["prices"]:
+                deltas.append(f"price changed (was {', '.join(map(str, before['prices']))})")
+            print(f"{'':<10} vs baseline: {', '.join(deltas) or 'no comparable metrics'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--site", action="append", choices=sorted(SCRAPERS), help="only run these sites (repeatable)")
+    parser.add_argument("--iterations", type=int, default=int(os.getenv("BENCH_ITERATIONS", "5")))
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before measuring (browser start-up)")
+    parser.add_argument("--pincode", help="pass a pincode to the scrapers (exercises the location flows)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-run scrape deadline in seconds")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every replayed response")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON from an earlier --output run to diff against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        baseline = {r["site"]: r for r in previous["results"]}
+        if previous["meta"].get("iterations") != args.iterations:
+            print(f"⚠️ Baseline used {previous['meta'].get('iterations')} iterations, this run {args.iterations}")
+
+    calls = BrowserCalls()
+    calls.install()
+    rows = []
+    try:
+        for site in args.site or list(SCRAPERS):
+            print(f"⏱️ {site}: {args.warmup} warm-up + {args.iterations} measured runs")
+            rows.append(bench_site(site, args.iterations, args.warmup, args.pincode, args.timeout,
+                                   args.latency_ms, calls))
+    finally:
+        calls.uninstall()
+        from scraper.driver_pool import shutdown_driver_pool
+        from scraper.playwright_pool import shutdown_playwright_pool
+        shutdown_driver_pool()
+        shutdown_playwright_pool()
+
+    print()
+    print_report(rows, baseline)
+
+    if args.output:
+        meta = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "latency_ms": args.latency_ms,
+            "pincode": args.pincode,
+        }
+        Path(args.output).write_text(json.dumps({"meta": meta, "results": rows}, indent=2), encoding="utf-8")
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+ShopThrone - Deal Cache Warmer
+Background worker that refreshes the deal cache for trending searches.
+
+Every CACHE_WARMER_INTERVAL seconds it takes the top CACHE_WARMER_TOP_N
+normalized queries from recent search history (manual and image searches,
+the same data behind /api/admin/analytics/top-products) together with the
+most common delivery pincodes of the users searching them, and re-scrapes the
+sites whose cached result has expired or expires within
+CACHE_WARMER_REFRESH_AHEAD seconds. Scrapes run at background priority, so the
+scrape scheduler sheds them before any user search, under the admin
+`scraper_timeout` deadline.
+
+Inside the off-peak hours (CACHE_WARMER_OFF_PEAK, local time, e.g.
+"0-7,23-24") every trending search is warmed. During load hours only searches
+with a cached result about to expire are refreshed, so what was warmed
+overnight stays warm through the day. Both stay within a rate budget of
+CACHE_WARMER_MAX_SCRAPES site scrapes per hour. Nothing runs while the deal
+cache is disabled.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import dbop as crud
+from db import SessionLocal
+from deal_cache import CACHE_ENABLED, normalize_query
+from price_fetcher import DEFAULT_SCRAPER_TIMEOUT, get_scrapers_for_query, warm_deals
+
+# ---------- Config ----------
+WARMER_ENABLED = os.getenv("CACHE_WARMER_ENABLED", "true").lower() == "true"
+WARM_INTERVAL = float(os.getenv("CACHE_WARMER_INTERVAL", "900"))  # seconds between cycles
+TOP_N = int(os.getenv("CACHE_WARMER_TOP_N", "20"))
+PINCODES_PER_QUERY = int(os.getenv("CACHE_WARMER_PINCODES", "2"))
+LOOKBACK_DAYS = int(os.getenv("CACHE_WARMER_LOOKBACK_DAYS", "7"))
+MAX_SCRAPES_PER_HOUR = int(os.getenv("CACHE_WARMER_MAX_SCRAPES", "60"))
+OFF_PEAK = os.getenv("CACHE_WARMER_OFF_PEAK", "0-7")  # local hours, "start-end[,start-end]"
+# Results expiring within this many seconds are refreshed; more than one interval
+# so nothing lapses between cycles
+REFRESH_AHEAD = float(os.getenv("CACHE_WARMER_REFRESH_AHEAD", str(WARM_INTERVAL + 300)))
+
+
+def parse_hours(spec: str) -> Set[int]:
+    """'0-7,23-24' -> {0, 1, ..., 6, 23}; an empty spec means every hour"""
+    hours: Set[int] = set()
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            start, _, end = part.partition("-")
+            start = int(start)
+            end = int(end) if end else start + 1
+        except ValueError:
+            print(f"⚠️ Ignoring invalid CACHE_WARMER_OFF_PEAK range: {part}")
+            continue
+        hours.update(h % 24 for h in range(start, end if end > start else end + 24))
+    return hours or set(range(24))
+
+
+def trending_targets(rows: List[Tuple[str, Optional[str], int]], top_n: int = TOP_N,
+                     pincodes_per_query: int = PINCODES_PER_QUERY) -> List[Tuple[str, Optional[str]]]:
+    """(query, pincode, count) rows -> [(normalized query, pincode)] for the top queries, busiest first"""
+    query_counts: Dict[str, int] = {}
+    pincode_counts: Dict[str, Dict[Optional[str], int]] = {}
+    for query, pincode, count in rows:
+        query = normalize_query(query)
+        if not query:
+            continue
+        pincode = (pincode or "").strip() or None
+        query_counts[query] = query_counts.get(query, 0) + count
+        by_pincode = pincode_counts.setdefault(query, {})
+        by_pincode[pincode] = by_pincode.get(pincode, 0) + count
+
+    targets = []
+    for query in sorted(query_counts, key=query_counts.get, reverse=True)[:top_n]:
+        pincodes = sorted(pincode_counts[query], key=pincode_counts[query].get, reverse=True)
+        targets.extend((query, pincode) for pincode in pincodes[:pincodes_per_query])
+    return targets
+
+
+class CacheWarmer:
+    """Periodic background refresh of trending queries into deal_cache."""
+
+    def __init__(self, interval: float = WARM_INTERVAL, max_scrapes_per_hour: int = MAX_SCRAPES_PER_HOUR,
+                 off_peak: str = OFF_PEAK, refresh_ahead: float = REFRESH_AHEAD):
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.max_scrapes_per_hour = max_scrapes_per_hour
+        self.off_peak_hours = parse_hours(off_peak)
+        self._scrapes = deque()  # monotonic timestamps of warming scrapes in the last hour
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[str] = None
+        self.stats = {"cycles": 0, "queries_warmed": 0, "site_scrapes": 0, "budget_stops": 0, "errors": 0}
+
+    # ---------- Budget / window ----------
+    def in_off_peak(self, now: Optional[datetime] = None) -> bool:
+        return (now or datetime.now()).hour in self.off_peak_hours
+
+    def budget_left(self) -> int:
+        cutoff = time.monotonic() - 3600
+        with self._lock:
+            while self._scrapes and self._scrapes[0] < cutoff:
+                self._scrapes.popleft()
+            return self.max_scrapes_per_hour - len(self._scrapes)
+
+    def _spend(self, scrapes: int):
+        now = time.monotonic()
+        with self._lock:
+            self._scrapes.extend([now] * scrapes)
+            self.stats["site_scrapes"] += scrapes
+
+    # ---------- Work ----------
+    def load_targets(self) -> List[Tuple[str, Optional[str]]]:
+        db = SessionLocal()
+        try:
+            rows = crud.get_search_query_pincodes(db, datetime.utcnow() - timedelta(days=LOOKBACK_DAYS))
+        finally:
+            db.close()
+        return trending_targets(rows)
+
+    def load_timeout(self) -> float:
+        """Global scrape deadline from the admin `scraper_timeout` setting"""
+        db = SessionLocal()
+        try:
+            setting = crud.get_system_setting(db, "scraper_timeout")
+            return float(setting.value) if setting and setting.value else DEFAULT_SCRAPER_TIMEOUT
+        except ValueError:
+            return DEFAULT_SCRAPER_TIMEOUT
+        finally:
+            db.close()
+
+    def run_once(self) -> int:
+        """Warm trending queries until the budget runs out; returns the number of queries warmed"""
+        targets = self.load_targets()
+        timeout = self.load_timeout()
+        warmed = 0
+        for query, pincode in targets:
+            if self._stop.is_set():
+                break
+            # Worst case every relevant site is stale and gets scraped
+            if self.budget_left() < len(get_scrapers_for_query(query)):
+                with self._lock:
+                    self.stats["budget_stops"] += 1
+                print(f"🌡️ Cache warmer: hourly budget of {self.max_scrapes_per_hour} scrapes used up")
+                break
+            scraped = asyncio.run(warm_deals(query, pincode, timeout=timeout, refresh_within=self.refresh_ahead,
+                                             expiring_only=not self.in_off_peak()))
+            self._spend(scraped)
+            if scraped:
+                warmed += 1
+
+        with self._lock:
+            self.stats["cycles"] += 1
+            self.stats["queries_warmed"] += warmed
+            self.last_run = datetime.utcnow().isoformat()
+        print(f"🌡️ Cache warmer: refreshed {warmed}/{len(targets)} trending searches")
+        return warmed
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                with self._lock:
+                    self.stats["errors"] += 1
+                print(f"⚠️ Cache warmer cycle failed: {str(e)}")
+
+    def start(self):
+        if not WARMER_ENABLED or not CACHE_ENABLED or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+        print(f"🌡️ Cache warmer started (every {self.interval:.0f}s, refreshing {self.refresh_ahead:.0f}s ahead)")
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        budget_left = self.budget_left()
+        with self._lock:
+            return {
+                "enabled": WARMER_ENABLED and CACHE_ENABLED,
+                "running": self._thread is not None and self._thread.is_alive(),
+                "off_peak_now": self.in_off_peak(),
+                "interval": self.interval,
+                "refresh_ahead": self.refresh_ahead,
+                "budget_per_hour": self.max_scrapes_per_hour,
+                "budget_left": budget_left,
+                "last_run": self.last_run,
+                **self.stats,
+            }
+
+
+cache_warmer = CacheWarmer()
@@ -4,7 +4,7 @@ Handles all database CRUD operations and business logic
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, func
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 import secrets
@@ -246,6 +246,143 @@ def get_all_manual_searches(db: Session, skip: int = 0, limit: int = 100,
     return searches, total
 
 
+# ==================== PRICE OBSERVATION OPERATIONS ====================
+
+# Sites that have a legacy <site>_price column on image/manual searches
+LEGACY_PRICE_SITES = ["amazon", "flipkart", "snapdeal", "croma", "reliance", "ajio"]
+
+PRICE_BACKFILL_SETTING = "price_observations_backfilled"
+
+# SQL twin of deal_cache.normalize_query, used by the back-fill
+_NORMALIZE_SQL = r"trim(regexp_replace(regexp_replace(lower({col}), '[^\w\s+]', ' ', 'g'), '\s+', ' ', 'g'))"
+
+
+def bulk_insert_price_observations(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """Insert one deals response worth of price observations; returns the count"""
+    if not rows:
+        return 0
+    db.bulk_insert_mappings(models.PriceObservation, rows)
+    db.commit()
+    return len(rows)
+
+
+def upsert_search_price_observation(db: Session, row: Dict[str, Any],
+                                    user_id: Optional[int] = None) -> models.PriceObservation:
+    """Create or replace one site's observation for a search, keyed by (search_type, search_id, site).
+
+    The search's legacy <site>_price column is updated too when it belongs to user_id.
+    """
+    obs = models.PriceObservation
+    observation = db.query(obs).filter(
+        obs.search_type == row["search_type"],
+        obs.search_id == row["search_id"],
+        obs.site == row["site"]
+    ).first()
+    if observation:
+        for key, value in row.items():
+            setattr(observation, key, value)
+        observation.observed_at = func.now()
+    else:
+        observation = obs(**row)
+        db.add(observation)
+
+    if row["site"] in LEGACY_PRICE_SITES and user_id is not None:
+        search_model = models.ImageSearch if row["search_type"] == "image" else models.ManualSearch
+        db_search = db.query(search_model).filter(
+            search_model.id == row["search_id"],
+            search_model.user_id == user_id
+        ).first()
+        if db_search:
+            setattr(db_search, f"{row['site']}_price", row["price"])
+
+    db.commit()
+    return observation
+
+
+def backfill_price_observations(db: Session, force: bool = False) -> int:
+    """Copy the legacy *_price columns of searches into price_observations.
+
+    Runs once (recorded in the price_observations_backfilled system setting)
+    unless forced; searches that already have observations are skipped, so a
+    forced re-run does not duplicate rows. Returns the number of rows inserted.
+    """
+    setting = get_system_setting(db, PRICE_BACKFILL_SETTING)
+    if setting and setting.value == "true" and not force:
+        return 0
+
+    inserted = 0
+    for table, search_type, query_col in (("manual_searches", "manual", "query"),
+                                          ("image_searches", "image", "predicted_product")):
+        site_values = ", ".join(f"('{site}', s.{site}_price)" for site in LEGACY_PRICE_SITES)
+        result = db.execute(text(f"""
+            INSERT INTO price_observations (site, query, price, pincode, search_type, search_id, observed_at)
+            SELECT v.site, {_NORMALIZE_SQL.format(col='s.' + query_col)}, v.price, u.pin, '{search_type}', s.id,
+                   COALESCE(s.updated_at, s.created_at, now())
+            FROM {table} s
+            LEFT JOIN users u ON u.id = s.user_id
+            CROSS JOIN LATERAL (VALUES {site_values}) AS v(site, price)
+            WHERE v.price IS NOT NULL AND v.price > 0
+              AND NOT EXISTS (SELECT 1 FROM price_observations o
+                              WHERE o.search_type = '{search_type}' AND o.search_id = s.id)
+        """))
+        inserted += result.rowcount or 0
+
+    db.commit()
+    update_system_setting(db, PRICE_BACKFILL_SETTING, "true")
+    return inserted
+
+
+def get_latest_prices(db: Session, query: str, pincode: Optional[str] = None) -> List[models.PriceObservation]:
+    """Most recent observation per site for a normalized query"""
+    obs = models.PriceObservation
+    q = db.query(obs).filter(obs.query == query)
+    if pincode:
+        q = q.filter(obs.pincode == pincode)
+    return q.order_by(obs.site, obs.observed_at.desc()).distinct(obs.site).all()
+
+
+def get_price_history(db: Session, query: str, site: Optional[str] = None,
+                      since: Optional[datetime] = None) -> List[models.PriceObservation]:
+    """Observations for a normalized query over time, oldest first"""
+    obs = models.PriceObservation
+    q = db.query(obs).filter(obs.query == query)
+    if site:
+        q = q.filter(obs.site == site)
+    if since:
+        q = q.filter(obs.observed_at >= since)
+    return q.order_by(obs.observed_at).all()
+
+
+def get_price_range(db: Session, query: str, since: Optional[datetime] = None) -> Dict[str, Optional[float]]:
+    """Min / max / average observed price for a normalized query"""
+    obs = models.PriceObservation
+    q = db.query(func.min(obs.price), func.max(obs.price), func.avg(obs.price)).filter(obs.query == query)
+    if since:
+        q = q.filter(obs.observed_at >= since)
+    low, high, avg = q.one()
+    return {
+        "min": low,
+        "max": high,
+        "avg": float(avg) if avg is not None else None
+    }
+
+
+def count_searches_with_prices(db: Session, search_type: str, since: Optional[datetime] = None) -> int:
+    """Number of searches of a type, created since `since`, that got at least one price
+
+    Windowed on the search's created_at, like the search counts it is compared
+    with (an observation's observed_at moves when enrichment updates it).
+    """
+    obs = models.PriceObservation
+    search_model = models.ImageSearch if search_type == "image" else models.ManualSearch
+    q = db.query(func.count(func.distinct(obs.search_id))).join(
+        search_model, search_model.id == obs.search_id
+    ).filter(obs.search_type == search_type)
+    if since:
+        q = q.filter(search_model.created_at >= since)
+    return q.scalar() or 0
+
+
 # ==================== PASSWORD RESET OPERATIONS ====================
 
 def create_password_reset_token(db: Session, email: str) -> Optional[models.PasswordResetToken]:
@@ -506,21 +643,13 @@ def get_search_analytics(db: Session, start_date: Optional[datetime] = None,
 # Add this to your crud.py file if it doesn't exist
 
 def get_platform_usage_stats(db: Session) -> Dict[str, int]:
-    """Get usage statistics for each platform"""
-    return {
-        "amazon": db.query(models.ImageSearch).filter(models.ImageSearch.amazon_price.isnot(None)).count() + 
-                  db.query(models.ManualSearch).filter(models.ManualSearch.amazon_price.isnot(None)).count(),
-        "flipkart": db.query(models.ImageSearch).filter(models.ImageSearch.flipkart_price.isnot(None)).count() + 
-                    db.query(models.ManualSearch).filter(models.ManualSearch.flipkart_price.isnot(None)).count(),
-        "snapdeal": db.query(models.ImageSearch).filter(models.ImageSearch.snapdeal_price.isnot(None)).count() + 
-                    db.query(models.ManualSearch).filter(models.ManualSearch.snapdeal_price.isnot(None)).count(),
-        "croma": db.query(models.ImageSearch).filter(models.ImageSearch.croma_price.isnot(None)).count() + 
-                 db.query(models.ManualSearch).filter(models.ManualSearch.croma_price.isnot(None)).count(),
-        "reliance": db.query(models.ImageSearch).filter(models.ImageSearch.reliance_price.isnot(None)).count() + 
-                    db.query(models.ManualSearch).filter(models.ManualSearch.reliance_price.isnot(None)).count(),
-        "ajio": db.query(models.ImageSearch).filter(models.ImageSearch.ajio_price.isnot(None)).count() + 
-                db.query(models.ManualSearch).filter(models.ManualSearch.ajio_price.isnot(None)).count(),
-    }
+    """Get usage statistics for each platform (searches that got a price from it)"""
+    obs = models.PriceObservation
+    searches = func.count(func.distinct(func.concat(obs.search_type, ":", obs.search_id)))
+    counts = dict(
+        db.query(obs.site, searches).filter(obs.search_id.isnot(None)).group_by(obs.site).all()
+    )
+    return {site: counts.get(site, 0) for site in sorted(set(LEGACY_PRICE_SITES) | set(counts))}
 
 
 def get_user_search_counts(db: Session, user_id: int) -> Dict[str, int]:
@@ -577,6 +706,132 @@ def get_all_settings(db: Session) -> Dict[str, str]:
     return {setting.key: setting.value for setting in settings}
 
 
+# ==================== SYSTEM CACHE OPERATIONS ====================
+
+def get_cache_entry(db: Session, key: str) -> Optional[models.SystemCache]:
+    """Get a cache entry by key if it has not expired"""
+    return db.query(models.SystemCache).filter(
+        models.SystemCache.key == key,
+        (models.SystemCache.expires_at.is_(None)) | (models.SystemCache.expires_at > datetime.utcnow())
+    ).first()
+
+
+def set_cache_entry(db: Session, key: str, value: str,
+                    expires_at: Optional[datetime] = None) -> models.SystemCache:
+    """Create or replace a cache entry"""
+    entry = db.query(models.SystemCache).filter(models.SystemCache.key == key).first()
+
+    if entry:
+        entry.value = value
+        entry.expires_at = expires_at
+        entry.updated_at = datetime.utcnow()
+    else:
+        entry = models.SystemCache(key=key, value=value, expires_at=expires_at)
+        db.add(entry)
+
+    db.commit()
+    return entry
+
+
+def delete_cache_entries(db: Session, prefix: Optional[str] = None) -> int:
+    """Delete cache entries (optionally only keys starting with prefix); returns the count"""
+    query = db.query(models.SystemCache)
+    if prefix:
+        query = query.filter(models.SystemCache.key.startswith(prefix))
+    count = query.delete(synchronize_session=False)
+    db.commit()
+    return count
+
+
+def purge_expired_cache(db: Session) -> int:
+    """Delete expired cache entries; returns the count"""
+    count = db.query(models.SystemCache).filter(
+        models.SystemCache.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return count
+
+
+def get_search_query_pincodes(db: Session, since: datetime, limit: int = 500) -> List[tuple]:
+    """Most frequent (query, user pincode, count) combinations from manual and image searches since `since`"""
+    manual = db.query(
+        models.ManualSearch.query, models.User.pin, func.count(models.ManualSearch.id)
+    ).join(models.User, models.User.id == models.ManualSearch.user_id).filter(
+        models.ManualSearch.created_at >= since
+    ).group_by(models.ManualSearch.query, models.User.pin).order_by(
+        func.count(models.ManualSearch.id).desc()
+    ).limit(limit).all()
+
+    image = db.query(
+        models.ImageSearch.predicted_product, models.User.pin, func.count(models.ImageSearch.id)
+    ).join(models.User, models.User.id == models.ImageSearch.user_id).filter(
+        models.ImageSearch.created_at >= since,
+        models.ImageSearch.predicted_product.isnot(None)
+    ).group_by(models.ImageSearch.predicted_product, models.User.pin).order_by(
+        func.count(models.ImageSearch.id).desc()
+    ).limit(limit).all()
+
+    return [tuple(row) for row in manual + image]
+
+
+# ==================== SCRAPER TELEMETRY OPERATIONS ====================
+
+def bulk_insert_scraper_runs(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """Insert a batch of scraper run records; returns the count"""
+    if not rows:
+        return 0
+    db.bulk_insert_mappings(models.ScraperRun, rows)
+    db.commit()
+    return len(rows)
+
+
+def get_scraper_run_stats(db: Session, since: datetime) -> Dict[str, Dict[str, Any]]:
+    """Per-site run counts, outcomes and latency percentiles for runs since `since`"""
+    run = models.ScraperRun
+    rows = db.query(
+        run.site,
+        func.count(run.id),
+        func.avg(run.duration),
+        func.percentile_cont(0.5).within_group(run.duration),
+        func.percentile_cont(0.95).within_group(run.duration),
+        func.percentile_cont(0.99).within_group(run.duration),
+        func.avg(run.search_seconds),
+        func.avg(run.detail_seconds),
+        func.avg(run.candidates),
+    ).filter(run.created_at >= since).group_by(run.site).all()
+
+    stats = {}
+    for site, runs, avg, p50, p95, p99, search, detail, candidates in rows:
+        stats[site] = {
+            "runs": runs,
+            "avg_duration": float(avg or 0),
+            "p50": float(p50 or 0),
+            "p95": float(p95 or 0),
+            "p99": float(p99 or 0),
+            "avg_search_seconds": float(search or 0),
+            "avg_detail_seconds": float(detail or 0),
+            "avg_candidates": float(candidates or 0),
+            "outcomes": {},
+        }
+
+    outcomes = db.query(run.site, run.outcome, func.count(run.id)).filter(
+        run.created_at >= since
+    ).group_by(run.site, run.outcome).all()
+    for site, outcome, count in outcomes:
+        if site in stats:
+            stats[site]["outcomes"][outcome] = count
+    return stats
+
+
+def purge_scraper_runs(db: Session, before: datetime) -> int:
+    """Delete scraper run records older than `before`; returns the count"""
+    count = db.query(models.ScraperRun).filter(
+        models.ScraperRun.created_at < before
+    ).delete(synchronize_session=False)
+    db.commit()
+    return count
+
+
 # ==================== ADMIN LOG OPERATIONS ====================
 
 def create_admin_log(db: Session, admin_id: Optional[int], action: str, 
@@ -0,0 +1,214 @@
+"""
+ShopThrone - Deal Result Cache
+Two-tier cache for per-site scraper results:
+    1. In-process LRU with TTL (fast, per worker)
+    2. Postgres-backed tier on the system_cache table (shared across workers/restarts)
+
+Entries are stored per site and keyed on the normalized query and pincode, so a
+search only re-runs the scrapers whose results are missing or expired. The set
+of scrapers for a query comes from its category; a lookup returns the subset of
+that set that is cached.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+import dbop as crud
+from db import SessionLocal
+
+# ---------- Config ----------
+CACHE_ENABLED = os.getenv("DEAL_CACHE_ENABLED", "true").lower() == "true"
+MEMORY_MAX_ENTRIES = int(os.getenv("DEAL_CACHE_MAX_ENTRIES", "512"))
+DEFAULT_TTL = int(os.getenv("DEAL_CACHE_TTL", "900"))  # seconds
+
+# Per-site TTLs in seconds; override with DEAL_CACHE_TTL_<SITE>
+SITE_TTLS = {
+    "amazon": 900,
+    "flipkart": 900,
+    "snapdeal": 1800,
+    "croma": 1800,
+    "reliance": 1800,
+    "ajio": 1800,
+}
+
+KEY_PREFIX = "deals:"
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so equivalent searches share a key"""
+    query = re.sub(r"[^\w\s+]", " ", (query or "").lower())
+    return " ".join(query.split())
+
+
+def site_ttl(site: str) -> int:
+    return int(os.getenv(f"DEAL_CACHE_TTL_{site.upper()}", SITE_TTLS.get(site, DEFAULT_TTL)))
+
+
+def make_key(query: str, pincode: Optional[str], site: str) -> str:
+    return f"{KEY_PREFIX}{site}:{pincode or '-'}:{normalize_query(query)}"
+
+
+class DealCache:
+    """In-process LRU in front of the system_cache table."""
+
+    def __init__(self, max_entries: int = MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "db_errors": 0}
+        self.site_stats: Dict[str, Dict[str, int]] = {}
+
+    # ---------- Memory tier ----------
+    def _memory_get(self, key: str, min_ttl: float = 0):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                del self._memory[key]
+                return None
+            if expires_at - now < min_ttl:
+                return None
+            self._memory.move_to_end(key)
+            return data
+
+    def _memory_put(self, key: str, data: Dict[str, Any], ttl: float):
+        with self._lock:
+            self._memory[key] = (time.monotonic() + ttl, data)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _count(self, stat: str, site: Optional[str] = None, field: Optional[str] = None):
+        with self._lock:
+            self.stats[stat] += 1
+            if site:
+                site_stats = self.site_stats.setdefault(site, {"hits": 0, "misses": 0})
+                site_stats[field] += 1
+
+    # ---------- Public API ----------
+    def get(self, query: str, pincode: Optional[str], site: str, min_ttl: float = 0) -> Optional[Dict[str, Any]]:
+        """Return the cached result for one site, or None on a miss
+
+        Results with less than min_ttl seconds left count as misses.
+        """
+        key = make_key(query, pincode, site)
+
+        data = self._memory_get(key, min_ttl)
+        if data is not None:
+            self._count("memory_hits", site, "hits")
+            return data
+
+        db = SessionLocal()
+        try:
+            entry = crud.get_cache_entry(db, key)
+            if entry is not None:
+                data = json.loads(entry.value)
+                ttl = (entry.expires_at - datetime.utcnow()).total_seconds() if entry.expires_at else site_ttl(site)
+                self._memory_put(key, data, max(ttl, 1))
+                if ttl >= min_ttl:
+                    self._count("db_hits", site, "hits")
+                    return data
+        except Exception as e:
+            self._count("db_errors")
+            print(f"⚠️ Deal cache lookup failed for {site}: {str(e)}")
+        finally:
+            db.close()
+
+        self._count("misses", site, "misses")
+        return None
+
+    def get_many(self, query: str, pincode: Optional[str], sites: Iterable[str],
+                 min_ttl: float = 0) -> Dict[str, Dict[str, Any]]:
+        """Return {site: result} for the sites that are cached"""
+        hits = {}
+        for site in sites:
+            data = self.get(query, pincode, site, min_ttl)
+            if data is not None:
+                hits[site] = data
+        return hits
+
+    def expires_in(self, query: str, pincode: Optional[str], site: str) -> Optional[float]:
+        """Seconds until one site's cached result expires, or None if it is not cached"""
+        key = make_key(query, pincode, site)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[0] - time.monotonic()
+
+        db = SessionLocal()
+        try:
+            entry = crud.get_cache_entry(db, key)
+            if entry is None:
+                return None
+            if entry.expires_at is None:
+                return float("inf")
+            return max((entry.expires_at - datetime.utcnow()).total_seconds(), 0.0)
+        except Exception as e:
+            self._count("db_errors")
+            print(f"⚠️ Deal cache lookup failed for {site}: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+    def put(self, query: str, pincode: Optional[str], site: str, data: Dict[str, Any]):
+        """Store one site's result in both tiers"""
+        key = make_key(query, pincode, site)
+        ttl = site_ttl(site)
+        self._memory_put(key, data, ttl)
+        self._count("stores")
+
+        db = SessionLocal()
+        try:
+            crud.set_cache_entry(
+                db, key, json.dumps(data, default=str),
+                expires_at=datetime.utcnow() + timedelta(seconds=ttl)
+            )
+        except Exception as e:
+            self._count("db_errors")
+            print(f"⚠️ Deal cache store failed for {site}: {str(e)}")
+        finally:
+            db.close()
+
+    def clear(self, db=None) -> Dict[str, int]:
+        """Empty both tiers; returns how many entries were removed from each"""
+        with self._lock:
+            memory_count = len(self._memory)
+            self._memory.clear()
+
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            db_count = crud.delete_cache_entries(db, prefix=KEY_PREFIX)
+        finally:
+            if own_session:
+                db.close()
+
+        return {"memory_entries": memory_count, "db_entries": db_count}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            memory_entries = len(self._memory)
+            site_stats = {site: dict(v) for site, v in self.site_stats.items()}
+            stats = dict(self.stats)
+        hits = stats["memory_hits"] + stats["db_hits"]
+        lookups = hits + stats["misses"]
+        return {
+            "enabled": CACHE_ENABLED,
+            "memory_entries": memory_entries,
+            "max_entries": self.max_entries,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            **stats,
+            "sites": site_stats,
+        }
+
+
+deal_cache = DealCache()
@@ -0,0 +1,185 @@
+"""
+ShopThrone - Deal Enrichment
+Second phase of a preview search.
+
+A preview search (/api/search/deals?preview=true) answers from the search
+pages alone: every site's cheapest listing with its title, price and image.
+Right after it returns, the product page behind each preview offer is read
+in the background for rating, delivery and specifications (enrich_deal in
+price_fetcher, cheapest offer first, at enrichment priority). The client
+polls /api/search/deals/details with the search id it got back.
+
+An enriched offer replaces its preview price on the saved search: its
+price_observations row (and the search's legacy <site>_price column) is
+updated. An offer whose product page fails keeps its preview data, with the
+failed status next to it. Jobs are kept in memory for ENRICHMENT_TTL seconds after
+they were started, at most ENRICHMENT_MAX_JOBS at a time.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import dbop as crud
+from db import SessionLocal
+from deal_cache import normalize_query
+from price_fetcher import enrich_deal, STATUS_ERROR, STATUS_OK, STATUS_SKIPPED
+
+# ---------- Config ----------
+ENRICHMENT_TTL = float(os.getenv("ENRICHMENT_TTL", "900"))  # seconds a finished job stays readable
+MAX_JOBS = int(os.getenv("ENRICHMENT_MAX_JOBS", "500"))
+
+STATUS_PENDING = "pending"
+
+
+class EnrichmentJob:
+    """The preview offers of one saved search and their enrichment progress."""
+
+    def __init__(self, search_type: str, search_id: int, user_id: int, product: str,
+                 pincode: Optional[str], deals: Dict[str, Any]):
+        self.search_type = search_type
+        self.search_id = search_id
+        self.user_id = user_id
+        self.product = product
+        self.pincode = pincode
+        self.deals = dict(deals)
+        self.site_status = {
+            site: {"status": STATUS_PENDING}
+            for site, data in deals.items() if isinstance(data, dict) and data.get("preview")
+        }
+        self.created_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def complete(self) -> bool:
+        return all(s["status"] != STATUS_PENDING for s in self.site_status.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "search_id": self.search_id,
+            "search_type": self.search_type,
+            "complete": self.complete,
+            "site_status": self.site_status,
+            "elapsed": round((self.finished_at or time.monotonic()) - self.created_at, 2),
+        }
+
+
+class DealEnrichment:
+    """In-memory enrichment jobs keyed by (search_type, search_id)."""
+
+    def __init__(self, ttl: float = ENRICHMENT_TTL, max_jobs: int = MAX_JOBS):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[Tuple[str, int], EnrichmentJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"jobs": 0, "offers": 0, "enriched": 0, "failed": 0, "evicted": 0}
+
+    # ---------- Store ----------
+    def _prune(self):
+        """Drop expired jobs, then the oldest ones beyond max_jobs (caller holds the lock)"""
+        cutoff = time.monotonic() - self.ttl
+        for key in [k for k, job in self._jobs.items() if job.created_at < cutoff]:
+            self._drop(key)
+        while len(self._jobs) > self.max_jobs:
+            self._drop(next(iter(self._jobs)))
+
+    def _drop(self, key: Tuple[str, int]):
+        job = self._jobs.pop(key)
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+            self.stats["evicted"] += 1
+
+    def get(self, search_type: str, search_id: int) -> Optional[EnrichmentJob]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get((search_type, search_id))
+
+    # ---------- Work ----------
+    def start(self, search_type: str, search_id: int, user_id: int, product: str,
+              pincode: Optional[str], deals: Dict[str, Any], timeout: Optional[float] = None) -> EnrichmentJob:
+        """Register a preview search and enrich its offers on the running event loop"""
+        job = EnrichmentJob(search_type, search_id, user_id, product, pincode, deals)
+        with self._lock:
+            if (search_type, search_id) in self._jobs:
+                self._drop((search_type, search_id))
+            self._jobs[(search_type, search_id)] = job
+            self._prune()
+            self.stats["jobs"] += 1
+            self.stats["offers"] += len(job.site_status)
+        job.task = asyncio.ensure_future(self._run(job, timeout))
+        return job
+
+    async def _run(self, job: EnrichmentJob, timeout: Optional[float]):
+        # Cheapest offers queue first, so the likely best deal is filled in first
+        sites = sorted(job.site_status, key=lambda site: job.deals[site].get("price") or float("inf"))
+        if sites:
+            print(f"🔎 Enriching {len(sites)} preview offers for: {job.product}")
+        await asyncio.gather(*(self._enrich(job, site, timeout) for site in sites))
+        job.finished_at = time.monotonic()
+
+    async def _enrich(self, job: EnrichmentJob, site: str, timeout: Optional[float]):
+        preview = job.deals[site]
+        try:
+            data, status = await enrich_deal(site, job.product, preview["url"], job.pincode, timeout=timeout)
+        except asyncio.CancelledError:
+            job.site_status[site] = {"status": STATUS_SKIPPED, "detail": "Cancelled"}
+            raise
+        except Exception as e:
+            data, status = None, {"status": STATUS_ERROR, "detail": str(e)}
+
+        if data is not None and status["status"] == STATUS_OK:
+            enriched = dict(data)
+            enriched.pop("preview", None)
+            # The listing's title and image stand in for ones the product page lacked
+            for field in ("title", "image"):
+                enriched[field] = enriched.get(field) or preview.get(field)
+            job.deals[site] = enriched
+            if enriched.get("price"):
+                await asyncio.get_running_loop().run_in_executor(None, self._save, job, site, enriched)
+        job.site_status[site] = status
+        with self._lock:
+            self.stats["enriched" if data is not None else "failed"] += 1
+
+    def _save(self, job: EnrichmentJob, site: str, data: Dict[str, Any]):
+        """Store an enriched offer over the preview price saved for the search"""
+        db = SessionLocal()
+        try:
+            crud.upsert_search_price_observation(db, {
+                "site": site,
+                "query": normalize_query(job.product),
+                "product_url": data.get("url"),
+                "title": data.get("title"),
+                "price": data["price"],
+                "original_price": data.get("original_price") or None,
+                "pincode": job.pincode,
+                "in_stock": data.get("in_stock"),
+                "search_type": job.search_type,
+                "search_id": job.search_id,
+            }, user_id=job.user_id)
+        except Exception as e:
+            print(f"⚠️ Could not save enriched {site} price for search {job.search_id}: {str(e)}")
+        finally:
+            db.close()
+
+    def stop(self):
+        with self._lock:
+            for job in self._jobs.values():
+                if job.task is not None and not job.task.done():
+                    job.task.cancel()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune()
+            return {
+                "active_jobs": sum(1 for job in self._jobs.values() if not job.complete),
+                "stored_jobs": len(self._jobs),
+                "ttl": self.ttl,
+                **self.stats,
+            }
+
+
+deal_enrichment = DealEnrichment()
@@ -5,14 +5,16 @@ FastAPI backend for multi-platform price comparison system
 
 from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, BackgroundTasks, Form, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import base64
+import json
 import os
+import threading
 from dotenv import load_dotenv
 
 # Local imports
@@ -21,8 +23,19 @@ import models
 import schema as schemas
 import auth
 import transformer as ai_model
-from db import engine, get_db
-from price_fetcher import get_top_deals_from_each_site
+from db import engine, get_db, SessionLocal
+from price_fetcher import (
+    gather_deals, iter_deals, structure_deals, get_singleflight_snapshot, get_breaker_snapshot,
+    ALL_SITES, DEFAULT_SCRAPER_TIMEOUT
+)
+from deal_cache import deal_cache, normalize_query
+from scrape_scheduler import scheduler as scrape_scheduler
+from scraper_telemetry import telemetry as scraper_telemetry, DEFAULT_WINDOW_HOURS
+from cache_warmer import cache_warmer
+from deal_enrichment import deal_enrichment
+from scraper.driver_pool import get_driver_pool, shutdown_driver_pool
+from scraper.playwright_pool import get_playwright_pool, shutdown_playwright_pool
+from scraper import browser_profiles, http_client, location_sessions, request_blocking, structured_data
 
 load_dotenv()
 
@@ -47,7 +60,7 @@ def determine_category(product_name: str) -> str:
 
 def init_db_schema():
     """Initialize database schema with tables and default settings"""
-    schema_sql = """
+    schema_sql = f"""
     -- Create analytics_cache table
     CREATE TABLE IF NOT EXISTS analytics_cache (
         id SERIAL PRIMARY KEY,
@@ -136,7 +149,7 @@ def init_db_schema():
         ('auto_backup', 'true'),
         ('backup_frequency', 'daily'),
         ('maintenance_mode', 'false'),
-        ('scraper_timeout', '30'),
+        ('scraper_timeout', '{DEFAULT_SCRAPER_TIMEOUT:g}'),
         ('email_notifications', 'true'),
         ('low_price_threshold', '0.1'),
         ('high_price_threshold', '0.2')
@@ -151,6 +164,19 @@ def init_db_schema():
     except Exception as e:
         print(f"❌ Error initializing database schema: {e}")
 
+def backfill_price_observations():
+    """Copy the legacy per-site *_price search columns into price_observations (once)"""
+    db = SessionLocal()
+    try:
+        inserted = crud.backfill_price_observations(db)
+        if inserted:
+            print(f"✅ Back-filled {inserted} price observations from search history")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error back-filling price observations: {e}")
+    finally:
+        db.close()
+
 def get_admin_payload(authorization: str = Header(None)) -> dict:
     """Extract and verify admin token from authorization header"""
     if not authorization:
@@ -359,6 +385,7 @@ models.Base.metadata.create_all(bind=engine)
 
 # Initialize database schema
 init_db_schema()
+backfill_price_observations()
 
 # Create FastAPI app
 app = FastAPI(
@@ -576,15 +603,100 @@ async def save_manual_search_with_prices(
         raise HTTPException(status_code=500, detail=f"Error saving manual search: {str(e)}")
 
 
+def get_scraper_timeout(db: Session) -> float:
+    """Global scrape deadline in seconds from the `scraper_timeout` system setting"""
+    setting = crud.get_system_setting(db, "scraper_timeout")
+    try:
+        return float(setting.value) if setting and setting.value else DEFAULT_SCRAPER_TIMEOUT
+    except ValueError:
+        return DEFAULT_SCRAPER_TIMEOUT
+
+
+def save_search_prices(db: Session, current_user: models.User, product: str, search_id: int,
+                       deals: Dict[str, Any], pincode: Optional[str] = None):
+    """
+    Store the per-site prices as price observations, and on the image search or a new manual search.
+    Returns (search_type, search_id) of the record the prices were saved on.
+    """
+    # Prepare price data for saving
+    deals_to_save = {
+        "amazon_price": deals.get("amazon", {}).get('price') if deals.get("amazon") else None,
+        "flipkart_price": deals.get("flipkart", {}).get('price') if deals.get("flipkart") else None,
+        "snapdeal_price": deals.get("snapdeal", {}).get('price') if deals.get("snapdeal") else None,
+        "croma_price": deals.get("croma", {}).get('price') if deals.get("croma") else None,
+        "reliance_price": deals.get("reliance", {}).get('price') if deals.get("reliance") else None,
+        "ajio_price": deals.get("ajio", {}).get('price') if deals.get("ajio") else None,
+    }
+
+    # Update existing image search or create new manual search
+    if search_id > 0:
+        updated_search = crud.update_image_search_prices(
+            db=db,
+            search_id=search_id,
+            user_id=current_user.id,
+            deals=deals_to_save
+        )
+        if not updated_search:
+            print(f"Warning: Could not update image search record {search_id}")
+        search_type, saved_id = "image", (updated_search.id if updated_search else None)
+    else:
+        manual_search_data = schemas.ManualSearchCreate(
+            user_id=current_user.id,
+            query=product,
+            **deals_to_save
+        )
+        saved = crud.create_manual_search(db=db, search=manual_search_data)
+        search_type, saved_id = "manual", saved.id
+
+    # One row per site that returned a price
+    query = normalize_query(product)
+    observations = [
+        {
+            "site": site,
+            "query": query,
+            "product_url": data.get("url"),
+            "title": data.get("title"),
+            "price": data["price"],
+            "original_price": data.get("original_price") or None,
+            "pincode": pincode,
+            "in_stock": data.get("in_stock"),
+            "search_type": search_type,
+            "search_id": saved_id,
+        }
+        for site, data in deals.items()
+        if site in ALL_SITES and isinstance(data, dict) and data.get("price")
+    ]
+    crud.bulk_insert_price_observations(db, observations)
+    return search_type, saved_id
+
+
+def start_enrichment(current_user: models.User, product: str, pincode: Optional[str], deals: Dict[str, Any],
+                     saved: tuple, timeout: float) -> Dict[str, Any]:
+    """Enrich the preview offers of a saved search in the background; returns the ids to poll with"""
+    search_type, saved_id = saved
+    if saved_id is None:
+        return None
+    job = deal_enrichment.start(search_type, saved_id, current_user.id, product, pincode, deals, timeout)
+    return {"search_id": saved_id, "search_type": search_type, "pending_sites": list(job.site_status)}
+
+
 @app.get("/api/search/deals")
 async def get_deals(
     product: str,
     search_id: int = 0,
     pincode: Optional[str] = None,
+    preview: bool = False,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    """Get price deals from multiple platforms"""
+    """
+    Get price deals from multiple platforms.
+
+    With preview=true only the search pages are scraped: each site's cheapest
+    listing comes back at search-page latency, and its rating, delivery and
+    specs are filled in afterwards (poll /api/search/deals/details with the
+    returned "enrichment" ids).
+    """
     user_pincode = current_user.pin if current_user else None
     pincode_to_use = pincode or user_pincode
 
@@ -592,37 +704,17 @@ async def get_deals(
         raise HTTPException(status_code=400, detail="Product name cannot be empty")
 
     try:
-        # Fetch deals from scraper
-        deals = get_top_deals_from_each_site(product, pincode=pincode_to_use)
-
-        # Prepare price data for saving
-        deals_to_save = {
-            "amazon_price": deals.get("amazon", {}).get('price') if deals.get("amazon") else None,
-            "flipkart_price": deals.get("flipkart", {}).get('price') if deals.get("flipkart") else None,
-            "snapdeal_price": deals.get("snapdeal", {}).get('price') if deals.get("snapdeal") else None,
-            "croma_price": deals.get("croma", {}).get('price') if deals.get("croma") else None,
-            "reliance_price": deals.get("reliance", {}).get('price') if deals.get("reliance") else None,
-            "ajio_price": deals.get("ajio", {}).get('price') if deals.get("ajio") else None,
-        }
+        # Fetch deals from scraper, bounded by the admin-configured timeout
+        timeout = get_scraper_timeout(db)
+        deals, site_status = await gather_deals(
+            product, pincode=pincode_to_use, timeout=timeout, preview=preview
+        )
 
-        # Update existing image search or create new manual search
-        if search_id > 0:
-            updated_search = crud.update_image_search_prices(
-                db=db,
-                search_id=search_id,
-                user_id=current_user.id,
-                deals=deals_to_save
-            )
-            if not updated_search:
-                print(f"Warning: Could not update image search record {search_id}")
-        else:
-            manual_search_data = schemas.ManualSearchCreate(
-                user_id=current_user.id,
-                query=product,
-                **deals_to_save
-            )
-            crud.create_manual_search(db=db, search=manual_search_data)
+        saved = save_search_prices(db, current_user, product, search_id, deals, pincode_to_use)
+        if preview:
+            deals["enrichment"] = start_enrichment(current_user, product, pincode_to_use, deals, saved, timeout)
 
+        deals["site_status"] = site_status
         return deals
 
     except Exception as e:
@@ -630,6 +722,84 @@ async def get_deals(
         raise HTTPException(status_code=500, detail=f"Error fetching deals: {str(e)}")
 
 
+@app.get("/api/search/deals/stream")
+async def stream_deals(
+    product: str,
+    search_id: int = 0,
+    pincode: Optional[str] = None,
+    preview: bool = False,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Stream price deals as newline-delimited JSON.
+
+    Emits one {"event": "site", ...} line per site the moment its scraper
+    finishes, then a final {"event": "summary", ...} line with the best deal.
+    With preview=true the sites report search-page offers and the summary
+    carries the "enrichment" ids for /api/search/deals/details.
+    """
+    user_pincode = current_user.pin if current_user else None
+    pincode_to_use = pincode or user_pincode
+
+    if not product.strip():
+        raise HTTPException(status_code=400, detail="Product name cannot be empty")
+
+    timeout = get_scraper_timeout(db)
+
+    async def event_stream():
+        deals: Dict[str, Any] = {site: None for site in ALL_SITES}
+        site_status: Dict[str, Any] = {}
+        try:
+            async for site, data, site_result in iter_deals(product, pincode=pincode_to_use, timeout=timeout,
+                                                            preview=preview):
+                deals[site] = data
+                site_status[site] = site_result
+                yield json.dumps({"event": "site", "site": site, "data": data, "status": site_result}) + "\n"
+
+            saved = None
+            try:
+                saved = save_search_prices(db, current_user, product, search_id, deals, pincode_to_use)
+            except Exception as e:
+                print(f"Error saving streamed search: {str(e)}")
+
+            summary = structure_deals(product, pincode_to_use, deals)
+            summary["site_status"] = site_status
+            if preview and saved:
+                summary["enrichment"] = start_enrichment(current_user, product, pincode_to_use, deals, saved, timeout)
+            yield json.dumps({"event": "summary", **summary}) + "\n"
+        except Exception as e:
+            print(f"Error in stream_deals: {str(e)}")
+            yield json.dumps({"event": "error", "detail": f"Error fetching deals: {str(e)}"}) + "\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/search/deals/details")
+async def get_deal_details(
+    search_id: int,
+    search_type: str = "manual",
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Enriched deals of a preview search.
+
+    Sites still being enriched keep their preview offer with a "pending"
+    status; "complete" turns true once every product page has been read.
+    """
+    job = deal_enrichment.get(search_type, search_id)
+    if job is None or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="No enrichment found for this search")
+
+    summary = structure_deals(job.product, job.pincode, dict(job.deals))
+    summary["enrichment"] = job.snapshot()
+    return summary
+
+
 # ==================== USER PROFILE ENDPOINTS ====================
 
 @app.get("/api/users/me", response_model=schemas.UserInDB)
@@ -1194,27 +1364,7 @@ async def get_top_products_analytics(
     formatted_products = []
     for product, count in top_products:
         # Get price data
-        product_searches = db.query(models.ImageSearch).filter(
-            models.ImageSearch.predicted_product.ilike(f"%{product}%")
-        ).limit(5).all()
-        
-        if not product_searches:
-            product_searches = db.query(models.ManualSearch).filter(
-                models.ManualSearch.query.ilike(f"%{product}%")
-            ).limit(5).all()
-        
-        prices = []
-        for ps in product_searches:
-            for field in ['amazon_price', 'flipkart_price', 'snapdeal_price', 'croma_price', 'reliance_price', 'ajio_price']:
-                price = getattr(ps, field, None)
-                if price:
-                    prices.append(price)
-        
-        price_range = {
-            "min": min(prices) if prices else None,
-            "max": max(prices) if prices else None,
-            "avg": sum(prices) / len(prices) if prices else None
-        }
+        price_range = crud.get_price_range(db, normalize_query(product))
         
         formatted_products.append({
             "product": product,
@@ -1344,7 +1494,21 @@ async def get_live_monitoring(
                 "recent_searches_5min": recent_searches,
                 "active_users_15min": active_users,
                 "api_uptime": "99.9%",
-                "response_time_ms": 150
+                "response_time_ms": 150,
+                "driver_pool": get_driver_pool().snapshot(),
+                "playwright_pool": get_playwright_pool().snapshot(),
+                "deal_cache": deal_cache.snapshot(),
+                "cache_warmer": cache_warmer.snapshot(),
+                "deal_enrichment": deal_enrichment.snapshot(),
+                "search_singleflight": get_singleflight_snapshot(),
+                "http_client": http_client.snapshot(),
+                "request_blocking": request_blocking.snapshot(),
+                "structured_data_fast_path": structured_data.snapshot(),
+                "location_sessions": location_sessions.snapshot(),
+                "browser_profiles": browser_profiles.snapshot(),
+                "scrape_scheduler": scrape_scheduler.snapshot(),
+                "circuit_breakers": get_breaker_snapshot(),
+                "scraper_telemetry": scraper_telemetry.snapshot()
             }
         }
         
@@ -1370,10 +1534,11 @@ async def get_live_monitoring(
 
 @app.get("/api/admin/scrapers/status")
 async def get_scraper_status(
+    window_hours: float = DEFAULT_WINDOW_HOURS,
     db: Session = Depends(get_db),
     payload: dict = Depends(get_admin_payload)
 ):
-    """Get scraper status"""
+    """Get scraper status with success rates and latencies over a rolling window"""
     if not check_admin_access(payload):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1381,18 +1546,33 @@ async def get_scraper_status(
         )
     
     scrapers = [
-        {"name": "Amazon", "key": "amazon", "enabled": True, "success_rate": 95, "avg_response_time": 2.5, "category": "all"},
-        {"name": "Flipkart", "key": "flipkart", "enabled": True, "success_rate": 92, "avg_response_time": 2.8, "category": "all"},
-        {"name": "Snapdeal", "key": "snapdeal", "enabled": True, "success_rate": 85, "avg_response_time": 3.2, "category": "fashion,general"},
-        {"name": "Croma", "key": "croma", "enabled": True, "success_rate": 88, "avg_response_time": 2.9, "category": "electronics"},
-        {"name": "Reliance Digital", "key": "reliance", "enabled": True, "success_rate": 86, "avg_response_time": 3.1, "category": "electronics"},
-        {"name": "Ajio", "key": "ajio", "enabled": True, "success_rate": 90, "avg_response_time": 2.7, "category": "fashion"}
+        {"name": "Amazon", "key": "amazon", "enabled": True, "category": "all"},
+        {"name": "Flipkart", "key": "flipkart", "enabled": True, "category": "all"},
+        {"name": "Snapdeal", "key": "snapdeal", "enabled": True, "category": "fashion,general"},
+        {"name": "Croma", "key": "croma", "enabled": True, "category": "electronics"},
+        {"name": "Reliance Digital", "key": "reliance", "enabled": True, "category": "electronics"},
+        {"name": "Ajio", "key": "ajio", "enabled": True, "category": "fashion"}
     ]
+
+    window_hours = min(max(window_hours, 0.1), 24 * 30)
+    window = scraper_telemetry.window_stats(window_hours, db=db)
+    for scraper in scrapers:
+        stats = window.get(scraper["key"])
+        scraper.update(stats or {"runs": 0, "success_rate": 0.0, "avg_response_time": 0.0,
+                                 "p50": 0.0, "p95": 0.0, "p99": 0.0})
+
+    # Weighted by runs so quiet scrapers don't skew the overall rate
+    total_runs = sum(s["runs"] for s in scrapers)
+    ok_runs = sum(s.get("outcomes", {}).get("ok", 0) for s in scrapers)
     
     return {
         "scrapers": scrapers,
         "total_enabled": len([s for s in scrapers if s["enabled"]]),
-        "overall_success_rate": round(sum(s["success_rate"] for s in scrapers) / len(scrapers), 1),
+        "overall_success_rate": round(ok_runs / total_runs * 100, 1) if total_runs else 0.0,
+        "total_runs": total_runs,
+        "window_hours": window_hours,
+        "scheduler": scrape_scheduler.snapshot(),
+        "circuit_breakers": get_breaker_snapshot(),
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -1424,7 +1604,7 @@ async def get_admin_settings(
             "auto_backup": "true",
             "backup_frequency": "daily",
             "maintenance_mode": "false",
-            "scraper_timeout": "30",
+            "scraper_timeout": f"{DEFAULT_SCRAPER_TIMEOUT:g}",
             "email_notifications": "true",
             "low_price_threshold": "0.1",
             "high_price_threshold": "0.2"
@@ -1576,25 +1756,18 @@ async def get_search_insights(
     top_users.sort(key=lambda x: x["total_searches"], reverse=True)
     
     # Search success rates (searches with prices found)
-    all_searches = db.query(models.ImageSearch).filter(
+    total_searches_period = db.query(models.ImageSearch).filter(
         models.ImageSearch.created_at >= start_date
-    ).all()
-    
-    successful_searches = 0
-    for search in all_searches:
-        if any([
-            search.amazon_price, search.flipkart_price, search.snapdeal_price,
-            search.croma_price, search.reliance_price, search.ajio_price
-        ]):
-            successful_searches += 1
+    ).count()
+    successful_searches = crud.count_searches_with_prices(db, "image", since=start_date)
     
-    success_rate = (successful_searches / len(all_searches) * 100) if all_searches else 0
+    success_rate = (successful_searches / total_searches_period * 100) if total_searches_period else 0
     
     return {
         "timeframe": timeframe,
         "top_users": top_users[:10],  # Top 10 users
         "success_rate": round(success_rate, 1),
-        "total_searches_period": len(all_searches),
+        "total_searches_period": total_searches_period,
         "successful_searches": successful_searches,
         "timestamp": datetime.utcnow().isoformat()
     }
@@ -1773,11 +1946,16 @@ async def clear_cache(
             detail="Admin access required"
         )
     
-    # In a real system, you would clear cache here
+    try:
+        cleared = deal_cache.clear(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error clearing cache: {str(e)}")
+
     return {
         "message": "Cache cleared successfully",
         "timestamp": datetime.utcnow().isoformat(),
-        "cleared_items": ["user_sessions", "search_results", "scraper_cache"]
+        "cleared_items": ["search_results"],
+        **cleared
     }
 
 
@@ -1847,6 +2025,34 @@ async def general_exception_handler(request: Request, exc: Exception):
 
 
 # ==================== APPLICATION STARTUP ====================
+
+def warm_playwright_browsers():
+    """Launch the long-lived Playwright browsers ahead of the first search"""
+    try:
+        get_playwright_pool().warm_up()
+        print("✅ Playwright browsers ready")
+    except Exception as e:
+        print(f"⚠️ Playwright warm-up failed, browsers will launch on first use: {e}")
+
+
+@app.on_event("startup")
+def start_scraper_browsers():
+    """Warm scraper browsers and start the deal cache warmer without blocking startup"""
+    if os.getenv("PLAYWRIGHT_WARMUP", "true").lower() == "true":
+        threading.Thread(target=warm_playwright_browsers, daemon=True).start()
+    cache_warmer.start()
+
+
+@app.on_event("shutdown")
+def shutdown_scraper_browsers():
+    """Quit pooled scraper browsers and HTTP sessions on shutdown"""
+    cache_warmer.stop()
+    deal_enrichment.stop()
+    scraper_telemetry.flush()
+    shutdown_driver_pool()
+    shutdown_playwright_pool()
+    http_client.close_sessions()
+
 @app.get("/health", tags=["Health"])
 async def health():
     """Health check for monitoring / deployment checks."""
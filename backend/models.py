@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, DateTime, ForeignKey,
-    Float, Boolean, LargeBinary, Text
+    Float, Boolean, LargeBinary, Text, Index
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -150,6 +150,58 @@ class SystemCache(Base):
         return f"<SystemCache(id={self.id}, key='{self.key}')>"
 
 
+class ScraperRun(Base):
+    __tablename__ = "scraper_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    site = Column(String, nullable=False, index=True)
+    outcome = Column(String, nullable=False)  # ok / no_results / irrelevant / timeout / exception
+    duration = Column(Float, nullable=False)  # seconds, excluding scheduler queue time
+    queued = Column(Float, default=0.0)
+    search_seconds = Column(Float, default=0.0)
+    detail_seconds = Column(Float, default=0.0)
+    candidates = Column(Integer, default=0)
+    query = Column(String, nullable=True)
+
+    created_at = Column(DateTime, nullable=False, index=True)  # time of the run (UTC), not of the flush
+
+    def __repr__(self):
+        return f"<ScraperRun(id={self.id}, site='{self.site}', outcome='{self.outcome}')>"
+
+
+class PriceObservation(Base):
+    """One site's price for a search; replaces the per-site *_price columns on searches."""
+    __tablename__ = "price_observations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    site = Column(String, nullable=False)
+    query = Column(String, nullable=False)  # normalized (deal_cache.normalize_query)
+    product_url = Column(Text, nullable=True)
+    title = Column(Text, nullable=True)
+    price = Column(Float, nullable=False)
+    original_price = Column(Float, nullable=True)  # MRP
+    pincode = Column(String, nullable=True)
+    in_stock = Column(Boolean, nullable=True)
+
+    # The search the price was shown for ("image" / "manual"), if any
+    search_type = Column(String, nullable=True)
+    search_id = Column(Integer, nullable=True)
+
+    observed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Latest price per site for a query: DISTINCT ON (site) ... ORDER BY site, observed_at DESC
+        Index("ix_price_observations_query_site_observed", "query", "site", "observed_at"),
+        # Price over time across sites, and time-windowed analytics
+        Index("ix_price_observations_query_observed", "query", "observed_at"),
+        Index("ix_price_observations_observed", "observed_at"),
+        Index("ix_price_observations_search", "search_type", "search_id"),
+    )
+
+    def __repr__(self):
+        return f"<PriceObservation(id={self.id}, site='{self.site}', query='{self.query}', price={self.price})>"
+
+
 class RateLimit(Base):
     __tablename__ = "rate_limits"
 
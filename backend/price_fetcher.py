@@ -1,14 +1,28 @@
+import asyncio
 import concurrent.futures
+import contextvars
+import os
 import re
-from typing import Dict, Any, Callable, List
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Callable, List, Optional, Tuple
 
 # --- IMPORT SCRAPERS ---
-from scraper.amazon_scraper import scrape_amazon_lowest_price
-from scraper.flipkart_scraper import scrape_flipkart
-from scraper.snapdeal_scraper import scrape_snapdeal
-from scraper.reliancedigital_scraper import scrape_reliance_digital_playwright
-from scraper.croma_scraper import scrape_croma
-from scraper.ajio_scraper import scrape_ajio
+from scraper.amazon_scraper import scrape_amazon_lowest_price, scrape_amazon_product
+from scraper.flipkart_scraper import scrape_flipkart, scrape_flipkart_product
+from scraper.snapdeal_scraper import scrape_snapdeal, scrape_snapdeal_product
+from scraper.reliancedigital_scraper import scrape_reliance_digital_playwright, scrape_reliance_digital_product
+from scraper.croma_scraper import scrape_croma, scrape_croma_product
+from scraper.ajio_scraper import scrape_ajio, scrape_ajio_product
+from scraper.scrape_context import ScrapeContext, use_context
+from deal_cache import deal_cache, normalize_query, CACHE_ENABLED
+from scrape_scheduler import (
+    scheduler, SchedulerRejected, PRIORITY_BACKGROUND, PRIORITY_ENRICHMENT, PRIORITY_INTERACTIVE
+)
+from scraper_telemetry import (
+    telemetry, OUTCOME_OK, OUTCOME_NO_RESULTS, OUTCOME_IRRELEVANT, OUTCOME_TIMEOUT, OUTCOME_EXCEPTION
+)
 
 # --- CATEGORY DEFINITIONS ---
 
@@ -128,72 +142,577 @@ def is_result_relevant(query: str, title: str) -> bool:
 
 # --- MAIN FETCHING LOGIC ---
 
-def get_top_deals_from_each_site(product: str, pincode: str = None):
+ALL_SITES = ['amazon', 'flipkart', 'snapdeal', 'croma', 'reliance', 'ajio']
+
+# Upper bound for each site's own run; the effective deadline is the smaller of
+# this and whatever is left of the global deadline.
+SITE_TIMEOUTS = {
+    'amazon': 25.0,
+    'flipkart': 30.0,
+    'snapdeal': 40.0,
+    'croma': 35.0,
+    'reliance': 40.0,
+    'ajio': 30.0,
+}
+
+# Global deadline used when the caller doesn't pass the `scraper_timeout` setting;
+# long enough that no site's own ceiling is cut short
+DEFAULT_SCRAPER_TIMEOUT = max(SITE_TIMEOUTS.values())
+
+# Per-site statuses reported alongside the results
+STATUS_OK = "ok"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+STATUS_SKIPPED = "skipped"
+STATUS_NO_RESULTS = "no_results"  # the site answered but had nothing matching the query
+
+# Kinds of site run: search + product page, search page only (preview), one product page (enrichment)
+RUN_FULL = "full"
+RUN_PREVIEW = "preview"
+RUN_DETAIL = "detail"
+
+# Product page scrapers used to enrich preview offers
+PRODUCT_SCRAPERS = {
+    'amazon': scrape_amazon_product,
+    'flipkart': scrape_flipkart_product,
+    'snapdeal': scrape_snapdeal_product,
+    'croma': scrape_croma_product,
+    'reliance': scrape_reliance_digital_product,
+    'ajio': scrape_ajio_product,
+}
+
+# Shared worker threads for the blocking scrapers (one pool per process, not per request)
+_scraper_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv("SCRAPER_MAX_THREADS", "16")),
+    thread_name_prefix="scraper"
+)
+
+
+# --- CIRCUIT BREAKERS & ADAPTIVE TIMEOUTS ---
+
+BREAKER_FAILURES = int(os.getenv("SCRAPER_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("SCRAPER_BREAKER_COOLDOWN", "120"))  # seconds, doubles per failed probe
+BREAKER_MAX_COOLDOWN = float(os.getenv("SCRAPER_BREAKER_MAX_COOLDOWN", "900"))
+
+# Adaptive deadline = p95 of recent runs * ADAPTIVE_FACTOR, kept between
+# ADAPTIVE_MIN_TIMEOUT and the site's SITE_TIMEOUTS ceiling. Timed-out runs count
+# at the deadline they hit; half-open probes and the run after a timeout get the
+# full ceiling, so a site that slowed down can raise its deadline again.
+ADAPTIVE_TIMEOUTS = os.getenv("SCRAPER_ADAPTIVE_TIMEOUTS", "true").lower() == "true"
+ADAPTIVE_MIN_SAMPLES = 10
+ADAPTIVE_FACTOR = 1.5
+ADAPTIVE_MIN_TIMEOUT = 8.0
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class SiteBreaker:
     """
-    Fetches the lowest price deal WITH FULL DETAILS from relevant platforms only.
-    Returns a dictionary with ALL scrapers that were attempted.
+    Circuit breaker for one site. Trips after BREAKER_FAILURES consecutive
+    failed runs (timeouts, errors), skips the site for a cool-down,
+    then lets a single half-open probe through: success closes the breaker,
+    failure re-opens it with a doubled cool-down.
     """
-    results = {}
-    
+
+    def __init__(self, site: str):
+        self.site = site
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.cooldown = BREAKER_COOLDOWN
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.durations = deque(maxlen=50)
+        self.last_timed_out = False
+        self.stats = {"runs": 0, "failures": 0, "trips": 0, "skipped": 0}
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a run may start now; claims the probe when half-open."""
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return True
+            if self.state == BREAKER_OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = BREAKER_HALF_OPEN
+            if self.state == BREAKER_HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                print(f"🔌 {self.site.capitalize()}: half-open, sending probe")
+                return True
+            self.stats["skipped"] += 1
+            return False
+
+    def retry_in(self) -> float:
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def record(self, ok: bool, duration: Optional[float] = None, timed_out: bool = False):
+        with self._lock:
+            self.stats["runs"] += 1
+            self.probe_in_flight = False
+            self.last_timed_out = timed_out
+            if timed_out and duration is not None:
+                self.durations.append(duration)
+            if ok:
+                if duration is not None:
+                    self.durations.append(duration)
+                if self.state != BREAKER_CLOSED:
+                    print(f"🔌 {self.site.capitalize()}: probe succeeded, circuit closed")
+                self.state = BREAKER_CLOSED
+                self.failures = 0
+                self.cooldown = BREAKER_COOLDOWN
+                return
+
+            self.stats["failures"] += 1
+            self.failures += 1
+            if self.state == BREAKER_HALF_OPEN:
+                self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+            if self.state == BREAKER_HALF_OPEN or self.failures >= BREAKER_FAILURES:
+                self.state = BREAKER_OPEN
+                self.opened_at = time.monotonic()
+                self.stats["trips"] += 1
+                print(f"🔌 {self.site.capitalize()}: circuit open for {self.cooldown:.0f}s "
+                      f"after {self.failures} consecutive failures")
+
+    def abandon(self):
+        """The run was cancelled before it finished; it counts neither way."""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def timeout(self, ceiling: float) -> float:
+        """Deadline for the next run: adapted from recent latencies, capped by `ceiling`."""
+        with self._lock:
+            samples = sorted(self.durations)
+            fixed = self.state != BREAKER_CLOSED or self.last_timed_out
+        if fixed or not ADAPTIVE_TIMEOUTS or len(samples) < ADAPTIVE_MIN_SAMPLES:
+            return ceiling
+        p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+        return round(min(ceiling, max(ADAPTIVE_MIN_TIMEOUT, p95 * ADAPTIVE_FACTOR)), 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self.durations)
+            snap = {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "cooldown": self.cooldown,
+                "retry_in": round(self.retry_in(), 1) if self.state == BREAKER_OPEN else 0.0,
+                "p50": round(samples[len(samples) // 2], 2) if samples else None,
+                **self.stats,
+            }
+        snap["timeout"] = self.timeout(SITE_TIMEOUTS.get(self.site, DEFAULT_SCRAPER_TIMEOUT))
+        return snap
+
+
+_breakers = {site: SiteBreaker(site) for site in ALL_SITES}
+
+
+def get_breaker(site: str) -> SiteBreaker:
+    if site not in _breakers:
+        _breakers[site] = SiteBreaker(site)
+    return _breakers[site]
+
+
+def get_breaker_snapshot() -> Dict[str, Dict[str, Any]]:
+    return {site: breaker.snapshot() for site, breaker in _breakers.items()}
+
+
+def is_empty_result(error: Optional[str]) -> bool:
+    """True if a scraper's error only says the search found nothing."""
+    error = (error or "").lower()
+    return "no results" in error or "no products" in error
+
+
+def run_scraper(site_name: str, scraper_func: Callable, product: str, pincode: str = None, **options):
+    """
+    Runs one scraper synchronously and validates its result.
+    Extra options (e.g. preview=True) are passed through to the scraper.
+    Returns (data, error) where exactly one of them is set.
+    """
+    print(f"🔍 Scraping {site_name.capitalize()} for: {product}")
+
+    # Call scraper
+    data = scraper_func(query=product, pincode=pincode, headless=True, **options)
+
+    # Validate Result
+    if data and not data.get('error') and data.get('price'):
+        if not is_result_relevant(product, data.get('title', '')):
+            print(f"⚠️ {site_name.capitalize()}: Found result '{data.get('title')[:30]}...' but might be irrelevant.")
+
+        print(f"✅ {site_name.capitalize()}: Found product at ₹{data.get('price', 0):,}")
+        return data, None
+
+    # Handle empty results
+    err = data.get('error') if data else 'No results found'
+    print(f"⚠️ {site_name.capitalize()}: {err}")
+    return None, err
+
+
+def _run_outcome(status: Dict[str, Any], data: Optional[Dict[str, Any]], product: str) -> str:
+    """Telemetry outcome category for a finished site run."""
+    if status["status"] == STATUS_TIMEOUT:
+        return OUTCOME_TIMEOUT
+    if status["status"] == STATUS_OK:
+        if not is_result_relevant(product, data.get('title', '')):
+            return OUTCOME_IRRELEVANT
+        return OUTCOME_OK
+    if status["status"] == STATUS_NO_RESULTS:
+        return OUTCOME_NO_RESULTS
+    return OUTCOME_EXCEPTION
+
+
+async def _run_site(site_name: str, scraper_func: Callable, product: str, pincode: Optional[str],
+                    timeout: float, priority: int = PRIORITY_INTERACTIVE, mode: str = RUN_FULL,
+                    **options) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Runs a scraper on the shared executor under its own deadline.
+    The scraper first waits for a scheduler slot; queue time counts against the deadline.
+    On timeout the site's ScrapeContext is cancelled, which quits its leased browser.
+    Sites whose circuit breaker is open are skipped without scraping.
+    Every full run that reaches a scraper is recorded in scraper_telemetry; preview
+    and detail runs count towards the breaker but not the latency statistics.
+    """
+    breaker = get_breaker(site_name)
+    if not breaker.allow():
+        return None, {"status": STATUS_SKIPPED, "elapsed": 0.0,
+                      "detail": f"Circuit open after repeated failures, retry in {breaker.retry_in():.0f}s"}
+
+    started = time.monotonic()
+    try:
+        queued = await scheduler.acquire(site_name, priority, timeout=timeout)
+    except SchedulerRejected as e:
+        breaker.abandon()
+        print(f"🚦 {site_name.capitalize()}: {e}")
+        return None, {"status": STATUS_SKIPPED, "detail": str(e), "elapsed": 0.0}
+    except asyncio.TimeoutError:
+        breaker.abandon()
+        print(f"🚦 {site_name.capitalize()}: no scraper slot within {timeout:.0f}s")
+        return None, {"status": STATUS_TIMEOUT, "detail": f"Queued {timeout:.0f}s without a free scraper slot",
+                      "elapsed": round(time.monotonic() - started, 2)}
+    except asyncio.CancelledError:
+        breaker.abandon()
+        raise
+
+    remaining = max(1.0, timeout - queued)
+    ctx = ScrapeContext(site_name, timeout=remaining)
+
+    def call():
+        with use_context(ctx):
+            return run_scraper(site_name, scraper_func, product, pincode, **options)
+
+    # The slot is held until the worker thread really finishes, even after a timeout
+    job = _scraper_executor.submit(contextvars.copy_context().run, call)
+    job.add_done_callback(lambda _: scheduler.release(site_name))
+    future = asyncio.wrap_future(job)
+    try:
+        data, err = await asyncio.wait_for(future, timeout=remaining)
+        status = {"status": STATUS_OK if data else STATUS_NO_RESULTS if is_empty_result(err) else STATUS_ERROR}
+        if err:
+            status["detail"] = err
+    except asyncio.TimeoutError:
+        ctx.cancel()
+        data = None
+        status = {"status": STATUS_TIMEOUT, "detail": f"No result within {timeout:.0f}s"}
+        print(f"⏱️ {site_name.capitalize()}: timed out after {timeout:.0f}s")
+    except asyncio.CancelledError:
+        ctx.cancel()
+        breaker.abandon()
+        raise
+    except Exception as e:
+        ctx.cancel()
+        data = None
+        status = {"status": STATUS_ERROR, "detail": str(e)}
+        print(f"❌ {site_name.capitalize()} error: {str(e)}")
+
+    duration = time.monotonic() - started - queued
+    timed_out = status["status"] == STATUS_TIMEOUT
+    # An empty search shows the site works, but says nothing about its latency
+    empty = status["status"] == STATUS_NO_RESULTS
+    ok = status["status"] == STATUS_OK or empty
+    if mode == RUN_FULL:
+        breaker.record(ok, None if empty else duration, timed_out=timed_out)
+        detail_seconds = min(ctx.metrics["detail_seconds"], duration)
+        telemetry.record(site_name, _run_outcome(status, data, product), duration, queued=queued,
+                         search_seconds=duration - detail_seconds, detail_seconds=detail_seconds,
+                         candidates=ctx.metrics["candidates"], query=normalize_query(product))
+    else:
+        breaker.record(ok, timed_out=timed_out)
+    status["elapsed"] = round(time.monotonic() - started, 2)
+    status["queued"] = round(queued, 2)
+    status["idle"] = round(ctx.metrics["idle_seconds"], 2)
+    status["waits"] = ctx.metrics["waits"]
+    if ctx.metrics["scrolls"] or ctx.metrics["scrolls_saved"]:
+        status["scrolls"] = ctx.metrics["scrolls"]
+        status["scrolls_saved"] = ctx.metrics["scrolls_saved"]
+        status["scroll_seconds_saved"] = round(ctx.metrics["scroll_seconds_saved"], 2)
+        print(f"🖱️ {site_name.capitalize()}: {status['scrolls']} scrolls, {status['scrolls_saved']} skipped "
+              f"(~{status['scroll_seconds_saved']}s saved)")
+    if ctx.metrics.get("blocked_requests"):
+        status["blocked_requests"] = ctx.metrics["blocked_requests"]
+        status["blocked_kb_est"] = round(ctx.metrics["blocked_bytes_est"] / 1024)
+    print(f"⏳ {site_name.capitalize()}: {status['idle']}s idle over {status['waits']} waits "
+          f"({status['elapsed']}s total)")
+    return data, status
+
+
+def _empty_site_status() -> Dict[str, Dict[str, Any]]:
+    return {site: {"status": STATUS_SKIPPED, "detail": "Not relevant for this category"} for site in ALL_SITES}
+
+
+async def _scrape_deals(product: str, pincode: str = None, timeout: Optional[float] = None,
+                        use_cache: bool = CACHE_ENABLED, priority: int = PRIORITY_INTERACTIVE,
+                        preview: bool = False, refresh_within: float = 0):
+    """
+    Runs the scrapers relevant to the query concurrently and yields
+    (site, data, status) for each site as soon as that site finishes.
+
+    Sites with a cached result (see deal_cache) are yielded first without
+    scraping, unless it expires within `refresh_within` seconds; fresh
+    successful results are written back to the cache.
+
+    Every site gets its own deadline (adapted from its recent latencies, at
+    most SITE_TIMEOUTS, capped by the global `timeout`). Sites that miss it are cancelled and yielded with a "timeout"
+    status. If the consumer stops iterating, the remaining sites are cancelled.
+    Sites wait for a scrape_scheduler slot at `priority`; a site refused by a
+    full queue is yielded as "skipped".
+
+    With preview=True the scrapers stop at the search page and yield listing
+    offers marked "preview" (see enrich_deal). Cached full results are still
+    served, but previews are never written to the cache.
+    """
+    timeout = timeout or DEFAULT_SCRAPER_TIMEOUT
+
     # 1. Get the list of relevant scrapers based on category
     selected_scrapers = get_scrapers_for_query(product)
     print(f"🚀 Activating scrapers: {', '.join(selected_scrapers.keys()).upper()}")
-    
-    # 2. Initialize results dict with all possible scrapers
-    all_possible_sites = ['amazon', 'flipkart', 'snapdeal', 'croma', 'reliance', 'ajio']
-    for site in all_possible_sites:
-        results[site] = None  # Initialize all to None
 
-    # 3. Define the wrapper function for threading
-    def run_scraper(site_name, scraper_func):
-        try:
-            print(f"🔍 Scraping {site_name.capitalize()} for: {product}")
-            
-            # Call scraper
-            data = scraper_func(query=product, pincode=pincode, headless=True)
-            
-            # Validate Result
-            if data and not data.get('error') and data.get('price'):
-                if not is_result_relevant(product, data.get('title', '')):
-                     print(f"⚠️ {site_name.capitalize()}: Found result '{data.get('title')[:30]}...' but might be irrelevant.")
-                
-                print(f"✅ {site_name.capitalize()}: Found product at ₹{data.get('price', 0):,}")
-                return (site_name, data)
-            
-            # Handle empty results
-            err = data.get('error') if data else 'No results found'
-            print(f"⚠️ {site_name.capitalize()}: {err}")
-            return (site_name, None)
-            
-        except Exception as e:
-            print(f"❌ {site_name.capitalize()} error: {str(e)}")
-            return (site_name, None)
-
-    # 4. Run in parallel only for selected scrapers
     print(f"\n{'='*60}")
-    print(f"🚀 Starting parallel scraping for: {product}")
+    print(f"🚀 Starting parallel {'preview ' if preview else ''}scraping for: {product} (deadline {timeout:.0f}s)")
     if pincode:
         print(f"📍 Using pincode: {pincode}")
     print(f"{'='*60}\n")
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=len(selected_scrapers)) as executor:
-        futures = []
-        for site, func in selected_scrapers.items():
-            futures.append(executor.submit(run_scraper, site, func))
-        
-        for future in concurrent.futures.as_completed(futures):
-            try:
-                site, data = future.result()
-                results[site] = data
-            except Exception as e:
-                print(f"❌ Error in thread execution: {str(e)}")
-    
+
+    loop = asyncio.get_running_loop()
+    successful_sites = 0
+
+    # 2. Serve whatever is still cached
+    cached = {}
+    if use_cache:
+        cached = await loop.run_in_executor(None, deal_cache.get_many, product, pincode, list(selected_scrapers),
+                                            refresh_within)
+        for site, data in cached.items():
+            print(f"💾 {site.capitalize()}: served from cache at ₹{data.get('price', 0):,}")
+            successful_sites += 1
+            yield site, data, {"status": STATUS_OK, "cached": True, "elapsed": 0.0}
+
+    # 3. Run the remaining scrapers, each under min(site timeout, global deadline)
+    options = {"mode": RUN_PREVIEW, "preview": True} if preview else {}
+    tasks = {
+        asyncio.ensure_future(
+            _run_site(site, func, product, pincode,
+                      min(get_breaker(site).timeout(SITE_TIMEOUTS.get(site, timeout)), timeout), priority,
+                      **options)
+        ): site
+        for site, func in selected_scrapers.items() if site not in cached
+    }
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                site = tasks[task]
+                data, status = task.result()
+                if data is not None:
+                    successful_sites += 1
+                    if use_cache and not preview:
+                        loop.run_in_executor(None, deal_cache.put, product, pincode, site, data)
+                yield site, data, status
+    finally:
+        for task in pending:
+            task.cancel()
+
     # Summary
-    successful_sites = sum(1 for v in results.values() if v is not None)
     print(f"\n{'='*60}")
     print(f"🎯 Scraping complete. Results: {successful_sites}/{len(selected_scrapers)} sites found products")
     print(f"{'='*60}\n")
-    
+
+
+# --- SINGLE-FLIGHT ---
+
+class _InFlightSearch:
+    """
+    One running scrape shared by every caller searching the same key.
+    Events are recorded so late subscribers replay what already happened.
+    """
+
+    def __init__(self, key: Tuple):
+        self.key = key
+        self.events: List[Tuple[str, Any, Dict[str, Any]]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _forget(self):
+        if _in_flight.get(self.key) is self:
+            del _in_flight[self.key]
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def produce(self, product: str, pincode: Optional[str], timeout: Optional[float], use_cache: bool,
+                      priority: int, preview: bool = False):
+        try:
+            async for event in _scrape_deals(product, pincode, timeout=timeout, use_cache=use_cache,
+                                             priority=priority, preview=preview):
+                self.events.append(event)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._forget()
+            self._notify()
+
+    async def subscribe(self):
+        self.subscribers += 1
+        position = 0
+        try:
+            while True:
+                while position < len(self.events):
+                    yield self.events[position]
+                    position += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            # Nobody is listening any more: stop the browsers
+            if self.subscribers == 0 and not self.done and self.task is not None:
+                self._forget()
+                self.task.cancel()
+
+
+_in_flight: Dict[Tuple, _InFlightSearch] = {}
+singleflight_stats = {"scrapes_started": 0, "callers_coalesced": 0}
+
+
+async def iter_deals(product: str, pincode: str = None, timeout: Optional[float] = None,
+                     use_cache: bool = CACHE_ENABLED, priority: int = PRIORITY_INTERACTIVE,
+                     preview: bool = False):
+    """
+    Yields (site, data, status) for each relevant site as soon as it finishes.
+    With preview=True only the search pages are read (see _scrape_deals).
+
+    Concurrent callers for the same (normalized query, pincode, preview) share a single
+    scrape: the first caller starts it and later callers attach to it,
+    receiving the events seen so far followed by the rest as they arrive.
+    The scrape is cancelled once every caller has stopped listening, and keeps
+    the scheduler priority of the caller that started it.
+    """
+    loop = asyncio.get_running_loop()
+    key = (id(loop), normalize_query(product), pincode or None, use_cache, preview)
+
+    flight = _in_flight.get(key)
+    if flight is None:
+        flight = _InFlightSearch(key)
+        _in_flight[key] = flight
+        flight.task = asyncio.ensure_future(flight.produce(product, pincode, timeout, use_cache, priority, preview))
+        singleflight_stats["scrapes_started"] += 1
+    else:
+        singleflight_stats["callers_coalesced"] += 1
+        print(f"🔗 Joining in-flight search for: {product}")
+
+    async for event in flight.subscribe():
+        yield event
+
+
+def get_singleflight_snapshot() -> Dict[str, Any]:
+    return {"in_flight": len(_in_flight), **singleflight_stats}
+
+
+async def gather_deals(product: str, pincode: str = None, timeout: Optional[float] = None,
+                       use_cache: bool = CACHE_ENABLED, priority: int = PRIORITY_INTERACTIVE,
+                       preview: bool = False):
+    """
+    Waits for every relevant scraper (see iter_deals) and collects the results.
+
+    Returns (results, site_status): results maps every site to its deal or None,
+    site_status maps every site to {"status": ok|timeout|error|skipped, ...}.
+    """
+    results: Dict[str, Any] = {site: None for site in ALL_SITES}
+    site_status = _empty_site_status()
+
+    async for site, data, status in iter_deals(product, pincode, timeout=timeout, use_cache=use_cache,
+                                               priority=priority, preview=preview):
+        results[site] = data
+        site_status[site] = status
+
+    return results, site_status
+
+
+async def warm_deals(product: str, pincode: str = None, timeout: Optional[float] = None,
+                     refresh_within: float = 0, expiring_only: bool = False) -> int:
+    """
+    Refreshes the deal cache for one query at background priority.
+
+    Only sites whose cached result is missing, expired or expiring within
+    `refresh_within` seconds are scraped; results are written to deal_cache as
+    usual. With expiring_only the query is left alone unless one of its cached
+    results is about to expire, so warm entries stay warm without cold ones
+    being filled. Runs outside single-flight so user searches never inherit
+    background priority. Returns the number of sites that actually ran a scraper.
+    """
+    if expiring_only:
+        sites = list(get_scrapers_for_query(product))
+        left = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: [deal_cache.expires_in(product, pincode, site) for site in sites])
+        if not any(seconds is not None and seconds < refresh_within for seconds in left):
+            return 0
+
+    scraped = 0
+    async for _, _, status in _scrape_deals(product, pincode, timeout=timeout, use_cache=True,
+                                            priority=PRIORITY_BACKGROUND, refresh_within=refresh_within):
+        if not status.get("cached") and status["status"] != STATUS_SKIPPED:
+            scraped += 1
+    return scraped
+
+
+async def enrich_deal(site: str, product: str, product_url: str, pincode: str = None,
+                      timeout: Optional[float] = None, priority: int = PRIORITY_ENRICHMENT):
+    """
+    Reads the product page behind a preview offer for rating, delivery and specs.
+
+    Runs like any site scrape (breaker, scheduler slot, deadline) at enrichment
+    priority. Returns (data, status); a successful result is cached as the
+    site's full deal for the query.
+    """
+    detail_scraper = PRODUCT_SCRAPERS[site]
+
+    def scrape_product(query: str, pincode: str = None, headless: bool = True):
+        return detail_scraper(product_url, pincode=pincode, headless=headless)
+
+    ceiling = get_breaker(site).timeout(SITE_TIMEOUTS.get(site, DEFAULT_SCRAPER_TIMEOUT))
+    data, status = await _run_site(site, scrape_product, product, pincode, min(timeout or ceiling, ceiling),
+                                   priority, mode=RUN_DETAIL)
+    if data is not None and CACHE_ENABLED:
+        asyncio.get_running_loop().run_in_executor(None, deal_cache.put, product, pincode, site, data)
+    return data, status
+
+
+def get_top_deals_from_each_site(product: str, pincode: str = None, timeout: Optional[float] = None):
+    """
+    Fetches the lowest price deal WITH FULL DETAILS from relevant platforms only.
+    Returns a dictionary with ALL scrapers that were attempted.
+    Synchronous wrapper around gather_deals() for callers outside an event loop.
+    """
+    results, _ = asyncio.run(gather_deals(product, pincode, timeout=timeout))
     return results
 
 def get_best_deal(product: str, pincode: str = None):
@@ -218,7 +737,13 @@ def get_all_deals_structured(product: str, pincode: str = None):
     Get all deals in a structured format for API/UI consumption.
     """
     results = get_top_deals_from_each_site(product, pincode)
-    
+    return structure_deals(product, pincode, results)
+
+
+def structure_deals(product: str, pincode: Optional[str], results: Dict[str, Any]):
+    """
+    Builds the best deal / price range summary from per-site results.
+    """
     # Filter out None values
     valid_results = [(site, data) for site, data in results.items() if data is not None]
     best_site, best_data = None, None
@@ -246,4 +771,4 @@ def get_all_deals_structured(product: str, pincode: str = None):
                 "max": max(prices) if prices else 0
             }
         }
-    }
\ No newline at end of file
+    }
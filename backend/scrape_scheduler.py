@@ -0,0 +1,198 @@
+"""
+ShopThrone - Scrape Scheduler
+Process-wide admission control for scraper jobs.
+
+Every site scrape needs a slot before it may start a browser. Slots are bounded
+per site and in total, so concurrent searches queue instead of multiplying
+Chrome instances. Waiting jobs are served by priority (lower value first), then
+in arrival order:
+
+    wait = await scheduler.acquire("croma", PRIORITY_INTERACTIVE, timeout=30)
+    try:
+        ...scrape...
+    finally:
+        scheduler.release("croma")
+
+When the queue is too deep new jobs are rejected instead of piling up:
+background jobs (cache warming, preview enrichment) are shed once
+SCRAPER_QUEUE_DEGRADE jobs are waiting, interactive ones at SCRAPER_QUEUE_MAX.
+Callers report a rejected site as skipped and return the other sites' results.
+
+State is guarded by a thread lock, so callers on different event loops (e.g.
+the sync wrapper's asyncio.run) share the same slots.
+"""
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# ---------- Config ----------
+TOTAL_SLOTS = int(os.getenv("SCRAPER_TOTAL_SLOTS", "6"))
+DEFAULT_SITE_SLOTS = int(os.getenv("SCRAPER_SITE_SLOTS", "2"))
+QUEUE_MAX = int(os.getenv("SCRAPER_QUEUE_MAX", "48"))
+QUEUE_DEGRADE = int(os.getenv("SCRAPER_QUEUE_DEGRADE", "12"))
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_ENRICHMENT = 5  # product pages behind preview offers; shed with background jobs
+PRIORITY_BACKGROUND = 10
+
+
+def site_slots(site: str) -> int:
+    return int(os.getenv(f"SCRAPER_SLOTS_{site.upper()}", DEFAULT_SITE_SLOTS))
+
+
+class SchedulerRejected(Exception):
+    """Raised when a job is refused because the queue is too deep."""
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "site", "future", "loop", "enqueued_at", "granted", "abandoned")
+
+    def __init__(self, priority: int, seq: int, site: str, future: asyncio.Future, loop):
+        self.priority = priority
+        self.seq = seq
+        self.site = site
+        self.future = future
+        self.loop = loop
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.abandoned = False
+
+
+class ScrapeScheduler:
+    """Bounded per-site / total scraper slots with a priority queue."""
+
+    def __init__(self, total_slots: int = TOTAL_SLOTS, queue_max: int = QUEUE_MAX,
+                 queue_degrade: int = QUEUE_DEGRADE):
+        self.total_slots = total_slots
+        self.queue_max = queue_max
+        self.queue_degrade = queue_degrade
+        self._lock = threading.Lock()
+        self._in_use: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._recent_waits = deque(maxlen=500)
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0, "queue_timeouts": 0}
+
+    # ---------- Slot book-keeping (call with the lock held) ----------
+    def _total_in_use(self) -> int:
+        return sum(self._in_use.values())
+
+    def _can_run(self, site: str) -> bool:
+        return self._total_in_use() < self.total_slots and self._in_use.get(site, 0) < site_slots(site)
+
+    def _grant(self, site: str):
+        self._in_use[site] = self._in_use.get(site, 0) + 1
+        self.stats["admitted"] += 1
+
+    def _dispatch(self):
+        """Hand freed slots to the best waiting jobs that can run."""
+        self._waiters = [w for w in self._waiters if not w.abandoned]
+        self._waiters.sort(key=lambda w: (w.priority, w.seq))
+        for waiter in list(self._waiters):
+            if self._total_in_use() >= self.total_slots:
+                break
+            if not self._can_run(waiter.site):
+                continue
+            self._waiters.remove(waiter)
+            try:
+                waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+            except RuntimeError:
+                # The waiter's event loop is gone
+                continue
+            self._grant(waiter.site)
+            waiter.granted = True
+
+    # ---------- Public API ----------
+    async def acquire(self, site: str, priority: int = PRIORITY_INTERACTIVE,
+                      timeout: Optional[float] = None) -> float:
+        """Wait for a slot for `site`; returns the seconds spent queued.
+
+        Raises SchedulerRejected when the queue is full and asyncio.TimeoutError
+        if no slot frees up within `timeout`.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            queued_ahead = any(w.site == site and w.priority <= priority and not w.abandoned
+                               for w in self._waiters)
+            if self._can_run(site) and not queued_ahead:
+                self._grant(site)
+                self._recent_waits.append(0.0)
+                return 0.0
+
+            depth = sum(1 for w in self._waiters if not w.abandoned)
+            limit = self.queue_max if priority <= PRIORITY_INTERACTIVE else self.queue_degrade
+            if depth >= limit:
+                self.stats["rejected"] += 1
+                raise SchedulerRejected(f"Scraper queue full ({depth} waiting)")
+
+            waiter = _Waiter(priority, next(self._seq), site, loop.create_future(), loop)
+            self._waiters.append(waiter)
+            self.stats["queued"] += 1
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                if waiter.granted:
+                    # The slot was handed over as we gave up: pass it on
+                    self._release(site)
+                else:
+                    waiter.abandoned = True
+                if isinstance(e, asyncio.TimeoutError):
+                    self.stats["queue_timeouts"] += 1
+            raise
+
+        waited = time.monotonic() - waiter.enqueued_at
+        with self._lock:
+            self._recent_waits.append(waited)
+        return waited
+
+    def _release(self, site: str):
+        self._in_use[site] = max(0, self._in_use.get(site, 0) - 1)
+        self._dispatch()
+
+    def release(self, site: str):
+        with self._lock:
+            self._release(site)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waiting = [w for w in self._waiters if not w.abandoned]
+            now = time.monotonic()
+            waits = sorted(self._recent_waits)
+            by_site: Dict[str, Dict[str, int]] = {}
+            for site, used in self._in_use.items():
+                by_site[site] = {"in_use": used, "slots": site_slots(site), "queued": 0}
+            for w in waiting:
+                by_site.setdefault(w.site, {"in_use": 0, "slots": site_slots(w.site), "queued": 0})["queued"] += 1
+            return {
+                "total_slots": self.total_slots,
+                "slots_in_use": self._total_in_use(),
+                "queue_depth": len(waiting),
+                "queue_max": self.queue_max,
+                "queue_degrade": self.queue_degrade,
+                "oldest_wait_ms": round(max((now - w.enqueued_at for w in waiting), default=0.0) * 1000),
+                "wait_p50_ms": _percentile_ms(waits, 0.50),
+                "wait_p95_ms": _percentile_ms(waits, 0.95),
+                "sites": by_site,
+                **self.stats,
+            }
+
+
+def _percentile_ms(sorted_values: List[float], q: float) -> int:
+    if not sorted_values:
+        return 0
+    return round(sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))] * 1000)
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(True)
+
+
+scheduler = ScrapeScheduler()
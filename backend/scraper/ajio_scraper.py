@@ -1,15 +1,14 @@
 
 import re
-import time
 import json
 from typing import Dict, Any, List, Optional
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+
+from scraper.common_utils import count_tiles, first_valid_in_tabs, listing_offer, scroll_until_loaded, wait_for_selector
+from scraper.driver_pool import lease_driver
+from scraper.scrape_context import measure_detail
+from scraper.site_urls import site_url
+from scraper.structured_data import apply_fast_path
 
 # ---------- Config ----------
 PLACEHOLDER_IMAGE = "https://placehold.co/300x400/EEE/31343C?text=No+Image"
@@ -36,21 +35,6 @@ def make_empty_details(product_url: str) -> Dict[str, Any]:
         "seller": "", "in_stock": False, "sizes": [], "colors": []
     }
 
-def setup_driver(headless: bool = True, window_size: str = "1920,1080"):
-    chrome_options = Options()
-    if headless:
-        chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument(f"--window-size={window_size}")
-    ua = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    chrome_options.add_argument(f"--user-agent={ua}")
-    
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-    return driver
-
 # ---------- Product extraction ----------
 def extract_products_from_search(driver) -> List[Dict[str, Any]]:
     products = []
@@ -114,17 +98,19 @@ def extract_products_from_search(driver) -> List[Dict[str, Any]]:
     
     return products
 
-def get_product_details(driver, product_url: str, pincode: Optional[str] = None) -> Optional[Dict[str, Any]]:
+def get_product_details(driver, product_url: str, pincode: Optional[str] = None,
+                        navigate: bool = True) -> Optional[Dict[str, Any]]:
     details = make_empty_details(product_url)
     try:
-        driver.get(product_url)
+        if navigate:
+            driver.get(product_url)
         # Wait specifically for the PRICE element, ensuring page load
-        try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "prod-sp"))
-            )
-        except:
-            time.sleep(3) # Fallback wait
+        wait_for_selector(driver, ".prod-sp", timeout=10)
+
+        # JSON-LD / embedded state first
+        if apply_fast_path("ajio", details, driver.page_source, pincode):
+            details["seller"] = "AJIO"
+            return details
 
         # Title
         try:
@@ -154,63 +140,78 @@ def get_product_details(driver, product_url: str, pincode: Optional[str] = None)
         return None
 
 # ---------- Main scraper ----------
-def scrape_ajio(query: str, pincode: Optional[str] = None, headless: bool = True, max_scrolls: int = 8) -> Optional[Dict[str, Any]]:
-    driver = None
+def scrape_ajio_product(product_url: str, pincode: Optional[str] = None, headless: bool = True) -> Optional[Dict[str, Any]]:
+    """Full details for one product URL (used to enrich a preview offer)."""
+    try:
+        with lease_driver("ajio", headless=headless) as driver, measure_detail():
+            details = get_product_details(driver, product_url, pincode)
+        return details if details and details['price'] > 0 else None
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
+def scrape_ajio(query: str, pincode: Optional[str] = None, headless: bool = True, max_scrolls: int = 8,
+                preview: bool = False, max_products: int = 40) -> Optional[Dict[str, Any]]:
     try:
-        driver = setup_driver(headless=headless)
-        search_q = query.replace(" ", "%20")
-        search_url = f"https://www.ajio.com/search/?text={search_q}"
+        with lease_driver("ajio", headless=headless) as driver:
+            search_q = query.replace(" ", "%20")
+            search_url = site_url("ajio", f"/search/?text={search_q}")
         
-        print(f"Searching AJIO: {search_url}")
-        driver.get(search_url)
+            print(f"Searching AJIO: {search_url}")
+            driver.get(search_url)
         
-        # FIX 1: Wait for specific product container, not just body
-        try:
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".item, .rilrtl-product"))
-            )
-        except:
-            print("⚠️ Timeout waiting for products grid")
+            # FIX 1: Wait for specific product container, not just body
+            product_tile = ".item, .rilrtl-product"
+            if not wait_for_selector(driver, product_tile, timeout=20):
+                print("⚠️ Timeout waiting for products grid")
         
-        # Scroll logic
-        for _ in range(max_scrolls):
-            driver.execute_script("window.scrollBy(0, 1000);")
-            time.sleep(0.5)
+            # Scroll until max_products tiles are listed to pick the cheapest from, or no more load
+            scroll_until_loaded(lambda: driver.execute_script("window.scrollBy(0, 1000);"),
+                                lambda: count_tiles(driver, product_tile), max_products, max_scrolls,
+                                timeout=2, settle=0.3)
         
-        raw_products = extract_products_from_search(driver)
+            raw_products = extract_products_from_search(driver)
         
-        if not raw_products:
-            return None
+            if not raw_products:
+                return None
             
-        # Clean and Sort
-        valid_products = []
-        for p in raw_products:
-            price = clean_price_text(p['price_text'])
-            # FIX 2: Filter out 0 price items (Sidebar elements often have no price)
-            if price > 50: 
-                p['price_val'] = price
-                valid_products.append(p)
-
-        # Sort by price in ascending order to find the lowest price
-        sorted_products = sorted(valid_products, key=lambda x: x['price_val'])
-
-        # Check candidates
-        for candidate in sorted_products[:10]:
-            print(f"Checking: {candidate['title']} @ {candidate['price_val']}")
-            details = get_product_details(driver, candidate['url'], pincode)
-            if details and details['price'] > 0:
+            # Clean and Sort
+            valid_products = []
+            for p in raw_products:
+                price = clean_price_text(p['price_text'])
+                # FIX 2: Filter out 0 price items (Sidebar elements often have no price)
+                if price > 50: 
+                    p['price_val'] = price
+                    valid_products.append(p)
+
+            # Sort by price in ascending order to find the lowest price
+            sorted_products = sorted(valid_products, key=lambda x: x['price_val'])
+
+            # Preview: the cheapest listing, product page left for enrichment
+            if preview:
+                if not sorted_products:
+                    return None
+                first = sorted_products[0]
+                return listing_offer(make_empty_details(first['url']), first['title'], first['price_val'], first['image'])
+
+            # Check candidates, loading the next few in parallel tabs
+            def fetch(driver, candidate):
+                print(f"Checking: {candidate['title']} @ {candidate['price_val']}")
+                return get_product_details(driver, candidate['url'], pincode, navigate=False)
+
+            candidate, details = first_valid_in_tabs(
+                driver, "ajio", sorted_products[:10], fetch,
+                accept=lambda details: bool(details and details['price'] > 0),
+            )
+            if details:
                 # Ensure we have an image
                 if not details['image'] or "placeholder" in details['image']:
                     details['image'] = candidate['image']
-                return details
-
-        return None
+            return details
 
     except Exception as e:
         print(f"Error: {e}")
         return None
-    finally:
-        if driver: driver.quit()
 
 # ... (Keep your print_result and main block) ...
 if __name__ == "__main__":
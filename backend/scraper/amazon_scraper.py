@@ -1,14 +1,17 @@
-import time
-import random
+import os
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+
+from scraper.common_utils import listing_offer, make_empty_details, measure_idle, wait_for_network_idle, wait_for_selector
+from scraper.driver_pool import lease_driver
+from scraper.extraction import AMAZON_PRODUCT, AMAZON_SEARCH, parse_html
+from scraper.http_client import fetch_html, looks_blocked
+from scraper.location_sessions import cookie_header, ensure_location, html_shows_pincode, preload_location
+from scraper.scrape_context import measure_detail
+from scraper.site_urls import site_url
+from scraper.structured_data import apply_fast_path
 
 
 from langchain_core.runnables import Runnable
@@ -16,6 +19,18 @@ from langchain_core.runnables import Runnable
 
 PLACEHOLDER_IMAGE = "https://placehold.co/300x400/EEE/31343C?text=No+Image"
 
+# Fetch search/product HTML over plain HTTP and only open Chrome when that fails
+HTTP_FAST_PATH = os.getenv("AMAZON_HTTP_FAST_PATH", "true").lower() == "true"
+
+# Bot-check / interstitial pages served instead of real content
+BLOCK_MARKERS = (
+    "/errors/validateCaptcha",
+    "Type the characters you see in this image",
+    "api-services-support@amazon.com",
+    "<title>Robot Check</title>",
+    "Sorry, we just need to make sure you're not a robot",
+)
+
 def clean_price_text(price_text: str) -> int:
     """Extracts integer rupee value from text."""
     if not price_text:
@@ -25,252 +40,240 @@ def clean_price_text(price_text: str) -> int:
         return int(m.group(0).replace(',', ''))
     return 0
 
-def random_delay(a=1.0, b=2.5):
-    time.sleep(random.uniform(a, b))
-
-def get_browser(headless=True):
-    opts = Options()
-    if headless:
-        opts.add_argument("--headless=new")
-    opts.add_argument("--disable-gpu")
-    opts.add_argument("--no-sandbox")
-    opts.add_argument("--disable-dev-shm-usage")
-    opts.add_argument("--window-size=1920,1080")
-    opts.add_argument("start-maximized")
-    opts.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    )
-
-    service = Service(ChromeDriverManager().install())
-    browser = webdriver.Chrome(service=service, options=opts)
-    return browser
-
-
 class AmazonSearchRunnable(Runnable):
-    def __init__(self, query: str, pincode: str = None, headless: bool = True):
+    def __init__(self, query: str, pincode: str = None, headless: bool = True, preview: bool = False):
         self.query = query
         self.pincode = pincode
         self.headless = headless
+        self.preview = preview
 
     def invoke(self, *args, **kwargs):
-        browser = get_browser(headless=self.headless)
         try:
             print(f"Searching for: {self.query}")
-            products = self.scrape_amazon_search(self.query, browser)
-
-            if not products:
-                return {"error": "No products found"}
-
-            print(f"Found {len(products)} products")
-            lowest = min(products, key=lambda x: x['price'])
-            print(f"Lowest price: ₹{lowest['price']} at {lowest['url']}")
-
-            print("Fetching product details...")
-            details = self.scrape_product_details(lowest['url'], browser, self.pincode)
+            products = self.scrape_amazon_search_http(self.query) if HTTP_FAST_PATH else None
+            details = None
+            fetched_over_http = False
+
+            if products:
+                lowest = self.pick_lowest(products)
+                if self.preview:
+                    return self.listing_offer(lowest)
+                # Delivery for a pincode needs a location session: a stored one
+                # works over HTTP, otherwise the popup flow runs in a browser
+                cookies = cookie_header("amazon", self.pincode)
+                if not self.pincode or cookies:
+                    print("Fetching product details...")
+                    with measure_detail():
+                        details = self.scrape_product_details_http(lowest['url'], self.pincode, cookies)
+                    fetched_over_http = True
+
+            if details is None:
+                with lease_driver("amazon", headless=self.headless) as browser:
+                    if not products:
+                        products = self.scrape_amazon_search(self.query, browser)
+                        if not products:
+                            return {"error": "No products found"}
+                        lowest = self.pick_lowest(products)
+                        if self.preview:
+                            return self.listing_offer(lowest)
+
+                    print("Fetching product details...")
+                    # A browser retry of the same candidate is not a new candidate
+                    with measure_detail(candidates=0 if fetched_over_http else 1):
+                        details = self.scrape_product_details(lowest['url'], browser, self.pincode)
 
             return details
 
         except Exception as e:
             return {"error": str(e)}
 
-        finally:
-            browser.quit()
+    @staticmethod
+    def pick_lowest(products):
+        print(f"Found {len(products)} products")
+        lowest = min(products, key=lambda x: x['price'])
+        print(f"Lowest price: ₹{lowest['price']} at {lowest['url']}")
+        return lowest
+
+    @staticmethod
+    def listing_offer(product):
+        return listing_offer(make_empty_details(product['url']), product['title'], product['price'], product['image'])
+
+    def product_details(self, product_url: str):
+        """Full details for one product URL: over HTTP when possible, else in a browser."""
+        details = None
+        cookies = cookie_header("amazon", self.pincode)
+        fetched_over_http = HTTP_FAST_PATH and (not self.pincode or cookies)
+        if fetched_over_http:
+            with measure_detail():
+                details = self.scrape_product_details_http(product_url, self.pincode, cookies)
+        if details is None:
+            with lease_driver("amazon", headless=self.headless) as browser, \
+                    measure_detail(candidates=0 if fetched_over_http else 1):
+                details = self.scrape_product_details(product_url, browser, self.pincode)
+        return details
+
+    @staticmethod
+    def search_url(query: str) -> str:
+        return site_url("amazon", f"/s?k={query.replace(' ', '+')}")
+
+    def scrape_amazon_search_http(self, query: str):
+        """Search over HTTP; returns None when the response is blocked or has no results."""
+        html = fetch_html("amazon", self.search_url(query))
+        if not html or looks_blocked(html, BLOCK_MARKERS):
+            print("⚠️ Amazon HTTP search blocked or failed, using browser")
+            return None
+        results = self.parse_search_results(html)
+        if not results:
+            print("⚠️ Amazon HTTP search returned no results, using browser")
+            return None
+        return results
 
     def scrape_amazon_search(self, query: str, browser):
-        url = f"https://www.amazon.in/s?k={query.replace(' ', '+')}"
-        browser.get(url)
-        random_delay(3, 5)
-        soup = BeautifulSoup(browser.page_source, "html.parser")
+        browser.get(self.search_url(query))
+        wait_for_selector(browser, "div[data-component-type='s-search-result']", timeout=10)
+        return self.parse_search_results(browser.page_source)
 
+    @staticmethod
+    def parse_search_results(html: str):
         results = []
-        for div in soup.select("div[data-component-type='s-search-result']"):
-            try:
-                link = div.select_one("a.a-link-normal.s-no-outline")
-                if not link:
-                    continue
-                href = link.get("href")
-                product_url = "https://www.amazon.in" + href
-                price_el = div.select_one("span.a-price-whole")
-                price = clean_price_text(price_el.text if price_el else "")
-                img = div.select_one("img.s-image")
-                image_url = img.get("src") if img else PLACEHOLDER_IMAGE
-                if price > 0:
-                    results.append({"price": price, "url": product_url, "image": image_url})
-            except Exception:
+        for item in AMAZON_SEARCH.extract(html):
+            if not item["href"]:
                 continue
+            price = item["price"] or 0
+            if price > 0:
+                results.append({
+                    "price": price,
+                    "title": item["title"] or "",
+                    "url": site_url("amazon", item["href"]),
+                    "image": item["image"] or PLACEHOLDER_IMAGE
+                })
         return results
 
     def change_pincode(self, browser, pincode: str):
         try:
-            location_btn = WebDriverWait(browser, 10).until(
-                EC.element_to_be_clickable((By.ID, "contextualIngressPtLabel"))
-            )
+            with measure_idle():
+                location_btn = WebDriverWait(browser, 10).until(
+                    EC.element_to_be_clickable((By.ID, "contextualIngressPtLabel"))
+                )
             location_btn.click()
-            random_delay(1, 2)
 
-            pincode_input = WebDriverWait(browser, 10).until(
-                EC.presence_of_element_located((By.ID, "GLUXZipUpdateInput"))
-            )
+            pincode_input = wait_for_selector(browser, "#GLUXZipUpdateInput", timeout=10, visible=True)
+            if not pincode_input:
+                raise Exception("Pincode input did not appear")
             pincode_input.clear()
             pincode_input.send_keys(pincode)
-            random_delay(0.5, 1)
 
             apply_btn = browser.find_element(
                 By.CSS_SELECTOR, "input[aria-labelledby='GLUXZipUpdate-announce']"
             )
             apply_btn.click()
-            random_delay(2, 3)
 
-            try:
-                done_btn = browser.find_element(By.CSS_SELECTOR, "button[name='glowDoneButton']")
-                done_btn.click()
-                random_delay(1, 2)
-            except:
-                pass
+            # Either a confirmation popover appears or the page reloads with the new location
+            done_btn = wait_for_selector(browser, "button[name='glowDoneButton']", timeout=4, visible=True)
+            if done_btn:
+                try:
+                    done_btn.click()
+                except Exception:
+                    pass
+            wait_for_network_idle(browser, timeout=6)
 
             return True
         except Exception as e:
             print(f"Could not change pincode: {e}")
             return False
 
+    def scrape_product_details_http(self, product_url: str, pincode: str = None, cookies: str = None):
+        """Product page over HTTP; returns None when blocked, missing title/price,
+        or (with a location session's cookies) not showing the pincode."""
+        html = fetch_html("amazon", product_url, headers={"Cookie": cookies} if cookies else None)
+        if not html or looks_blocked(html, BLOCK_MARKERS):
+            print("⚠️ Amazon HTTP product page blocked or failed, using browser")
+            return None
+        if pincode and not html_shows_pincode("amazon", pincode, html):
+            print("⚠️ Amazon location session expired, using browser")
+            return None
+        tree = parse_html(html)
+        details = make_empty_details(product_url)
+        if apply_fast_path("amazon", details, tree, pincode):
+            return details
+        details = self.parse_product_details(tree, product_url)
+        if not details["title"] or not details["price"]:
+            print("⚠️ Amazon HTTP product page incomplete, using browser")
+            return None
+        return details
+
     def scrape_product_details(self, product_url: str, browser, pincode: str = None):
+        preload_location(browser, "amazon", pincode)
         browser.get(product_url)
-        random_delay(3, 5)
+        wait_for_selector(browser, "#productTitle", timeout=10)
         if pincode:
-            self.change_pincode(browser, pincode)
-            random_delay(2, 3)
+            if ensure_location(browser, "amazon", pincode, lambda: self.change_pincode(browser, pincode)):
+                wait_for_selector(browser, "#productTitle", timeout=8)
+
+        return self.parse_product_details(browser.page_source, product_url)
 
-        soup = BeautifulSoup(browser.page_source, "html.parser")
+    @staticmethod
+    def parse_product_details(html, product_url: str):
+        """html may be page source or an already parsed tree."""
+        fields = AMAZON_PRODUCT.extract(html)
 
         details = {
             "url": product_url,
-            "title": "",
-            "price": 0,
-            "original_price": 0,
-            "discount": "",
-            "rating": 0.0,
-            "review_count": 0,
-            "image": PLACEHOLDER_IMAGE,
-            "images": [],
-            "delivery_date": "",
-            "delivery_info": "",
+            "title": fields["title"] or "",
+            "price": fields["price"] or 0,
+            "original_price": fields["original_price"] or 0,
+            "discount": fields["discount"] or "",
+            "rating": fields["rating"] or 0.0,
+            "review_count": fields["review_count"] or 0,
+            "image": fields["image"] or PLACEHOLDER_IMAGE,
+            "images": fields["images"],
+            "delivery_date": fields["delivery_date"] or "",
+            "delivery_info": fields["delivery_info"] or "",
             "availability": "",
             "brand": "",
             "description": "",
-            "features": [],
-            "specifications": {},
-            "seller": "",
+            "features": fields["features"],
+            "specifications": fields["specifications"],
+            "seller": fields["seller"] or "",
             "in_stock": False
         }
 
-        title_el = soup.select_one("#productTitle")
-        if title_el:
-            details["title"] = title_el.text.strip()
-
-        price_el = soup.select_one("span.a-price.aok-align-center.reinventPricePriceToPayMargin.priceToPay span.a-price-whole")
-        if not price_el:
-            price_el = soup.select_one("span.a-price-whole")
-        if price_el:
-            details["price"] = clean_price_text(price_el.text)
-
-        mrp_el = soup.select_one("span.a-price.a-text-price span.a-offscreen")
-        if mrp_el:
-            details["original_price"] = clean_price_text(mrp_el.text)
-
-        discount_el = soup.select_one("span.savingsPercentage")
-        if discount_el:
-            details["discount"] = discount_el.text.strip()
-
-        rating_el = soup.select_one("span.a-icon-alt")
-        if rating_el:
-            rating_text = rating_el.text.strip()
-            match = re.search(r'([\d.]+)\s*out of', rating_text)
-            if match:
-                details["rating"] = float(match.group(1))
-
-        review_el = soup.select_one("#acrCustomerReviewText")
-        if review_el:
-            review_text = review_el.text.strip()
-            match = re.search(r'([\d,]+)', review_text)
-            if match:
-                details["review_count"] = int(match.group(1).replace(',', ''))
-
-        img_el = soup.select_one("#landingImage")
-        if not img_el:
-            img_el = soup.select_one("#imgBlkFront")
-        if img_el:
-            details["image"] = img_el.get("src", PLACEHOLDER_IMAGE)
-
-        img_thumbs = soup.select("img.a-dynamic-image")
-        for img in img_thumbs[:6]:
-            img_url = img.get("src", "")
-            if img_url and img_url not in details["images"]:
-                details["images"].append(img_url)
-
-        delivery_el = soup.select_one("#mir-layout-DELIVERY_BLOCK-slot-PRIMARY_DELIVERY_MESSAGE_LARGE b")
-        if not delivery_el:
-            delivery_el = soup.select_one("span[data-csa-c-delivery-time]")
-        if delivery_el:
-            details["delivery_date"] = delivery_el.text.strip()
-
-        delivery_info_el = soup.select_one("#mir-layout-DELIVERY_BLOCK-slot-PRIMARY_DELIVERY_MESSAGE_LARGE")
-        if delivery_info_el:
-            details["delivery_info"] = delivery_info_el.text.strip()
-
-        avail_el = soup.select_one("#availability span")
-        if avail_el:
-            avail_text = avail_el.text.strip()
+        avail_text = fields["availability"]
+        if avail_text:
             details["availability"] = avail_text
             details["in_stock"] = "in stock" in avail_text.lower() or "available" in avail_text.lower()
 
-        brand_el = soup.select_one("#bylineInfo")
-        if brand_el:
-            details["brand"] = brand_el.text.strip().replace("Visit the ", "").replace(" Store", "").replace("Brand: ", "")
-
-        desc_el = soup.select_one("#feature-bullets ul")
-        if desc_el:
-            features = []
-            for li in desc_el.select("li"):
-                text = li.text.strip()
-                if text:
-                    features.append(text)
-            details["features"] = features
-
-        if not details["features"]:
-            desc_el = soup.select_one("#productDescription p")
-            if desc_el:
-                details["description"] = desc_el.text.strip()
-
-        spec_tables = soup.select("table.a-keyvalue")
-        for table in spec_tables:
-            rows = table.select("tr")
-            for row in rows:
-                cells = row.select("td")
-                if len(cells) == 2:
-                    key = cells[0].text.strip()
-                    value = cells[1].text.strip()
-                    if key and value:
-                        details["specifications"][key] = value
-
-        seller_el = soup.select_one("#sellerProfileTriggerId")
-        if seller_el:
-            details["seller"] = seller_el.text.strip()
+        if fields["brand"]:
+            details["brand"] = fields["brand"].replace("Visit the ", "").replace(" Store", "").replace("Brand: ", "")
+
+        if not details["features"] and fields["description"]:
+            details["description"] = fields["description"]
 
         return details
 
 
-def scrape_amazon_lowest_price(query: str, pincode: str = None, headless: bool = True):
+def scrape_amazon_lowest_price(query: str, pincode: str = None, headless: bool = True, preview: bool = False):
     """
     Wrapper function to match the interface expected by price_fetcher.py.
     It instantiates and invokes the AmazonSearchRunnable.
+    With preview=True the lowest search listing is returned without opening its product page.
     """
     try:
-        runnable = AmazonSearchRunnable(query=query, pincode=pincode, headless=headless)
+        runnable = AmazonSearchRunnable(query=query, pincode=pincode, headless=headless, preview=preview)
         result = runnable.invoke()
         return result
     except Exception as e:
         print(f"Error in Amazon wrapper: {e}")
         return {"error": str(e)}
+
+
+def scrape_amazon_product(product_url: str, pincode: str = None, headless: bool = True):
+    """Full details for one product URL (used to enrich a preview offer)."""
+    try:
+        return AmazonSearchRunnable(query="", pincode=pincode, headless=headless).product_details(product_url)
+    except Exception as e:
+        print(f"Error in Amazon product wrapper: {e}")
+        return {"error": str(e)}
 # --- END OF FIX ---
 
 
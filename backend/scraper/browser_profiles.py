@@ -0,0 +1,254 @@
+"""
+Persistent Chrome profiles for the pooled Selenium drivers, one per (site, slot).
+
+A fresh profile means every new Chrome re-downloads each site's JS bundles,
+CSS and fonts. Instead each driver the pool creates claims a profile directory
+under SCRAPER_STATE_DIR/profiles and keeps its HTTP disk cache (and V8 code
+cache) there across drivers and restarts:
+
+    profile = profile_store.claim("croma")      # .../profiles/croma-0
+    driver = setup_driver(user_data_dir=profile, disk_cache_size=CACHE_MAX_BYTES)
+    ...
+    profile_store.release(profile)               # when the driver is quit
+
+Chrome locks a profile while it runs, so a slot belongs to one live driver at
+a time: the store hands out the lowest free slot of the site, and an flock on
+the slot's lock file keeps other worker processes off it. On every claim the
+session state a previous driver may have left behind (cookies, storage,
+service workers) is wiped, so only the caches carry over; delivery locations
+still come from location_sessions.
+
+Each profile's cache is capped by Chrome (SCRAPER_PROFILE_CACHE_MB). Idle
+profiles unused for SCRAPER_PROFILE_MAX_AGE_DAYS are deleted, and the least
+recently used idle ones go while all profiles together exceed
+SCRAPER_PROFILES_MAX_MB. Pruning runs in the background at most every
+PRUNE_INTERVAL seconds, triggered by claims.
+"""
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; slots are then only exclusive within this process
+    fcntl = None
+
+from scraper.location_sessions import STATE_DIR
+
+# ---------- Config ----------
+PROFILES_ENABLED = os.getenv("SCRAPER_PERSISTENT_PROFILES", "true").lower() == "true"
+PROFILES_DIR = os.path.join(STATE_DIR, "profiles")
+CACHE_MAX_BYTES = int(float(os.getenv("SCRAPER_PROFILE_CACHE_MB", "150")) * 1024 * 1024)
+PROFILES_MAX_BYTES = int(float(os.getenv("SCRAPER_PROFILES_MAX_MB", "1500")) * 1024 * 1024)
+PROFILE_MAX_AGE = float(os.getenv("SCRAPER_PROFILE_MAX_AGE_DAYS", "7")) * 86400
+PRUNE_INTERVAL = 600  # seconds
+
+LOCK_FILE = ".slot.lock"
+# Written on claim and release; its mtime is the profile's last use
+USED_MARKER = ".last_used"
+
+# Session state removed from a profile before it is reused (relative to the
+# profile dir); everything else, notably Cache/ and Code Cache/, is kept
+STATE_ENTRIES = (
+    "Default/Cookies", "Default/Cookies-journal",
+    "Default/Network/Cookies", "Default/Network/Cookies-journal",
+    "Default/Local Storage", "Default/Session Storage", "Default/IndexedDB",
+    "Default/Service Worker", "Default/Sessions", "Default/Current Session", "Default/Current Tabs",
+    "SingletonLock", "SingletonCookie", "SingletonSocket",
+)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        total += _dir_size(entry.path)
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return total
+
+
+def _remove(path: str):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class ProfileStore:
+    """Hands out per-(site, slot) profile directories and keeps their total size bounded."""
+
+    def __init__(self, directory: str = PROFILES_DIR, max_bytes: int = PROFILES_MAX_BYTES,
+                 max_age: float = PROFILE_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._in_use: Set[str] = set()
+        self._locks: Dict[str, Any] = {}  # profile path -> open lock file
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self._pruning = False
+        self.stats = {"claimed": 0, "created": 0, "reused": 0, "pruned": 0, "pruned_mb": 0.0}
+
+    # ---------- Slots ----------
+    def _lock_slot(self, path: str) -> bool:
+        """Take the cross-process lock of a slot (caller holds self._lock)."""
+        os.makedirs(path, exist_ok=True)
+        handle = open(os.path.join(path, LOCK_FILE), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return False
+        self._locks[path] = handle
+        return True
+
+    def claim(self, site: str) -> Optional[str]:
+        """Lowest free profile slot of `site`, scrubbed of session state; None if disabled or unusable."""
+        if not PROFILES_ENABLED:
+            return None
+        site = re.sub(r"[^0-9A-Za-z_-]", "", site)
+        try:
+            with self._lock:
+                slot = 0
+                while True:
+                    path = os.path.join(self.directory, f"{site}-{slot}")
+                    if path not in self._in_use:
+                        existed = os.path.isdir(path)
+                        if self._lock_slot(path):
+                            break
+                    slot += 1
+                self._in_use.add(path)
+                self.stats["claimed"] += 1
+                self.stats["reused" if existed else "created"] += 1
+            for entry in STATE_ENTRIES:
+                _remove(os.path.join(path, entry))
+            self._touch(path)
+        except OSError as e:
+            print(f"⚠️ Browser profile for {site} unavailable, using a fresh one: {e}")
+            return None
+        self._maybe_prune()
+        return path
+
+    def release(self, path: Optional[str]):
+        """Give a slot back once its Chrome has quit."""
+        if not path:
+            return
+        self._touch(path)
+        with self._lock:
+            self._in_use.discard(path)
+            handle = self._locks.pop(path, None)
+        if handle is not None:
+            handle.close()  # drops the flock
+
+    @staticmethod
+    def _touch(path: str):
+        try:
+            with open(os.path.join(path, USED_MARKER), "a"):
+                pass
+            os.utime(os.path.join(path, USED_MARKER))
+        except OSError:
+            pass
+
+    # ---------- Pruning ----------
+    def _maybe_prune(self):
+        with self._lock:
+            if self._pruning or time.monotonic() - self._last_prune < PRUNE_INTERVAL:
+                return
+            self._pruning = True
+            self._last_prune = time.monotonic()
+        threading.Thread(target=self.prune, name="profile-prune", daemon=True).start()
+
+    def prune(self) -> int:
+        """Delete idle profiles past max_age, then least recently used idle ones over max_bytes."""
+        removed = 0
+        try:
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return 0
+            now = time.time()
+            profiles = []
+            for name in names:
+                path = os.path.join(self.directory, name)
+                if not os.path.isdir(path):
+                    continue
+                try:
+                    last_used = os.path.getmtime(os.path.join(path, USED_MARKER))
+                except OSError:
+                    last_used = os.path.getmtime(path)
+                profiles.append([last_used, _dir_size(path), path])
+
+            total = sum(size for _, size, _ in profiles)
+            for profile in sorted(profiles):  # oldest first
+                last_used, size, path = profile
+                if now - last_used <= self.max_age and total <= self.max_bytes:
+                    break
+                if not self._remove_idle(path):
+                    continue
+                total -= size
+                removed += 1
+                with self._lock:
+                    self.stats["pruned"] += 1
+                    self.stats["pruned_mb"] += size / (1024 * 1024)
+            if removed:
+                print(f"🧹 Browser profiles: removed {removed}, {total / (1024 * 1024):.0f} MB left")
+        finally:
+            with self._lock:
+                self._pruning = False
+        return removed
+
+    def _remove_idle(self, path: str) -> bool:
+        """Delete a profile unless this or another process is using it."""
+        with self._lock:
+            if path in self._in_use:
+                return False
+            try:
+                if not self._lock_slot(path):
+                    return False
+            except OSError:
+                return False
+            # Reserved until deleted, so claim() moves on to another slot
+            # instead of recreating this one mid-rmtree
+            self._in_use.add(path)
+            handle = self._locks.pop(path)
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            handle.close()
+            with self._lock:
+                self._in_use.discard(path)
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snap = {
+                "enabled": PROFILES_ENABLED,
+                "in_use": len(self._in_use),
+                "cache_limit_mb": round(CACHE_MAX_BYTES / (1024 * 1024)),
+                "total_limit_mb": round(self.max_bytes / (1024 * 1024)),
+                **self.stats,
+            }
+        snap["pruned_mb"] = round(snap["pruned_mb"], 1)
+        return snap
+
+
+profile_store = ProfileStore()
+
+
+def snapshot() -> Dict[str, Any]:
+    return profile_store.snapshot()
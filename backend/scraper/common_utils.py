@@ -1,11 +1,19 @@
 # common_utils.py
+import os
 import re
 import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
 from selenium import webdriver
+from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 
+from scraper.request_blocking import apply_selenium_policy
+from scraper.scrape_context import check_cancelled, current_context, measure_detail, record_idle, record_scrolls
+
 PLACEHOLDER_IMAGE = "https://placehold.co/300x400/EEE/31343C?text=No+Image"
 
 def clean_price_text(price_text: str) -> int:
@@ -23,14 +31,25 @@ def clean_price_text(price_text: str) -> int:
         except:
             return 0
 
-def setup_driver(headless=True, user_agent=None):
+@lru_cache(maxsize=1)
+def get_chromedriver_path() -> str:
+    """Resolve the chromedriver binary once per process."""
+    return ChromeDriverManager().install()
+
+def setup_driver(headless=True, user_agent=None, window_size="1920,1080", performance_log=False,
+                 user_data_dir=None, disk_cache_size=None):
     chrome_options = Options()
+    if user_data_dir:
+        # Persistent profile (see browser_profiles): static assets come from its disk cache
+        chrome_options.add_argument(f'--user-data-dir={user_data_dir}')
+    if disk_cache_size:
+        chrome_options.add_argument(f'--disk-cache-size={disk_cache_size}')
     if headless:
         chrome_options.add_argument('--headless=new')
     chrome_options.add_argument('--no-sandbox')
     chrome_options.add_argument('--disable-dev-shm-usage')
     chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument(f'--window-size={window_size}')
     chrome_options.add_argument('--disable-gpu')
     ua = user_agent or ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
                         'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36')
@@ -38,7 +57,11 @@ def setup_driver(headless=True, user_agent=None):
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option('useAutomationExtension', False)
     chrome_options.add_experimental_option("prefs", {"profile.default_content_setting_values.notifications": 2})
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+    if performance_log:
+        # Network events only; used to count requests dropped by request blocking
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+    driver = webdriver.Chrome(service=Service(get_chromedriver_path()), options=chrome_options)
     try:
         driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": ua})
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
@@ -46,6 +69,277 @@ def setup_driver(headless=True, user_agent=None):
         pass
     return driver
 
+# ---------- Readiness waits ----------
+# Event-driven replacements for fixed sleeps. Each wait returns as soon as its
+# condition holds, gives up after `timeout` (also capped by the scrape deadline)
+# and adds the time it blocked to the current ScrapeContext's idle metrics.
+
+DEFAULT_WAIT_TIMEOUT = 10.0
+POLL_INTERVAL = 0.2
+
+def _bounded_timeout(timeout: float) -> float:
+    ctx = current_context()
+    return ctx.remaining(timeout) if ctx is not None else timeout
+
+@contextmanager
+def measure_idle():
+    """Record the duration of a blocking wait that isn't one of the helpers below
+    (WebDriverWait, Playwright's wait_for_*)."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        record_idle(time.monotonic() - start)
+
+def pause(seconds: float):
+    """Deliberate short pause (e.g. between UI interactions) that counts as idle time."""
+    seconds = _bounded_timeout(seconds)
+    time.sleep(seconds)
+    record_idle(seconds)
+
+def wait_until(condition: Callable[[], Any], timeout: float = DEFAULT_WAIT_TIMEOUT,
+               poll: float = POLL_INTERVAL) -> Any:
+    """Poll condition() until it returns something truthy; returns it, or None on timeout."""
+    start = time.monotonic()
+    deadline = start + _bounded_timeout(timeout)
+    result = None
+    try:
+        while True:
+            check_cancelled()
+            try:
+                result = condition()
+            except Exception:
+                result = None
+            if result or time.monotonic() >= deadline:
+                return result or None
+            time.sleep(min(poll, max(0.0, deadline - time.monotonic())))
+    finally:
+        record_idle(time.monotonic() - start, timed_out=not result)
+
+def wait_for_selector(driver, selector: str, timeout: float = DEFAULT_WAIT_TIMEOUT,
+                      visible: bool = False, by: str = By.CSS_SELECTOR):
+    """Wait for the first element matching selector; returns it or None."""
+    def find():
+        for el in driver.find_elements(by, selector):
+            if not visible or el.is_displayed():
+                return el
+        return None
+    return wait_until(find, timeout)
+
+def wait_for_text(driver, text: str, timeout: float = DEFAULT_WAIT_TIMEOUT) -> bool:
+    """Wait until text appears anywhere in the page body."""
+    script = "return !!document.body && document.body.innerText.indexOf(arguments[0]) !== -1;"
+    return bool(wait_until(lambda: driver.execute_script(script, text), timeout))
+
+def wait_for_stable(read_value: Callable[[], Any], timeout: float = DEFAULT_WAIT_TIMEOUT,
+                    settle: float = 0.8, min_value: int = 1) -> Any:
+    """Wait until read_value() stops changing.
+
+    Returns once the value is at least min_value and has not changed for
+    `settle` seconds, or on timeout; the last value read is returned. Works
+    with any page object (Selenium driver, Playwright page) via read_value.
+    """
+    state = {"value": None, "since": time.monotonic()}
+
+    def settled():
+        value = read_value()
+        now = time.monotonic()
+        if value != state["value"]:
+            state["value"], state["since"] = value, now
+            return False
+        return value >= min_value and now - state["since"] >= settle
+
+    wait_until(settled, timeout)
+    return state["value"]
+
+def wait_for_count_stable(driver, selector: str, timeout: float = DEFAULT_WAIT_TIMEOUT,
+                          settle: float = 0.8, min_count: int = 1) -> int:
+    """Wait until the number of elements matching selector stops growing; returns the count."""
+    count = wait_for_stable(lambda: len(driver.find_elements(By.CSS_SELECTOR, selector)),
+                            timeout, settle, min_count)
+    return count or 0
+
+def wait_for_network_idle(driver, timeout: float = DEFAULT_WAIT_TIMEOUT, idle_time: float = 0.5) -> bool:
+    """Wait until the document has loaded and no new resources were fetched for idle_time seconds."""
+    script = (
+        "if (performance.setResourceTimingBufferSize) performance.setResourceTimingBufferSize(5000);"
+        "return [document.readyState, performance.getEntriesByType('resource').length];"
+    )
+    state = {"resources": -1, "since": time.monotonic()}
+
+    def idle():
+        ready_state, resources = driver.execute_script(script)
+        now = time.monotonic()
+        if ready_state != "complete" or resources != state["resources"]:
+            state["resources"], state["since"] = resources, now
+            return False
+        return now - state["since"] >= idle_time
+
+    return bool(wait_until(idle, timeout))
+
+# ---------- Adaptive scrolling ----------
+# Search pages lazy-load tiles as they are scrolled. Instead of a fixed number
+# of scrolls, scroll only until the scraper has as many tiles as it will use,
+# or a scroll brings in nothing new.
+
+# Distinct tiles matching a selector: anchors count once per URL (image and
+# title links of one product), other elements once each. Takes the selector.
+COUNT_TILES_JS = """(selector) => {
+    const keys = new Set();
+    document.querySelectorAll(selector).forEach(el => keys.add(el.href ? el.href.split('?')[0].split('#')[0] : el));
+    return keys.size;
+}"""
+
+def count_tiles(driver, selector: str) -> int:
+    """Distinct tiles matching selector in a Selenium page (see COUNT_TILES_JS)."""
+    return driver.execute_script(f"return ({COUNT_TILES_JS})(arguments[0]);", selector) or 0
+
+def scroll_until_loaded(scroll: Callable[[], Any], count: Callable[[], int], target: int, max_scrolls: int,
+                        timeout: float = 2.5, settle: float = 0.5) -> int:
+    """Scroll until `target` tiles are loaded or a scroll adds none, at most max_scrolls times.
+
+    scroll() does one scroll step and count() reads the tile count, so this
+    works with Selenium drivers and Playwright pages alike. After each scroll
+    the count is given up to `timeout` to settle (see wait_for_stable). The
+    scrolls skipped out of max_scrolls, and the time they would have taken at
+    the observed pace, are added to the current ScrapeContext. Returns the
+    last tile count.
+    """
+    def read():
+        try:
+            return count() or 0
+        except Exception:
+            return 0
+
+    start = time.monotonic()
+    loaded = read()
+    scrolls = 0
+    while scrolls < max_scrolls and loaded < target:
+        check_cancelled()
+        try:
+            scroll()
+        except Exception:
+            break
+        scrolls += 1
+        settled = wait_for_stable(read, timeout=timeout, settle=settle, min_value=0) or 0
+        if settled <= loaded:
+            break
+        loaded = settled
+
+    saved = max_scrolls - scrolls
+    # A skipped scroll costs at least one settle interval even when nothing loads
+    pace = (time.monotonic() - start) / scrolls if scrolls else settle
+    record_scrolls(scrolls, saved, saved * pace)
+    return loaded
+
+# ---------- Candidate fan-out ----------
+# Product pages for the next few candidates load in parallel tabs while the
+# current one is being read. Candidates are still judged in order, so the
+# result is the same one a serial walk would pick; tabs that are no longer
+# needed are closed, which stops their loads.
+
+DETAIL_FANOUT = int(os.getenv("SCRAPER_DETAIL_FANOUT", "3"))
+
+def detail_fanout(site: str) -> int:
+    """Number of candidate pages loaded at once; override with SCRAPER_DETAIL_FANOUT_<SITE>."""
+    return max(1, int(os.getenv(f"SCRAPER_DETAIL_FANOUT_{site.upper()}", DETAIL_FANOUT)))
+
+def first_valid_in_tabs(driver, site: str, items: Iterable[Dict[str, Any]],
+                        fetch: Callable[[Any, Dict[str, Any]], Any],
+                        accept: Callable[[Any], bool],
+                        fanout: Optional[int] = None) -> Tuple[Optional[Dict[str, Any]], Any]:
+    """Selenium: return (item, result) for the first item whose fetch(driver, item) is accepted.
+
+    fetch() runs with the item's page already navigating in the current tab
+    and must not call driver.get() itself. Returns (None, None) if none passes.
+    """
+    fanout = fanout or detail_fanout(site)
+    queue = list(items)
+    if fanout <= 1:
+        for item in queue:
+            check_cancelled()
+            with measure_detail():
+                driver.get(item["url"])
+                result = fetch(driver, item)
+            if accept(result):
+                return item, result
+        return None, None
+
+    home = driver.current_window_handle
+    pending = []  # (item, window handle), in candidate order
+    try:
+        while queue or pending:
+            check_cancelled()
+            while queue and len(pending) < fanout:
+                item = queue.pop(0)
+                driver.switch_to.new_window("tab")
+                # CDP block lists are per tab
+                apply_selenium_policy(driver, site)
+                driver.execute_script("window.location.href = arguments[0];", item["url"])
+                pending.append((item, driver.current_window_handle))
+
+            item, handle = pending.pop(0)
+            driver.switch_to.window(handle)
+            try:
+                with measure_detail():
+                    result = fetch(driver, item)
+            finally:
+                driver.close()
+                driver.switch_to.window(home)
+            if accept(result):
+                return item, result
+        return None, None
+    finally:
+        for _, handle in pending:
+            try:
+                driver.switch_to.window(handle)
+                driver.close()
+            except Exception:
+                pass
+        try:
+            driver.switch_to.window(home)
+        except Exception:
+            pass
+
+def first_valid_in_pages(context, items: Iterable[Dict[str, Any]],
+                         fetch: Callable[[Any, Dict[str, Any]], Any],
+                         accept: Callable[[Any], bool],
+                         fanout: int) -> Tuple[Optional[Dict[str, Any]], Any]:
+    """Playwright counterpart of first_valid_in_tabs using pages of one BrowserContext."""
+    queue = list(items)
+    pending = []  # (item, page)
+    try:
+        while queue or pending:
+            check_cancelled()
+            while queue and len(pending) < max(1, fanout):
+                item = queue.pop(0)
+                page = context.new_page()
+                try:
+                    # Returns once the response starts; the page keeps loading in the background
+                    page.goto(item["url"], wait_until="commit")
+                except Exception:
+                    pass
+                pending.append((item, page))
+
+            item, page = pending.pop(0)
+            try:
+                with measure_detail():
+                    result = fetch(page, item)
+            finally:
+                try:
+                    page.close()
+                except Exception:
+                    pass
+            if accept(result):
+                return item, result
+        return None, None
+    finally:
+        for _, page in pending:
+            try:
+                page.close()
+            except Exception:
+                pass
+
 def make_empty_details(product_url: str):
     return {
         "url": product_url,
@@ -67,3 +361,16 @@ def make_empty_details(product_url: str):
         "seller": "",
         "in_stock": False
     }
+
+
+def listing_offer(details: dict, title: str, price: int, image: str = None) -> dict:
+    """
+    Preview result built from a search page listing: title, price and image.
+    Rating, delivery and specs stay empty until the offer is enriched from its
+    product page; "preview" marks it so it is never cached as a full result.
+    """
+    details.update({"title": title or "", "price": price, "in_stock": True, "preview": True})
+    if image:
+        details["image"] = image
+        details["images"] = [image]
+    return details
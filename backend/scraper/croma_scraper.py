@@ -6,18 +6,22 @@ Usage:
     python croma_scraper.py
 """
 import re
-import time
 from typing import Dict, Any, List, Optional
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+
+from scraper.common_utils import (
+    count_tiles, first_valid_in_tabs, listing_offer, scroll_until_loaded, wait_for_selector, wait_for_text,
+)
+from scraper.driver_pool import lease_driver
+from scraper.scrape_context import measure_detail
+from scraper.site_urls import site_url
+from scraper.structured_data import apply_fast_path
 
 # ---------- Config ----------
 PLACEHOLDER_IMAGE = "https://placehold.co/300x400/EEE/31343C?text=No+Image"
+# Light-DOM hosts of the shadow tiles plus plain product anchors
+PRODUCT_TILE_SELECTOR = "cc-product-tile, product-tile, croma-product-tile, a[href*='/p/']"
+MAX_CANDIDATES = 30  # search tiles considered, cheapest first
 # ---------- Helpers ----------
 
 def clean_price_text(price_text: str) -> int:
@@ -61,33 +65,6 @@ def make_empty_details(product_url: str) -> Dict[str, Any]:
         "in_stock": False
     }
 
-def setup_driver(headless: bool = True, window_size: str = "1366,768"):
-    """Setup Chrome driver with common anti-detection arguments."""
-    chrome_options = Options()
-    if headless:
-        # new headless (works for recent Chrome)
-        chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument(f"--window-size={window_size}")
-    ua = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-          "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36")
-    chrome_options.add_argument(f"--user-agent={ua}")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option("useAutomationExtension", False)
-    chrome_options.add_experimental_option("prefs", {"profile.default_content_setting_values.notifications": 2})
-    # instantiate
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-    # try some runtime stealth
-    try:
-        driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": ua})
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-    except Exception:
-        pass
-    return driver
-
 # ---------- Shadow DOM product extraction ----------
 def extract_products_from_shadow_dom(driver) -> List[Dict[str, Any]]:
     """
@@ -141,20 +118,27 @@ def extract_products_from_shadow_dom(driver) -> List[Dict[str, Any]]:
         return []
 
 # ---------- Product details extractor ----------
-def get_product_details(driver, product_url: str, pincode: Optional[str] = None) -> Optional[Dict[str, Any]]:
+def get_product_details(driver, product_url: str, pincode: Optional[str] = None,
+                        navigate: bool = True) -> Optional[Dict[str, Any]]:
     """
     Visit the product URL and extract details (title, price, images, brand, rating, stock, delivery).
-    Returns the populated details dict or None on fatal failure.
+    Returns the populated details dict or None on fatal failure. Pass navigate=False
+    when the page is already loading in the current tab.
     """
     details = make_empty_details(product_url)
     try:
         # navigate
         if not product_url.startswith("http"):
             # make absolute
-            product_url = "https://www.croma.com" + product_url
-        driver.get(product_url)
-        WebDriverWait(driver, 12).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        time.sleep(1.5)
+            product_url = site_url("croma", product_url)
+        if navigate:
+            driver.get(product_url)
+        wait_for_selector(driver, "h1, h2[class*='title'], h3[class*='title']", timeout=12)
+        wait_for_text(driver, "₹", timeout=3)
+
+        # JSON-LD / embedded state first; the DOM walk below only runs on a miss
+        if apply_fast_path("croma", details, driver.page_source, pincode):
+            return details
 
         # Title
         try:
@@ -420,127 +404,151 @@ def get_product_details(driver, product_url: str, pincode: Optional[str] = None)
         return None
 
 # ---------- Main scraper orchestration ----------
-def scrape_croma(query: str, pincode: Optional[str] = None, headless: bool = True, max_scrolls: int = 8) -> Optional[Dict[str, Any]]:
+def scrape_croma_product(product_url: str, pincode: Optional[str] = None, headless: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Full details for one product URL (used to enrich a preview offer).
+    """
+    try:
+        with lease_driver("croma", headless=headless) as driver, measure_detail():
+            details = get_product_details(driver, product_url, pincode)
+        return details if details and details.get("price", 0) > 0 else None
+    except Exception as e:
+        print(f"Scraper error: {e}")
+        return None
+
+
+def scrape_croma(query: str, pincode: Optional[str] = None, headless: bool = True, max_scrolls: int = 8,
+                 preview: bool = False) -> Optional[Dict[str, Any]]:
     """
     Orchestrates the Croma search and returns best (lowest-priced) product details dict.
+    With preview=True the cheapest priced listing is returned without visiting product pages.
     """
-    driver = None
     try:
-        driver = setup_driver(headless=headless)
-        # Croma search (using the searchB variant the site advertises in ld+json)
-        search_q = query.replace(" ", "%20")
-        search_url = f"https://www.croma.com/searchB?q={search_q}%3Arelevance&text={search_q}"
-        # fallback to normal search if above fails
-        driver.get(search_url)
-
-        # Wait for React to hydrate. If initial data is present, product tiles might load after scrolls.
-        WebDriverWait(driver, 12).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        time.sleep(1.2)
-
-        # Scroll to trigger lazy loads & product render
-        for _ in range(max_scrolls):
-            driver.execute_script("window.scrollBy(0, window.innerHeight * 0.9);")
-            time.sleep(0.6)
-
-        # Try extracting shadow DOM tiles
-        raw_products = extract_products_from_shadow_dom(driver)
-
-        # If nothing found via shadow extraction, attempt to find normal anchors with /p/
-        if not raw_products:
-            # extra scroll + wait & try again
-            for _ in range(3):
-                driver.execute_script("window.scrollBy(0, 800);")
-                time.sleep(0.6)
-            anchors = driver.find_elements(By.XPATH, "//a[contains(@href,'/p/')]")
-            raw_products = []
-            seen = set()
-            for a in anchors:
-                try:
-                    href = a.get_attribute("href") or ""
-                    if not href or href in seen:
-                        continue
-                    seen.add(href)
-                    title = (a.text or "").strip()
-                    # attempt to locate price nearby
-                    price = ""
+        with lease_driver("croma", headless=headless) as driver:
+            # Croma search (using the searchB variant the site advertises in ld+json)
+            search_q = query.replace(" ", "%20")
+            search_url = site_url("croma", f"/searchB?q={search_q}%3Arelevance&text={search_q}")
+            # fallback to normal search if above fails
+            driver.get(search_url)
+
+            # Wait for React to hydrate. If initial data is present, product tiles might load after scrolls.
+            wait_for_selector(driver, PRODUCT_TILE_SELECTOR, timeout=12)
+
+            # Scroll to trigger lazy loads & product render, until there are enough tiles to choose from
+            scroll_until_loaded(lambda: driver.execute_script("window.scrollBy(0, window.innerHeight * 0.9);"),
+                                lambda: count_tiles(driver, PRODUCT_TILE_SELECTOR), MAX_CANDIDATES, max_scrolls,
+                                timeout=2, settle=0.4)
+
+            # Try extracting shadow DOM tiles
+            raw_products = extract_products_from_shadow_dom(driver)
+
+            # If nothing found via shadow extraction, attempt to find normal anchors with /p/
+            if not raw_products:
+                # extra scroll + wait & try again
+                scroll_until_loaded(lambda: driver.execute_script("window.scrollBy(0, 800);"),
+                                    lambda: count_tiles(driver, PRODUCT_TILE_SELECTOR), MAX_CANDIDATES, 3,
+                                    timeout=2, settle=0.4)
+                anchors = driver.find_elements(By.XPATH, "//a[contains(@href,'/p/')]")
+                raw_products = []
+                seen = set()
+                for a in anchors:
                     try:
-                        parent = a.find_element(By.XPATH, "./ancestor::div[1]")
-                        price_el = parent.find_element(By.XPATH, ".//*[contains(text(),'₹')]")
-                        price = price_el.text.strip()
-                    except:
+                        href = a.get_attribute("href") or ""
+                        if not href or href in seen:
+                            continue
+                        seen.add(href)
+                        title = (a.text or "").strip()
+                        # attempt to locate price nearby
                         price = ""
-                    raw_products.append({"url": href, "title": title, "price_text": price, "image": ""})
-                except:
-                    continue
+                        try:
+                            parent = a.find_element(By.XPATH, "./ancestor::div[1]")
+                            price_el = parent.find_element(By.XPATH, ".//*[contains(text(),'₹')]")
+                            price = price_el.text.strip()
+                        except:
+                            price = ""
+                        raw_products.append({"url": href, "title": title, "price_text": price, "image": ""})
+                    except:
+                        continue
 
-        if not raw_products:
-            # nothing found, return None
-            return None
-
-        # normalize & compute numeric prices; if price missing mark as large
-        normalized = []
-        for rp in raw_products:
-            price_val = clean_price_text(rp.get("price_text", "") or "")
-            normalized.append({
-                "url": rp.get("url"),
-                "title": rp.get("title") or "",
-                "price": price_val if price_val > 0 else 10**10,
-                "image": rp.get("image") or PLACEHOLDER_IMAGE
-            })
+            if not raw_products:
+                # nothing found, return None
+                return None
+
+            # normalize & compute numeric prices; if price missing mark as large
+            normalized = []
+            for rp in raw_products:
+                price_val = clean_price_text(rp.get("price_text", "") or "")
+                normalized.append({
+                    "url": rp.get("url"),
+                    "title": rp.get("title") or "",
+                    "price": price_val if price_val > 0 else 10**10,
+                    "image": rp.get("image") or PLACEHOLDER_IMAGE
+                })
 
-        # sort by price asc
-        normalized = sorted(normalized, key=lambda x: x["price"])
+            # sort by price asc
+            normalized = sorted(normalized, key=lambda x: x["price"])
 
-        # iterate candidates (lowest first) and attempt to fetch full details
-        for candidate in normalized[:30]:  # limit to first 30 previews
+            # iterate candidates (lowest first) and attempt to fetch full details;
             # accessory filter: skip obvious accessory titles
-            title_l = (candidate.get("title") or "").lower()
             skip_keywords = ["case", "cover", "charger", "adapter", "battery", "screen protector", "keyboard cover", "bag", "sleeve"]
-            if any(k in title_l for k in skip_keywords):
-                continue
-
-            details = get_product_details(driver, candidate["url"], pincode)
-            if details and details.get("price", 0) > 10000:  # Reasonable product price
-                # ensure url & image
-                if not details.get("image") or 'logo' in details.get("image", "").lower():
-                    details["image"] = candidate.get("image", PLACEHOLDER_IMAGE)
+            candidates = [c for c in normalized[:MAX_CANDIDATES]  # limit to the first previews
+                          if not any(k in (c.get("title") or "").lower() for k in skip_keywords)]
+            # absolute URLs, so tabs can navigate straight to them
+            for candidate in candidates:
+                if candidate["url"] and not candidate["url"].startswith("http"):
+                    candidate["url"] = site_url("croma", candidate["url"])
+
+            if preview:
+                # same bound as the search-data fallback below
+                first = next((c for c in candidates if 10000 < c["price"] < 10**10), None)
+                if first is None:
+                    return None
+                return listing_offer(make_empty_details(first["url"]), first["title"], first["price"], first["image"])
+
+            def fetch(driver, candidate):
+                details = get_product_details(driver, candidate["url"], pincode, navigate=False)
+                if details and details.get("price", 0) > 10000:  # Reasonable product price
+                    # ensure url & image
+                    if not details.get("image") or 'logo' in details.get("image", "").lower():
+                        details["image"] = candidate.get("image", PLACEHOLDER_IMAGE)
+                    return details
+
+                # fallback: if details extraction failed but preview has a numeric price, return a minimal fallback
+                if candidate["price"] and 10000 < candidate["price"] < 10**10:
+                    fallback = make_empty_details(candidate["url"])
+                    fallback.update({
+                        "title": candidate.get("title", ""),
+                        "price": candidate.get("price", 0),
+                        "image": candidate.get("image", PLACEHOLDER_IMAGE),
+                        "in_stock": True
+                    })
+                    return fallback
+                return None
+
+            _, result = first_valid_in_tabs(driver, "croma", candidates, fetch,
+                                            accept=lambda result: result is not None)
+            if result:
+                return result
+
+            # last resort: visit first candidate's page and return whatever we can
+            first = normalized[0]
+            with measure_detail(candidates=0):
+                details = get_product_details(driver, first["url"], pincode)
+            if details:
                 return details
-
-            # fallback: if details extraction failed but preview has a numeric price, return a minimal fallback
-            if candidate["price"] and 10000 < candidate["price"] < 10**10:
-                fallback = make_empty_details(candidate["url"])
-                fallback.update({
-                    "title": candidate.get("title", ""),
-                    "price": candidate.get("price", 0),
-                    "image": candidate.get("image", PLACEHOLDER_IMAGE),
-                    "in_stock": True
-                })
-                return fallback
-
-        # last resort: visit first candidate's page and return whatever we can
-        first = normalized[0]
-        details = get_product_details(driver, first["url"], pincode)
-        if details:
-            return details
-        # final fallback
-        fallback = make_empty_details(first["url"])
-        fallback.update({
-            "title": first.get("title", ""),
-            "price": first.get("price", 0) if first.get("price", 0) < 10**10 else 0,
-            "image": first.get("image", PLACEHOLDER_IMAGE),
-            "in_stock": True
-        })
-        return fallback
+            # final fallback
+            fallback = make_empty_details(first["url"])
+            fallback.update({
+                "title": first.get("title", ""),
+                "price": first.get("price", 0) if first.get("price", 0) < 10**10 else 0,
+                "image": first.get("image", PLACEHOLDER_IMAGE),
+                "in_stock": True
+            })
+            return fallback
 
     except Exception as e:
         print(f"Scraper error: {e}")
         return None
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
 
 # ---------- CLI / main ----------
 def print_result(product: Optional[Dict[str, Any]]):
@@ -0,0 +1,295 @@
+"""
+Process-wide pool of warm Chrome WebDriver sessions shared by all Selenium scrapers.
+
+Instead of every scrape paying for a Chrome cold start (and a ChromeDriverManager
+lookup), scrapers lease a driver from the pool and hand it back when they are done:
+
+    with lease_driver("flipkart", headless=True) as driver:
+        driver.get(url)
+
+Drivers are health-checked on checkout, wiped (cookies, storage, extra tabs)
+on checkin, and recycled after MAX_USES leases or whenever a lease ends with a
+WebDriver crash. If the lease runs inside a ScrapeContext that gets cancelled,
+the driver is quit immediately so the late scraper's next WebDriver call fails
+fast, and the session is discarded on checkin.
+
+Each driver gets its site's request-blocking policy (scraper/request_blocking.py)
+when it is created; requests it blocked are credited to each lease's scrape.
+It also runs on a persistent per-(site, slot) profile (scraper/browser_profiles.py),
+so a new driver starts with the site's static assets already in its disk cache;
+the profile slot is released when the driver is quit.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import WebDriverException
+
+from scraper.browser_profiles import CACHE_MAX_BYTES, profile_store
+from scraper.common_utils import setup_driver
+from scraper.request_blocking import (
+    apply_selenium_policy, blocked_url_patterns, drain_performance_log, record_selenium_blocked,
+)
+from scraper.scrape_context import current_context
+from scraper.site_urls import DEFAULT_BASE_URLS, base_url
+
+# ---------- Config ----------
+POOL_MAX_SIZE = int(os.getenv("SCRAPER_POOL_MAX_SIZE", "6"))
+POOL_MAX_USES = int(os.getenv("SCRAPER_POOL_MAX_USES", "25"))
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("SCRAPER_POOL_ACQUIRE_TIMEOUT", "60"))
+
+# Per-site window sizes, kept from the scrapers' original setup_driver calls
+SITE_WINDOW_SIZES = {
+    "croma": "1366,768",
+}
+
+# Storage wiped per origin on checkin (Storage.clearDataForOrigin takes one origin at a time)
+RESET_STORAGE_TYPES = "local_storage,session_storage,indexeddb,service_workers,cache_storage"
+
+
+def _origin(url: str) -> Optional[str]:
+    """scheme://host[:port] of an http(s) URL, else None."""
+    parts = urlparse(url or "")
+    return f"{parts.scheme}://{parts.netloc}" if parts.scheme in ("http", "https") and parts.netloc else None
+
+
+class DriverPoolExhausted(Exception):
+    """Raised when no driver could be leased within the acquire timeout."""
+
+
+class _PooledDriver:
+    """Book-keeping wrapper around a live WebDriver."""
+
+    def __init__(self, driver, key: Tuple[str, bool]):
+        self.driver = driver
+        self.key = key
+        self.uses = 0
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.blocking = False
+        self.profile: Optional[str] = None
+
+
+class DriverPool:
+    """Bounded pool of Chrome drivers keyed by (site, headless)."""
+
+    def __init__(self, max_size: int = POOL_MAX_SIZE, max_uses: int = POOL_MAX_USES):
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self._idle: Dict[Tuple[str, bool], List[_PooledDriver]] = {}
+        self._live = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"created": 0, "reused": 0, "recycled": 0, "crashed": 0}
+
+    def _count(self, stat: str):
+        with self._cond:
+            self.stats[stat] += 1
+
+    # ---------- Driver lifecycle ----------
+    def _create(self, key: Tuple[str, bool]) -> _PooledDriver:
+        site, headless = key
+        window_size = SITE_WINDOW_SIZES.get(site, "1920,1080")
+        profile = profile_store.claim(site)
+        try:
+            driver = setup_driver(headless=headless, window_size=window_size,
+                                  performance_log=bool(blocked_url_patterns(site)),
+                                  user_data_dir=profile, disk_cache_size=CACHE_MAX_BYTES if profile else None)
+        except Exception:
+            profile_store.release(profile)
+            raise
+        self._count("created")
+        pooled = _PooledDriver(driver, key)
+        pooled.profile = profile
+        pooled.blocking = apply_selenium_policy(driver, site)
+        return pooled
+
+    def _destroy(self, pooled: _PooledDriver):
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+        # Chrome has exited (or is gone), so the profile can back another driver
+        profile_store.release(pooled.profile)
+        pooled.profile = None
+
+    def _is_healthy(self, pooled: _PooledDriver) -> bool:
+        try:
+            pooled.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _reset(self, pooled: _PooledDriver) -> bool:
+        """Close extra tabs and clear cookies/storage so the next lease starts clean."""
+        driver = pooled.driver
+        # The site's own origin plus whatever the open tabs ended up on
+        origins: Set[Optional[str]] = set()
+        site = pooled.key[0]
+        if site in DEFAULT_BASE_URLS:
+            origins.add(_origin(base_url(site)))
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                origins.add(_origin(driver.current_url))
+                driver.close()
+            driver.switch_to.window(handles[0])
+            origins.add(_origin(driver.current_url))
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except Exception:
+                pass
+            driver.delete_all_cookies()
+            try:
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+                for origin in filter(None, origins):
+                    driver.execute_cdp_cmd("Storage.clearDataForOrigin", {
+                        "origin": origin, "storageTypes": RESET_STORAGE_TYPES,
+                    })
+            except Exception:
+                pass
+            driver.get("about:blank")
+            return True
+        except Exception:
+            return False
+
+    # ---------- Checkout / checkin ----------
+    def checkout(self, site: str, headless: bool = True, timeout: float = POOL_ACQUIRE_TIMEOUT):
+        key = (site, headless)
+        deadline = time.time() + timeout
+        while True:
+            evict = None
+            with self._cond:
+                if self._closed:
+                    raise DriverPoolExhausted("Driver pool is closed")
+                idle = self._idle.get(key)
+                if idle:
+                    pooled = idle.pop()
+                elif self._live < self.max_size:
+                    self._live += 1
+                    pooled = None
+                else:
+                    # Free a slot held by an idle driver of another site
+                    evict = next((lst.pop(0) for lst in self._idle.values() if lst), None)
+                    if evict is None:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            raise DriverPoolExhausted(f"No Chrome driver available for {site}")
+                        self._cond.wait(remaining)
+                        continue
+                    pooled = None
+
+            if evict is not None:
+                # Slot ownership passes from the evicted driver to this lease
+                self._destroy(evict)
+                self._count("recycled")
+
+            if pooled is not None:
+                if self._is_healthy(pooled):
+                    pooled.uses += 1
+                    pooled.last_used = time.time()
+                    self._count("reused")
+                    return pooled
+                self._destroy(pooled)
+                self._count("crashed")
+
+            try:
+                pooled = self._create(key)
+            except Exception:
+                self._release_slot()
+                raise
+            pooled.uses = 1
+            return pooled
+
+    def checkin(self, pooled: _PooledDriver, discard: bool = False):
+        if discard or pooled.uses >= self.max_uses or self._closed or not self._reset(pooled):
+            self._destroy(pooled)
+            self._count("recycled")
+            self._release_slot()
+            return
+        with self._cond:
+            self._idle.setdefault(pooled.key, []).append(pooled)
+            self._cond.notify()
+
+    def _release_slot(self):
+        with self._cond:
+            self._live -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, site: str, headless: bool = True):
+        ctx = current_context()
+        timeout = ctx.remaining(POOL_ACQUIRE_TIMEOUT) if ctx else POOL_ACQUIRE_TIMEOUT
+        pooled = self.checkout(site, headless=headless, timeout=timeout)
+        cleanup = ctx.add_cleanup(pooled.driver.quit) if ctx else None
+        if pooled.blocking:
+            # Drop log entries from earlier leases and the about:blank reset
+            drain_performance_log(pooled.driver)
+        discard = False
+        try:
+            yield pooled.driver
+        except WebDriverException:
+            # A crashed/disconnected session must not go back into the pool
+            discard = not self._is_healthy(pooled)
+            if discard:
+                self._count("crashed")
+            raise
+        finally:
+            if cleanup is not None:
+                ctx.remove_cleanup(cleanup)
+                discard = discard or ctx.cancelled
+            if pooled.blocking and not discard:
+                record_selenium_blocked(pooled.driver, site)
+            self.checkin(pooled, discard=discard)
+
+    # ---------- Maintenance ----------
+    def snapshot(self) -> Dict[str, int]:
+        with self._cond:
+            idle = sum(len(v) for v in self._idle.values())
+            return {
+                "max_size": self.max_size,
+                "live": self._live,
+                "idle": idle,
+                "in_use": self._live - idle,
+                **self.stats,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle = [p for lst in self._idle.values() for p in lst]
+            self._idle.clear()
+            self._live -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._destroy(pooled)
+
+
+_pool: Optional[DriverPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool() -> DriverPool:
+    """Return the process-wide driver pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+        return _pool
+
+
+def lease_driver(site: str, headless: bool = True):
+    """Context manager yielding a pooled WebDriver for `site`."""
+    return get_driver_pool().lease(site, headless=headless)
+
+
+def shutdown_driver_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
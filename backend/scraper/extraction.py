@@ -0,0 +1,323 @@
+"""
+Declarative lxml extraction for product and search pages.
+
+Each site describes its fields once as ordered XPath fallbacks. The XPaths are
+compiled at import time, and a page is parsed a single time and queried in
+memory, so there are no per-field WebDriver round trips or BeautifulSoup tree
+walks:
+
+    tree = parse_html(driver.page_source)
+    fields = FLIPKART_PRODUCT.extract(tree)
+
+Field semantics follow the scrapers' original find_element chains: the
+XPaths are tried in order, and the first match whose parsed value passes
+`accept` wins. `many=True` fields collect values from every XPath, de-duplicated.
+"""
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from lxml import etree
+from lxml import html as lxml_html
+
+from scraper.common_utils import clean_price_text
+
+
+# ---------- XPath helpers ----------
+def cls(name: str) -> str:
+    """XPath predicate equivalent to the CSS class selector `.name`."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def parse_html(html: str):
+    """Parse page HTML into an lxml tree (tolerant of broken markup)."""
+    if not html:
+        return lxml_html.fromstring("<html></html>")
+    return lxml_html.fromstring(html)
+
+
+# ---------- Value parsers ----------
+def node_text(node) -> str:
+    """Whitespace-collapsed text of an element (or the string result of an @attr / text() XPath)."""
+    if isinstance(node, str):
+        return " ".join(node.split())
+    return " ".join(node.text_content().split())
+
+
+# Rendered text only: innerText never includes script, style or noscript content
+VISIBLE_TEXT = etree.XPath(".//text()[not(ancestor::script or ancestor::style or ancestor::noscript)]")
+
+
+def node_lines(node) -> str:
+    """Element text with one line per text node, like innerText for block layouts."""
+    raw = node if isinstance(node, str) else "\n".join(VISIBLE_TEXT(node))
+    lines = (" ".join(line.split()) for line in raw.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def to_price(node) -> int:
+    return clean_price_text(node_text(node))
+
+
+def to_float(node) -> float:
+    m = re.search(r'(\d+(?:\.\d+)?)', node_text(node))
+    return float(m.group(1)) if m else 0.0
+
+
+def to_int(node) -> int:
+    m = re.search(r'(\d+)', node_text(node).replace(',', ''))
+    return int(m.group(1)) if m else 0
+
+
+def usable(node) -> bool:
+    """Markup approximation of is_displayed() and is_enabled(): not disabled or hidden inline."""
+    style = (node.get('style') or '').replace(' ', '').lower()
+    return node.get('disabled') is None and node.get('hidden') is None and 'display:none' not in style
+
+
+def count_or_none(node) -> Optional[int]:
+    """First integer in the text (commas dropped), 0 included; None if there is none."""
+    m = re.search(r'(\d+)', node_text(node).replace(',', ''))
+    return int(m.group(1)) if m else None
+
+
+def regex(pattern: str, cast: Callable[[str], Any] = str, group: int = 1):
+    """Parser returning `cast(match.group(group))` of pattern in the node text, or None."""
+    compiled = re.compile(pattern, re.IGNORECASE)
+
+    def parse(node):
+        m = compiled.search(node_text(node))
+        return cast(m.group(group).replace(',', '')) if m else None
+    return parse
+
+
+# ---------- Field specs ----------
+class Field:
+    """One output field: ordered XPath fallbacks plus a value parser."""
+
+    def __init__(self, xpaths: Union[str, Sequence[str]], parse: Callable[[Any], Any] = node_text,
+                 accept: Optional[Callable[[Any], bool]] = None, many: bool = False,
+                 limit: Optional[int] = None, default: Any = None):
+        if isinstance(xpaths, str):
+            xpaths = [xpaths]
+        self.xpaths = [etree.XPath(x) for x in xpaths]
+        self.parse = parse
+        self.accept = accept or bool
+        self.many = many
+        self.limit = limit
+        self.default = default if default is not None else ([] if many else None)
+
+    def extract(self, tree):
+        values: List[Any] = []
+        for xpath in self.xpaths:
+            for node in xpath(tree):
+                try:
+                    value = self.parse(node)
+                except Exception:
+                    continue
+                if value is None or not self.accept(value):
+                    continue
+                if not self.many:
+                    return value
+                if value not in values:
+                    values.append(value)
+                    if self.limit and len(values) >= self.limit:
+                        return values
+        return values if self.many else self.default
+
+
+class Table(Field):
+    """Key/value rows (specification tables) -> dict."""
+
+    def __init__(self, row_xpaths: Union[str, Sequence[str]], cell_xpath: str = ".//td",
+                 limit: Optional[int] = None, skip_key: Optional[Callable[[str], bool]] = None):
+        super().__init__(row_xpaths, many=True, limit=limit, default={})
+        self.cells = etree.XPath(cell_xpath)
+        self.skip_key = skip_key
+
+    def extract(self, tree):
+        table: Dict[str, str] = {}
+        for xpath in self.xpaths:
+            for row in xpath(tree):
+                cells = self.cells(row)
+                if len(cells) < 2:
+                    continue
+                key, value = node_text(cells[0]), node_text(cells[1])
+                if key and value and not (self.skip_key and self.skip_key(key)):
+                    table[key] = value
+                    if self.limit and len(table) >= self.limit:
+                        return table
+        return table
+
+
+class Exists(Field):
+    """True if any XPath matches."""
+
+    def extract(self, tree):
+        return any(len(xpath(tree)) > 0 for xpath in self.xpaths)
+
+
+class ExtractionSpec:
+    """Named set of fields extracted from one page."""
+
+    def __init__(self, name: str, fields: Dict[str, Field]):
+        self.name = name
+        self.fields = fields
+
+    def extract(self, tree_or_html, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Pass a dict as `timings` to get the seconds spent parsing and on each field."""
+        start = time.perf_counter()
+        tree = parse_html(tree_or_html) if isinstance(tree_or_html, str) else tree_or_html
+        if timings is None:
+            return {key: field.extract(tree) for key, field in self.fields.items()}
+
+        if tree is not tree_or_html:
+            timings["parse"] = timings.get("parse", 0.0) + time.perf_counter() - start
+        values = {}
+        for key, field in self.fields.items():
+            start = time.perf_counter()
+            values[key] = field.extract(tree)
+            timings[key] = timings.get(key, 0.0) + time.perf_counter() - start
+        return values
+
+
+class ListSpec:
+    """Repeated items (search result cards): an item XPath plus per-item fields."""
+
+    def __init__(self, name: str, item_xpath: str, fields: Dict[str, Field]):
+        self.name = name
+        self.item_xpath = etree.XPath(item_xpath)
+        self.fields = fields
+
+    def extract(self, tree_or_html) -> List[Dict[str, Any]]:
+        tree = parse_html(tree_or_html) if isinstance(tree_or_html, str) else tree_or_html
+        return [
+            {key: field.extract(item) for key, field in self.fields.items()}
+            for item in self.item_xpath(tree)
+        ]
+
+
+# ---------- Timing ----------
+def timing_report(timings: Dict[str, float], title: str = "") -> str:
+    """Steps of a `timings` dict, most expensive first, in milliseconds."""
+    total = sum(timings.values())
+    lines = [f"⏱️ {title + ': ' if title else ''}{total * 1000:.1f} ms"]
+    for key, seconds in sorted(timings.items(), key=lambda item: item[1], reverse=True):
+        share = seconds / total * 100 if total else 0.0
+        lines.append(f"   {key:<18} {seconds * 1000:>8.2f} ms {share:>5.1f}%")
+    return "\n".join(lines)
+
+
+# ---------- Amazon ----------
+AMAZON_SEARCH = ListSpec("amazon_search", "//div[@data-component-type='s-search-result']", {
+    "href": Field(f".//a[{cls('a-link-normal')} and {cls('s-no-outline')}]/@href"),
+    "title": Field(".//h2//span"),
+    "price": Field(f".//span[{cls('a-price-whole')}]", parse=to_price),
+    "image": Field(f".//img[{cls('s-image')}]/@src"),
+})
+
+AMAZON_PRODUCT = ExtractionSpec("amazon_product", {
+    "title": Field("//*[@id='productTitle']"),
+    "price": Field([
+        f"//span[{cls('a-price')} and {cls('aok-align-center')} and {cls('reinventPricePriceToPayMargin')}"
+        f" and {cls('priceToPay')}]//span[{cls('a-price-whole')}]",
+        f"//span[{cls('a-price-whole')}]",
+    ], parse=to_price, accept=lambda v: True),
+    "original_price": Field(f"//span[{cls('a-price')} and {cls('a-text-price')}]//span[{cls('a-offscreen')}]",
+                            parse=to_price, accept=lambda v: True),
+    "discount": Field(f"//span[{cls('savingsPercentage')}]"),
+    "rating": Field(f"(//span[{cls('a-icon-alt')}])[1]", parse=regex(r'([\d.]+)\s*out of', float),
+                         accept=lambda v: True),
+    "review_count": Field("//*[@id='acrCustomerReviewText']", parse=regex(r'([\d,]+)', int), accept=lambda v: True),
+    "image": Field(["//*[@id='landingImage']/@src", "//*[@id='imgBlkFront']/@src"]),
+    "images": Field(f"//img[{cls('a-dynamic-image')}]/@src", many=True, limit=6),
+    "delivery_date": Field(["//*[@id='mir-layout-DELIVERY_BLOCK-slot-PRIMARY_DELIVERY_MESSAGE_LARGE']//b",
+                            "//span[@data-csa-c-delivery-time]"]),
+    "delivery_info": Field("//*[@id='mir-layout-DELIVERY_BLOCK-slot-PRIMARY_DELIVERY_MESSAGE_LARGE']"),
+    "availability": Field("(//*[@id='availability']//span)[1]"),
+    "brand": Field("//*[@id='bylineInfo']"),
+    "features": Field("(//*[@id='feature-bullets']//ul)[1]//li", many=True),
+    "description": Field("(//*[@id='productDescription']//p)[1]"),
+    "specifications": Table(f"//table[{cls('a-keyvalue')}]//tr"),
+    "seller": Field("//*[@id='sellerProfileTriggerId']"),
+})
+
+# ---------- Flipkart ----------
+FLIPKART_PRODUCT = ExtractionSpec("flipkart_product", {
+    "title": Field([f"//span[{cls('RG5slk')}] | //h1[{cls('yhB1nd')}] | //span[{cls('VU-ZEz')}]"]),
+    "page_title": Field("//title"),
+    "rating": Field([f"//div[{cls('PvbNMB')}]//span", f"//div[{cls('XQDdHH')}]"],
+                    parse=regex(r'^(\d(?:\.\d)?)$', float)),
+    "review_text": Field(f"//span[{cls('o2SIOJ')}]"),
+    "price": Field(f"//div[{cls('hZ3P6w')} or {cls('DeU9vF')} or {cls('Nx9bqj')}]", parse=to_price),
+    "original_price": Field(f"//div[{cls('kRYCnD')} or {cls('gxR4EY')} or {cls('yRaY8j')}]", parse=to_price),
+    "discount": Field(f"//div[{cls('HQe8jr')} or {cls('UkUFwK')}]"),
+    "features": Field(f"//ul[{cls('HwRTzP')}]//li[{cls('DTBslk')}] | //li[{cls('_21Ahn-')}]", many=True),
+    "image": Field(f"//img[{cls('UCc1lI')} or {cls('_0DkuPH')} or @loading='eager']/@src"),
+    "images": Field("//img/@src[contains(., 'rukminim') or contains(., 'flixcart')]", many=True),
+    "seller": Field(["//*[contains(text(), 'Sold by')]/following-sibling::*[1]", "//*[@id='sellerName']"]),
+    "specifications": Table(f"//tr[{cls('WJdYP6')}] | //div[{cls('row')}]",
+                            cell_xpath=f"./td | ./div[{cls('col')}]",
+                            skip_key=lambda k: "Question" in k),
+    "out_of_stock": Exists("//*[contains(text(),'Out of stock') or contains(text(),'Sold Out')"
+                           " or contains(text(),'Currently unavailable')]"),
+    "delivery_info": Field(["//*[contains(text(),'Delivery by') or contains(text(),'Get it by')]",
+                            "//div[contains(@class,'delivery')] | //span[contains(@class,'delivery')]"]),
+    "body_prices": Field("//body", parse=lambda n: [int(m.replace(',', '')) for m in
+                                                    re.findall(r'₹\s?([\d,]{3,})', node_lines(n))],
+                         accept=lambda v: True),
+})
+
+# ---------- Snapdeal ----------
+# Single-valued fields look at the first match of each selector only, like the
+# find_element chains they replaced; the original price and the stock flag are
+# resolved from these values in snapdeal_scraper.parse_product_details.
+SNAPDEAL_PRODUCT = ExtractionSpec("snapdeal_product", {
+    "title": Field([f"(//h1[{cls('pdp-e-i-head')}])[1]", "(//h1[@itemprop='name'])[1]",
+                    f"(//h1[{cls('product-title')}])[1]", f"(//h1[{cls('pdpTitle')}])[1]", "(//h1)[1]"],
+                   accept=lambda t: len(t) > 10),
+    "image": Field([f"(//img[{cls('cloudzoom')}])[1]/@src", "(//img[@itemprop='image'])[1]/@src",
+                    f"(//img[{cls('product-image')}])[1]/@src", f"(//img[{cls('pdpCarouselImg')}])[1]/@src"]),
+    "images": Field(f"//img[{cls('pdpCarouselImg')}] | //div[{cls('bx-viewport')}]//img"
+                    f" | //ul[{cls('bx-list')}]//img",
+                    parse=lambda n: n.get('src') or n.get('data-src') or "",
+                    accept=lambda src: src.startswith('http'), many=True, limit=8),
+    "price": Field([f"(//span[{cls('pdp-final-price')}])[1]", f"(//span[{cls('payBlkBig')}])[1]",
+                    "(//span[@itemprop='price'])[1]", f"(//span[{cls('lfloat')} and {cls('product-price')}])[1]",
+                    f"(//span[{cls('selling-price')}])[1]"],
+                   parse=to_price),
+    # One candidate per selector; the first above the selling price wins
+    "original_price": Field([f"(//span[{cls('pdp-mrp')}])[1]", f"(//span[{cls('lfloat')} and {cls('markedPrice')}])[1]",
+                             f"(//span[{cls('strikedPriceText')}])[1]", f"(//span[{cls('list-price')}])[1]"],
+                            parse=to_price, many=True),
+    "discount": Field([f"(//span[{cls('percent-desc')}])[1]", f"(//div[{cls('percent-desc')}])[1]",
+                       f"(//span[{cls('pdp-discount')}])[1]", f"(//div[{cls('discount-badge')}])[1]"],
+                      accept=lambda d: '%' in d),
+    "rating": Field(["(//span[@itemprop='ratingValue'])[1]", f"(//span[{cls('avrg-rating')}])[1]",
+                     f"(//div[{cls('rating-value')}])[1]", f"(//span[{cls('filled-stars')}])[1]"],
+                    parse=regex(r'(\d+\.?\d*)', float), accept=lambda r: 0 <= r <= 5),
+    "review_count": Field(["(//span[@itemprop='ratingCount'])[1]", f"(//span[{cls('total-rating')}])[1]",
+                           f"(//span[{cls('review-count')}])[1]", f"(//p[{cls('rating-count')}])[1]"],
+                          parse=count_or_none, accept=lambda c: True),
+    # None when the page has no cart button, else whether the first one is usable
+    "add_to_cart": Field("(//div[@id='add-cart-button-id'] | //button[" + cls('buy-button') + "]"
+                         " | //div[" + cls('cart-button') + "])[1]", parse=usable, accept=lambda v: True),
+    "out_of_stock": Exists("//*[contains(text(), 'Out of Stock') or contains(text(), 'Sold Out')]"),
+    "seller": Field([f"(//div[{cls('seller-name')}])[1]", f"(//a[{cls('seller-link')}])[1]",
+                     "(//span[@itemprop='seller'])[1]", f"(//div[{cls('sold-by')}])[1]"],
+                    accept=lambda s: 0 < len(s) < 100),
+    "brand": Field(["(//tr//td[contains(text(),'Brand')]/following-sibling::td)[1]",
+                    "(//div[contains(@class, 'spec')]//td[contains(text(),'Brand')]/following-sibling::td)[1]",
+                    "(//span[@itemprop='brand'])[1]"], accept=lambda b: 0 < len(b) < 50),
+    "highlights": Field("(//div[contains(@class, 'key-features')]//li | //div[contains(@class, 'highlights')]//li"
+                        " | //ul[contains(@class, 'features')]//li)[position() <= 10]",
+                        accept=lambda t: 5 < len(t) < 300, many=True),
+    "specifications": Table("(//table[contains(@class, 'spec')]//tr"
+                            " | //div[contains(@class, 'specification')]//tr)[position() <= 20]"),
+    "description": Field([f"(//div[{cls('product-desc-content')}])[1]", "(//div[@itemprop='description'])[1]",
+                          f"(//div[{cls('description-text')}])[1]", f"(//div[{cls('product-description')}]//p)[1]"],
+                         parse=node_lines, accept=lambda d: len(d) > 50),
+    "offers": Field("(//div[contains(@class, 'offer')]//li | //div[contains(@class, 'bank-offer')])[position() <= 5]",
+                    accept=lambda t: 10 < len(t) < 200, many=True),
+    "body_text": Field("//body", parse=node_lines, accept=lambda v: True, default=""),
+})
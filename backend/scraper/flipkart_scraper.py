@@ -5,18 +5,42 @@ Updated with correct CSS selectors for current Flipkart layout
 import re
 import time
 from typing import Optional, Dict, Any, List
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+
+from scraper.common_utils import (
+    first_valid_in_tabs, listing_offer, wait_for_count_stable, wait_for_network_idle, wait_for_selector, wait_for_text,
+)
+from scraper.driver_pool import lease_driver
+from scraper.extraction import FLIPKART_PRODUCT, parse_html, timing_report
+from scraper.location_sessions import ensure_location, preload_location
+from scraper.scrape_context import measure_detail
+from scraper.site_urls import site_url
+from scraper.structured_data import apply_fast_path
 
 # --- CONSTANTS ---
 PLACEHOLDER_IMAGE = "https://placehold.co/300x400/EEE/31343C?text=No+Image"
 
+# Product anchors on the search page with their title, card price and image, in one round trip
+SEARCH_RESULTS_SCRIPT = """
+const max = arguments[0];
+const seen = new Set();
+const out = [];
+for (const a of document.querySelectorAll("a[href*='/p/']")) {
+    const url = a.href.split('?')[0];
+    if (seen.has(url)) continue;
+    const title = (a.getAttribute('title') || a.innerText || '').replace('Add to Compare', '').trim();
+    if (title.length <= 10) continue;
+    seen.add(url);
+    const card = a.closest('[data-id]') || a.parentElement || a;
+    const price = (card.innerText || '').match(/₹\\s?[\\d,]+/);
+    const img = card.querySelector('img');
+    out.push({url: url, title: title, price_text: price ? price[0] : '', image: img ? img.src : ''});
+    if (out.length >= max) break;
+}
+return out;
+"""
+
 def clean_price_text(price_text: str) -> int:
     """Extracts integer price from text like '₹23,990'."""
     if not price_text:
@@ -26,23 +50,6 @@ def clean_price_text(price_text: str) -> int:
         return 0
     return int(s.replace(',', ''))
 
-def setup_driver(headless: bool = True):
-    chrome_options = Options()
-    if headless:
-        chrome_options.add_argument('--headless=new')
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-    chrome_options.add_argument('--window-size=1920,1080')
-    chrome_options.add_argument('--disable-gpu')
-    
-    ua = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    chrome_options.add_argument(f'--user-agent={ua}')
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-    return driver
-
 def handle_popups(driver):
     """Closes login popups."""
     try:
@@ -50,44 +57,96 @@ def handle_popups(driver):
         for sel in selectors:
             try:
                 driver.find_element(By.CSS_SELECTOR, sel).click()
-                time.sleep(0.5)
                 return
             except:
                 pass
     except:
         pass
 
-def set_pincode(driver, pincode: str):
-    """Sets the pincode for delivery information."""
+def set_pincode(driver, pincode: str) -> bool:
+    """Sets the pincode for delivery information; True if it was submitted."""
     if not pincode:
-        return
+        return False
     try:
         # Find the pincode input field
-        inp = WebDriverWait(driver, 3).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "input.qeqGor, input#pincodeInputId"))
-        )
+        inp = wait_for_selector(driver, "input.qeqGor, input#pincodeInputId", timeout=3)
+        if not inp:
+            return False
         
         # Clear and enter new pincode
         inp.click()
         inp.send_keys(Keys.CONTROL + "a")
         inp.send_keys(Keys.DELETE)
-        time.sleep(0.2)
         inp.send_keys(pincode)
-        time.sleep(0.3)
         
         # Click Check button
         try:
             check_btn = driver.find_element(By.XPATH, "//span[contains(text(),'Check')]")
             check_btn.click()
-            time.sleep(1.5)
         except:
             inp.send_keys(Keys.ENTER)
-            time.sleep(1.5)
+        wait_for_network_idle(driver, timeout=4)
+        return True
     except Exception as e:
-        pass
+        return False
+
+def get_product_details(driver, product_url: str, pincode: str = None, debug: bool = False,
+                        navigate: bool = True, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Product details from one snapshot of the page, parsed once with FLIPKART_PRODUCT.
+
+    Pass a dict as `timings` to collect the seconds spent per step and per field
+    (printed as a report with debug=True).
+    """
+    timings = {} if timings is None else timings
+    details = make_empty_details(product_url)
+
+    def timed(step, fn):
+        start = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            timings[step] = timings.get(step, 0.0) + time.perf_counter() - start
+
+    try:
+        if navigate:
+            timed("navigate", lambda: driver.get(product_url))
+
+        def wait():
+            wait_for_text(driver, "₹", timeout=8)
+            wait_for_selector(driver, "span.RG5slk, h1.yhB1nd, span.VU-ZEz", timeout=3)
+            handle_popups(driver)
+        timed("wait", wait)
+
+        tree = timed("page_source", lambda: parse_html(driver.page_source))
+
+        # --- STRUCTURED DATA (skips the DOM walk when complete) ---
+        if timed("structured_data", lambda: apply_fast_path("flipkart", details, tree, pincode)):
+            return details
+
+        # --- SET LOCATION (stored session, else the pincode popup) ---
+        if pincode:
+            if timed("location", lambda: ensure_location(driver, "flipkart", pincode,
+                                                         lambda: set_pincode(driver, pincode))):
+                # Price and delivery re-render for the new location
+                tree = timed("page_source", lambda: parse_html(driver.page_source))
+
+        details.update(parse_product_details(tree, product_url, timings))
+
+        if debug:
+            print(f"✅ Scraped: {details['title'][:40]}...")
+            print(f"   Price: ₹{details['price']:,} | Rating: {details['rating']}⭐ | Reviews: {details['review_count']}")
+        return details
+
+    except Exception as e:
+        if debug:
+            print(f"❌ Scrape Error: {e}")
+        return details
+    finally:
+        if debug:
+            print(timing_report(timings, "Flipkart product page"))
 
-def get_product_details(driver, product_url: str, pincode: str = None, debug: bool = False) -> Dict[str, Any]:
-    details = {
+def make_empty_details(product_url: str) -> Dict[str, Any]:
+    return {
         "url": product_url,
         "title": "",
         "price": 0,
@@ -108,258 +167,124 @@ def get_product_details(driver, product_url: str, pincode: str = None, debug: bo
         "in_stock": False
     }
 
-    try:
-        driver.get(product_url)
-        try:
-            WebDriverWait(driver, 8).until(EC.presence_of_element_located((By.XPATH, "//*[contains(text(),'₹')]")))
-        except:
-            pass
-        time.sleep(1.5)
-        handle_popups(driver)
+def parse_product_details(html, product_url: str, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Map FLIPKART_PRODUCT fields onto the details dict; html may be page source or a parsed tree."""
+    fields = FLIPKART_PRODUCT.extract(html, timings=timings)
+    details = make_empty_details(product_url)
 
-        # --- SET LOCATION ---
-        if pincode:
-            set_pincode(driver, pincode)
-
-        # --- A. TITLE (RG5slk) ---
-        try:
-            title_el = driver.find_element(By.CSS_SELECTOR, "span.RG5slk, h1.yhB1nd, span.VU-ZEz")
-            details['title'] = title_el.text.strip()
-        except:
-            try:
-                details['title'] = driver.title.split('|')[0].strip()
-            except:
-                pass
+    # --- A. TITLE ---
+    details['title'] = fields['title'] or (fields['page_title'] or "").split('|')[0].strip()
 
-        # --- B. RATING (MKiFS6 contains stars, PvbNMB contains the rating container) ---
+    # --- B. RATING / C. REVIEW COUNT ("1,234 Ratings & 567 Reviews": the second number is reviews) ---
+    details['rating'] = fields['rating'] or 0.0
+    matches = re.findall(r'([\d,]+)', fields['review_text'] or "")
+    if matches:
         try:
-            # Rating value (in span inside PvbNMB)
-            rating_el = driver.find_element(By.CSS_SELECTOR, "div.PvbNMB span")
-            details['rating'] = float(rating_el.text.strip())
-        except:
-            try:
-                rating_el = driver.find_element(By.CSS_SELECTOR, "div.XQDdHH")
-                details['rating'] = float(rating_el.text.strip())
-            except:
-                pass
-
-        # --- C. REVIEW COUNT (o2SIOJ) ---
-        try:
-            review_el = driver.find_element(By.CSS_SELECTOR, "span.o2SIOJ")
-            review_text = review_el.text.strip()
-            # Extract number from text like "1,234 Ratings & 567 Reviews"
-            matches = re.findall(r'([\d,]+)', review_text)
-            if matches:
-                # Usually first number is ratings, second is reviews
-                if len(matches) >= 2:
-                    details['review_count'] = int(matches[1].replace(',', ''))
-                else:
-                    details['review_count'] = int(matches[0].replace(',', ''))
-        except:
+            details['review_count'] = int(matches[1 if len(matches) >= 2 else 0].replace(',', ''))
+        except ValueError:
             pass
 
-        # --- D. PRICE (hZ3P6w, DeU9vF) ---
-        try:
-            price_el = driver.find_element(By.CSS_SELECTOR, "div.hZ3P6w, div.DeU9vF, div.Nx9bqj")
-            details['price'] = clean_price_text(price_el.text)
-        except:
-            # Fallback
-            try:
-                body_txt = driver.find_element(By.TAG_NAME, "body").get_attribute("innerText")
-                matches = re.findall(r'₹\s?([\d,]{3,})', body_txt)
-                candidates = [int(m.replace(',', '')) for m in matches if int(m.replace(',', '')) > 400]
-                if candidates:
-                    details['price'] = candidates[0]
-            except:
-                pass
-
-        # --- E. ORIGINAL PRICE (kRYCnD, gxR4EY) ---
-        try:
-            orig_el = driver.find_element(By.CSS_SELECTOR, "div.kRYCnD, div.gxR4EY, div.yRaY8j")
-            details['original_price'] = clean_price_text(orig_el.text)
-        except:
-            pass
-
-        # --- F. DISCOUNT (HQe8jr) ---
-        try:
-            disc_el = driver.find_element(By.CSS_SELECTOR, "div.HQe8jr, div.UkUFwK")
-            details['discount'] = disc_el.text.strip()
-        except:
-            pass
-
-        # --- G. DESCRIPTION (DTBslk Li's inside ul.HwRTzP) ---
-        try:
-            desc_list = driver.find_elements(By.CSS_SELECTOR, "ul.HwRTzP li.DTBslk, li._21Ahn-")
-            details['features'] = [li.text.strip() for li in desc_list if li.text.strip()]
-            details['description'] = "\n".join(details['features']) if details['features'] else details['title']
-        except:
-            try:
-                # Fallback to older selectors
-                desc_list = driver.find_elements(By.CSS_SELECTOR, "li._21Ahn-")
-                details['features'] = [li.text.strip() for li in desc_list if li.text.strip()]
-                details['description'] = "\n".join(details['features']) if details['features'] else details['title']
-            except:
-                pass
-
-        # --- H. IMAGE (img.UCc1lI or similar) ---
-        try:
-            # Primary image
-            img_el = driver.find_element(By.CSS_SELECTOR, "img.UCc1lI, img._0DkuPH, img[loading='eager']")
-            src = img_el.get_attribute('src')
-            if src:
-                details['image'] = src
-                details['images'].append(src)
-        except:
-            pass
-
-        # Collect all product images
-        try:
-            imgs = driver.find_elements(By.TAG_NAME, "img")
-            collected = []
-            for img in imgs:
-                src = img.get_attribute('src') or ""
-                if src and ('rukminim' in src or 'flixcart' in src) and src not in collected:
-                    collected.append(src)
-            if collected:
-                details['images'] = list(dict.fromkeys(collected + details['images']))
-                if details['image'] == PLACEHOLDER_IMAGE and collected:
-                    details['image'] = collected[0]
-        except:
-            pass
-
-        # --- I. BRAND ---
-        if not details['brand'] and details['title']:
-            title_words = details['title'].split()
-            if title_words:
-                details['brand'] = title_words[0]
-
-        # --- J. SELLER ---
-        try:
-            seller_node = driver.find_element(By.XPATH, "//*[contains(text(), 'Sold by')]/following-sibling::*")
-            details['seller'] = seller_node.text.strip()
-        except:
-            try:
-                seller_node = driver.find_element(By.ID, "sellerName")
-                details['seller'] = seller_node.text.strip()
-            except:
-                pass
-
-        # --- K. SPECIFICATIONS ---
-        try:
-            rows = driver.find_elements(By.CSS_SELECTOR, "tr.WJdYP6, div.row")
-            for row in rows:
-                cols = row.find_elements(By.TAG_NAME, "td")
-                if len(cols) < 2:
-                    cols = row.find_elements(By.CSS_SELECTOR, "div.col")
-                if len(cols) >= 2:
-                    k = cols[0].text.strip()
-                    v = cols[1].text.strip()
-                    if k and v and "Question" not in k:
-                        details['specifications'][k] = v
-                        if k.lower() == "brand":
-                            details['brand'] = v
-        except:
-            pass
-
-        # --- L. STOCK STATUS ---
-        try:
-            oos = driver.find_elements(By.XPATH, "//*[contains(text(),'Out of stock') or contains(text(),'Sold Out') or contains(text(),'Currently unavailable')]")
-            if oos:
-                details['in_stock'] = False
-                details['availability'] = "Out of Stock"
-            else:
-                details['in_stock'] = True
-                details['availability'] = "In Stock"
-        except:
-            # Default to in stock if we can't determine
-            details['in_stock'] = True
-            details['availability'] = "In Stock"
-
-        # --- M. DELIVERY INFO ---
-        try:
-            del_el = driver.find_element(By.XPATH, "//*[contains(text(),'Delivery by') or contains(text(),'Get it by')]")
-            details['delivery_info'] = del_el.text.strip()
-            details['delivery_date'] = details['delivery_info']
-        except:
-            try:
-                # Alternative delivery info location
-                del_el = driver.find_element(By.CSS_SELECTOR, "div[class*='delivery'], span[class*='delivery']")
-                details['delivery_info'] = del_el.text.strip()
-                details['delivery_date'] = details['delivery_info']
-            except:
-                pass
-
-        if debug:
-            print(f"✅ Scraped: {details['title'][:40]}...")
-            print(f"   Price: ₹{details['price']:,} | Rating: {details['rating']}⭐ | Reviews: {details['review_count']}")
-
-        return details
-
-    except Exception as e:
-        if debug:
-            print(f"❌ Scrape Error: {e}")
-        return details
-
-def scrape_flipkart(query: str, pincode: str = None, headless: bool = True, max_products: int = 5, debug: bool = False):
+    # --- D. PRICE (falls back to the first plausible ₹ amount on the page) ---
+    details['price'] = fields['price'] or next((p for p in fields['body_prices'] if p > 400), 0)
+
+    # --- E. ORIGINAL PRICE / F. DISCOUNT ---
+    details['original_price'] = fields['original_price'] or 0
+    details['discount'] = fields['discount'] or ""
+
+    # --- G. DESCRIPTION ---
+    details['features'] = fields['features']
+    details['description'] = "\n".join(details['features']) if details['features'] else details['title']
+
+    # --- H. IMAGES ---
+    if fields['image']:
+        details['image'] = fields['image']
+        details['images'] = [fields['image']]
+    if fields['images']:
+        details['images'] = list(dict.fromkeys(fields['images'] + details['images']))
+        if details['image'] == PLACEHOLDER_IMAGE:
+            details['image'] = fields['images'][0]
+
+    # --- I. BRAND (first word of the title unless the specifications name one) ---
+    if details['title']:
+        details['brand'] = details['title'].split()[0]
+
+    # --- J. SELLER ---
+    details['seller'] = fields['seller'] or ""
+
+    # --- K. SPECIFICATIONS ---
+    details['specifications'] = fields['specifications']
+    for k, v in details['specifications'].items():
+        if k.lower() == "brand":
+            details['brand'] = v
+
+    # --- L. STOCK STATUS ---
+    details['in_stock'] = not fields['out_of_stock']
+    details['availability'] = "In Stock" if details['in_stock'] else "Out of Stock"
+
+    # --- M. DELIVERY INFO ---
+    details['delivery_info'] = fields['delivery_info'] or ""
+    details['delivery_date'] = details['delivery_info']
+
+    return details
+
+def scrape_flipkart_product(product_url: str, pincode: str = None, headless: bool = True, debug: bool = False):
+    """Full details for one product URL (used to enrich a preview offer)."""
+    with lease_driver("flipkart", headless=headless) as driver:
+        preload_location(driver, "flipkart", pincode)
+        with measure_detail():
+            details = get_product_details(driver, product_url, pincode=pincode, debug=debug)
+        return details if details['price'] > 100 else None
+
+def scrape_flipkart(query: str, pincode: str = None, headless: bool = True, max_products: int = 5, debug: bool = False,
+                    preview: bool = False):
     print("\n" + "="*60)
     print(f"🛒 FLIPKART SCRAPER: {query}")
     if pincode:
         print(f"📍 Location: {pincode}")
     print("="*60)
     
-    driver = setup_driver(headless)
-    try:
-        url = f"https://www.flipkart.com/search?q={query.replace(' ', '%20')}&sort=relevance"
+    with lease_driver("flipkart", headless=headless) as driver:
+        preload_location(driver, "flipkart", pincode)
+        url = site_url("flipkart", f"/search?q={query.replace(' ', '%20')}&sort=relevance")
         driver.get(url)
-        time.sleep(2)
+        product_link = "a[href*='/p/']"
+        wait_for_selector(driver, product_link, timeout=10)
         handle_popups(driver)
         driver.execute_script("window.scrollBy(0, 800);")
-        time.sleep(1)
-
-        anchors = driver.find_elements(By.XPATH, "//a[contains(@href, '/p/')]")
-        seen_urls = set()
-        candidates = []
-
-        for a in anchors:
-            href = a.get_attribute('href').split('?')[0]
-            if href in seen_urls:
-                continue
-            
-            raw_title = a.get_attribute('title') or a.text
-            clean_title = raw_title.replace("Add to Compare", "").strip()
-            
-            if len(clean_title) > 10:
-                seen_urls.add(href)
-                candidates.append({'url': href, 'title': clean_title})
-            
-            if len(candidates) >= max_products:
-                break
+        wait_for_count_stable(driver, product_link, timeout=2, settle=0.4)
+
+        candidates = driver.execute_script(SEARCH_RESULTS_SCRIPT, max_products)
 
         if not candidates:
             print("❌ No products found.")
             return None
 
-        for i, item in enumerate(candidates):
+        # Skip accessories
+        accessory_words = ['case', 'cover', 'screen guard', 'protector']
+        products = [item for item in candidates if not any(x in item['title'].lower() for x in accessory_words)]
+        if debug and len(products) < len(candidates):
+            print(f"   ⚠️ Skipped {len(candidates) - len(products)} accessories")
+
+        if preview:
+            # Listing price only; the product page is read when the offer is enriched
+            item = next((p for p in products if clean_price_text(p['price_text']) > 100), None)
+            if item is None:
+                print("❌ No priced listings found.")
+                return None
+            return listing_offer(make_empty_details(item['url']), item['title'],
+                                 clean_price_text(item['price_text']), item['image'])
+
+        def fetch(driver, item):
             if debug:
-                print(f"\n[{i+1}/{len(candidates)}] Checking: {item['title'][:50]}...")
-            
-            # Skip accessories
-            if any(x in item['title'].lower() for x in ['case', 'cover', 'screen guard', 'protector']):
-                if debug:
-                    print(f"   ⚠️ Skipped (Accessory)")
-                continue
-
-            details = get_product_details(driver, item['url'], pincode=pincode, debug=debug)
-            
-            if details['price'] > 100:
-                return details
-            elif debug:
+                print(f"\nChecking: {item['title'][:50]}...")
+            details = get_product_details(driver, item['url'], pincode=pincode, debug=debug, navigate=False)
+            if debug and details['price'] <= 100:
                 print(f"   ⚠️ Skipped (Invalid Price: {details['price']})")
+            return details
 
-        return None
-
-    finally:
-        driver.quit()
+        _, details = first_valid_in_tabs(driver, "flipkart", products, fetch,
+                                         accept=lambda details: details['price'] > 100)
+        return details
 
 def print_result(data):
     if not data:
@@ -0,0 +1,94 @@
+"""
+Pooled keep-alive HTTP sessions for scrapers that can parse server-rendered HTML
+without a browser.
+
+One requests.Session per site is shared by all threads, so TCP/TLS connections
+to the site are reused across searches:
+
+    html = fetch_html("amazon", url)
+    if html is None or looks_blocked(html, AMAZON_BLOCK_MARKERS):
+        ...fall back to the browser...
+
+Requests are bounded by the current ScrapeContext's deadline.
+"""
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scraper.scrape_context import current_context
+
+# ---------- Config ----------
+HTTP_TIMEOUT = float(os.getenv("SCRAPER_HTTP_TIMEOUT", "8"))  # seconds
+HTTP_POOL_SIZE = int(os.getenv("SCRAPER_HTTP_POOL_SIZE", "10"))
+
+DEFAULT_HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                   "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-IN,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+stats = {"requests": 0, "failures": 0, "blocked": 0}
+
+
+def get_session(site: str) -> requests.Session:
+    """Return the shared keep-alive session for a site, creating it on first use."""
+    with _sessions_lock:
+        session = _sessions.get(site)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[site] = session
+        return session
+
+
+def fetch_html(site: str, url: str, timeout: float = HTTP_TIMEOUT,
+               headers: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """GET url through the site's session; returns the body, or None on error / non-200."""
+    ctx = current_context()
+    if ctx is not None:
+        ctx.check()
+        timeout = ctx.remaining(timeout)
+    stats["requests"] += 1
+    try:
+        response = get_session(site).get(url, timeout=timeout, headers=headers)
+        if response.status_code != 200:
+            print(f"⚠️ {site.capitalize()} HTTP {response.status_code} for {url[:80]}")
+            stats["failures"] += 1
+            return None
+        return response.text
+    except requests.RequestException as e:
+        print(f"⚠️ {site.capitalize()} HTTP error: {str(e)[:120]}")
+        stats["failures"] += 1
+        return None
+
+
+def looks_blocked(html: str, markers: Iterable[str]) -> bool:
+    """True if the page is a bot-check / interstitial rather than real content."""
+    lowered = html.lower()
+    blocked = any(marker.lower() in lowered for marker in markers)
+    if blocked:
+        stats["blocked"] += 1
+    return blocked
+
+
+def snapshot() -> Dict[str, int]:
+    return {"sessions": len(_sessions), **stats}
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
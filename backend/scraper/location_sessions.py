@@ -0,0 +1,256 @@
+"""
+Reusable delivery-location sessions keyed by (site, pincode).
+
+Setting a pincode through a site's location popup costs 3-10 s of UI waits per
+product page. After a successful popup flow the cookies (and localStorage) the
+site left behind are stored; later scrapes for the same pincode preload them
+into the leased browser, or send them from the HTTP session, and skip the flow:
+
+    preload_location(driver, "flipkart", pincode)        # before navigating
+    driver.get(product_url)
+    ensure_location(driver, "flipkart", pincode, lambda: set_pincode(driver, pincode))
+
+ensure_location() revalidates a stored session on every use by checking that
+the page actually shows the pincode (after restoring its localStorage and
+reloading, if the cookies alone are not enough); a session that fails the
+check is dropped and the UI flow runs again. Likewise a UI flow's session is
+only stored once the page shows the new pincode. Entries also expire after
+SCRAPER_LOCATION_TTL seconds. Sessions are kept in memory and persisted as JSON under
+SCRAPER_STATE_DIR so they survive restarts.
+"""
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# ---------- Config ----------
+LOCATION_TTL = float(os.getenv("SCRAPER_LOCATION_TTL", str(12 * 3600)))  # seconds
+STATE_DIR = os.getenv("SCRAPER_STATE_DIR", os.path.join(os.path.expanduser("~"), ".shopthrone", "scraper_state"))
+LOCATION_DIR = os.path.join(STATE_DIR, "location")
+
+# Script used to confirm the page reflects a pincode (visible text or a filled input)
+SHOWS_PINCODE_SCRIPT = """
+const pin = arguments[0];
+if (document.body && document.body.innerText.indexOf(pin) !== -1) return true;
+return Array.from(document.querySelectorAll('input')).some(i => i.value === pin);
+"""
+
+
+class LocationSessionStore:
+    """In-memory sessions backed by one JSON file per (site, pincode)."""
+
+    def __init__(self, directory: str = LOCATION_DIR, ttl: float = LOCATION_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"reused": 0, "ui_flows": 0, "saved": 0, "invalidated": 0, "http_reused": 0}
+
+    @staticmethod
+    def _key(site: str, pincode: str) -> str:
+        return f"{site}_{re.sub(r'[^0-9A-Za-z]', '', str(pincode))}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _expired(self, session: Dict[str, Any]) -> bool:
+        return time.time() - session["created_at"] > self.ttl
+
+    def count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get(self, site: str, pincode: str) -> Optional[Dict[str, Any]]:
+        key = self._key(site, pincode)
+        with self._lock:
+            session = self._sessions.get(key)
+        if session is None:
+            try:
+                with open(self._path(key), encoding="utf-8") as f:
+                    session = json.load(f)
+            except (OSError, ValueError):
+                return None
+            with self._lock:
+                self._sessions[key] = session
+        if self._expired(session):
+            self.invalidate(site, pincode, count=False)
+            return None
+        return session
+
+    def save(self, site: str, pincode: str, cookies: List[Dict[str, Any]], local_storage: Dict[str, str]):
+        key = self._key(site, pincode)
+        now = time.time()
+        session = {
+            "site": site, "pincode": pincode, "cookies": cookies, "local_storage": local_storage,
+            "created_at": now, "validated_at": now,
+        }
+        with self._lock:
+            self._sessions[key] = session
+            self.stats["saved"] += 1
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(session, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"⚠️ Could not persist {site} location session: {e}")
+
+    def mark_valid(self, site: str, pincode: str):
+        with self._lock:
+            session = self._sessions.get(self._key(site, pincode))
+            if session is not None:
+                session["validated_at"] = time.time()
+            self.stats["reused"] += 1
+
+    def invalidate(self, site: str, pincode: str, count: bool = True):
+        key = self._key(site, pincode)
+        with self._lock:
+            self._sessions.pop(key, None)
+            if count:
+                self.stats["invalidated"] += 1
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"sessions": len(self._sessions), "ttl_seconds": self.ttl, **self.stats}
+
+
+location_store = LocationSessionStore()
+
+
+# ---------- Browser helpers ----------
+def _cdp_cookie(cookie: Dict[str, Any]) -> Dict[str, Any]:
+    """Selenium get_cookies() entry -> CDP Network.setCookies entry."""
+    converted = {k: cookie[k] for k in ("name", "value", "domain", "path", "secure", "httpOnly") if k in cookie}
+    if cookie.get("sameSite") in ("Strict", "Lax", "None"):
+        converted["sameSite"] = cookie["sameSite"]
+    if "expiry" in cookie:
+        converted["expires"] = cookie["expiry"]
+    return converted
+
+
+def preload_location(driver, site: str, pincode: Optional[str]) -> bool:
+    """Load a stored session's cookies into the browser before the site is opened."""
+    if not pincode:
+        return False
+    session = location_store.get(site, pincode)
+    if not session:
+        return False
+    try:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": [_cdp_cookie(c) for c in session["cookies"]]})
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not preload {site} location session: {e}")
+        return False
+
+
+def _restore_local_storage(driver, session: Dict[str, Any]):
+    if session.get("local_storage"):
+        try:
+            driver.execute_script(
+                "const items = arguments[0]; for (const k in items) localStorage.setItem(k, items[k]);",
+                session["local_storage"],
+            )
+        except Exception:
+            pass
+
+
+def _reload_with_local_storage(driver, session: Dict[str, Any]) -> bool:
+    """Write a session's localStorage into the current origin and reload so the site reads it.
+
+    Only cookies can be preloaded before navigation; sites that keep the
+    location in localStorage need this before the page can show the pincode.
+    """
+    _restore_local_storage(driver, session)
+    try:
+        driver.refresh()
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not reload with the stored {session.get('site')} location: {e}")
+        return False
+
+
+def capture_location(driver, site: str, pincode: str):
+    """Store the cookies and localStorage of a page where the pincode was just set."""
+    try:
+        cookies = driver.get_cookies()
+        local_storage = driver.execute_script(
+            "const out = {}; for (let i = 0; i < localStorage.length; i++) {"
+            " const k = localStorage.key(i); out[k] = localStorage.getItem(k); } return out;"
+        ) or {}
+    except Exception as e:
+        print(f"⚠️ Could not capture {site} location session: {e}")
+        return
+    location_store.save(site, pincode, cookies, local_storage)
+
+
+def page_shows_pincode(driver, pincode: str) -> bool:
+    try:
+        return bool(driver.execute_script(SHOWS_PINCODE_SCRIPT, str(pincode)))
+    except Exception:
+        return False
+
+
+def ensure_location(driver, site: str, pincode: Optional[str], set_location: Callable[[], bool]) -> bool:
+    """Make the current page use `pincode`, reusing a stored session when the page confirms it.
+
+    Falls back to set_location() (the site's popup flow) and stores the
+    resulting session when that succeeds. Returns True if the location is set.
+    """
+    if not pincode:
+        return False
+    session = location_store.get(site, pincode)
+    if session:
+        if page_shows_pincode(driver, pincode):
+            _restore_local_storage(driver, session)
+            location_store.mark_valid(site, pincode)
+            print(f"   📍 Reused {site} location session for {pincode}")
+            return True
+        if session.get("local_storage") and _reload_with_local_storage(driver, session) \
+                and page_shows_pincode(driver, pincode):
+            location_store.mark_valid(site, pincode)
+            print(f"   📍 Reused {site} location session for {pincode} (restored localStorage)")
+            return True
+        location_store.invalidate(site, pincode)
+
+    location_store.count("ui_flows")
+    if not set_location():
+        return False
+    # Popup flows can report success without the pincode taking effect; only a
+    # confirmed location is worth storing
+    if page_shows_pincode(driver, pincode):
+        capture_location(driver, site, pincode)
+    else:
+        print(f"   ⚠️ {site.capitalize()} page does not show {pincode}, location session not stored")
+    return True
+
+
+# ---------- HTTP helpers ----------
+def cookie_header(site: str, pincode: Optional[str]) -> Optional[str]:
+    """Cookie header carrying a stored session, for HTTP fetches on behalf of a pincode."""
+    if not pincode:
+        return None
+    session = location_store.get(site, pincode)
+    if not session or not session["cookies"]:
+        return None
+    return "; ".join(f"{c['name']}={c['value']}" for c in session["cookies"] if "name" in c)
+
+
+def html_shows_pincode(site: str, pincode: str, html: str) -> bool:
+    """Revalidate a session used over HTTP; drops it if the page ignores the pincode."""
+    if str(pincode) in (html or ""):
+        location_store.mark_valid(site, pincode)
+        location_store.count("http_reused")
+        return True
+    location_store.invalidate(site, pincode)
+    return False
+
+
+def snapshot() -> Dict[str, Any]:
+    return location_store.snapshot()
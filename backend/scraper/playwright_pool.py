@@ -0,0 +1,175 @@
+"""
+Long-lived Playwright browsers with cheap per-search BrowserContexts.
+
+Playwright's sync API is bound to the thread that started it, so the pool owns a
+small set of worker threads. Each worker starts the Playwright runtime and a
+Chromium browser once, then serves searches by opening a fresh BrowserContext,
+running the caller's function against it and closing the context again:
+
+    result = run_in_context(lambda context: scrape(context.new_page()))
+
+The number of workers caps the number of concurrent contexts. A browser that
+has crashed or disconnected is relaunched on the next search.
+
+Playwright objects cannot be touched from other threads, so a cancelled
+ScrapeContext is honoured cooperatively: the context's default timeouts are
+bounded by the scrape deadline and scrapers call check_cancelled() between
+steps; the BrowserContext is closed as soon as the function returns.
+
+Passing `site` installs that site's request-blocking policy on the context.
+"""
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from playwright.sync_api import sync_playwright
+
+from scraper.request_blocking import apply_playwright_policy
+from scraper.scrape_context import current_context
+
+# ---------- Config ----------
+MAX_CONTEXTS = int(os.getenv("PLAYWRIGHT_MAX_CONTEXTS", "2"))
+WARMUP_TIMEOUT = 60  # seconds
+
+
+class PlaywrightPool:
+    """Worker threads that each own a Playwright runtime and browser."""
+
+    def __init__(self, max_contexts: int = MAX_CONTEXTS):
+        self.max_contexts = max_contexts
+        self._executor = ThreadPoolExecutor(max_workers=max_contexts, thread_name_prefix="playwright")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._active = 0
+        self.stats = {"launches": 0, "relaunches": 0, "contexts": 0}
+
+    # ---------- Worker-thread helpers ----------
+    def _get_browser(self, headless: bool):
+        local = self._local
+        if getattr(local, "playwright", None) is None:
+            local.playwright = sync_playwright().start()
+            local.browsers = {}
+
+        browser = local.browsers.get(headless)
+        if browser is not None and browser.is_connected():
+            return browser
+
+        if browser is not None:
+            self.stats["relaunches"] += 1
+            try:
+                browser.close()
+            except Exception:
+                pass
+        browser = local.playwright.chromium.launch(headless=headless)
+        local.browsers[headless] = browser
+        self.stats["launches"] += 1
+        return browser
+
+    def _close_thread_browsers(self, barrier: threading.Barrier):
+        local = self._local
+        try:
+            for browser in getattr(local, "browsers", {}).values():
+                try:
+                    browser.close()
+                except Exception:
+                    pass
+            if getattr(local, "playwright", None) is not None:
+                local.playwright.stop()
+        finally:
+            local.playwright = None
+            local.browsers = {}
+        barrier.wait(WARMUP_TIMEOUT)
+
+    def _warm_thread(self, headless: bool, barrier: threading.Barrier):
+        self._get_browser(headless)
+        # Holding every worker at the barrier guarantees each thread gets one task
+        barrier.wait(WARMUP_TIMEOUT)
+
+    def _run(self, fn: Callable[[Any], Any], headless: bool, context_options: Dict[str, Any],
+             site: Optional[str] = None):
+        with self._lock:
+            self._active += 1
+        try:
+            browser = self._get_browser(headless)
+            try:
+                context = browser.new_context(**context_options)
+            except Exception:
+                # The browser may have died between the health check and now
+                self._local.browsers.pop(headless, None)
+                browser = self._get_browser(headless)
+                context = browser.new_context(**context_options)
+            self.stats["contexts"] += 1
+            ctx = current_context()
+            if ctx is not None and ctx.deadline is not None:
+                context.set_default_timeout(max(1000, ctx.remaining() * 1000))
+            if site:
+                apply_playwright_policy(context, site)
+            try:
+                return fn(context)
+            finally:
+                try:
+                    context.close()
+                except Exception:
+                    pass
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    # ---------- Public API ----------
+    def run(self, fn: Callable[[Any], Any], headless: bool = True,
+            context_options: Optional[Dict[str, Any]] = None, site: Optional[str] = None):
+        """Run fn(context) in a fresh BrowserContext and return its result."""
+        # Carry the caller's ScrapeContext over to the worker thread
+        run_ctx = contextvars.copy_context()
+        future = self._executor.submit(run_ctx.run, self._run, fn, headless, context_options or {}, site)
+        return future.result()
+
+    def warm_up(self, headless: bool = True):
+        """Launch a browser on every worker thread ahead of the first search."""
+        barrier = threading.Barrier(self.max_contexts)
+        futures = [self._executor.submit(self._warm_thread, headless, barrier)
+                   for _ in range(self.max_contexts)]
+        for future in futures:
+            future.result()
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"max_contexts": self.max_contexts, "active_contexts": self._active, **self.stats}
+
+    def close(self):
+        barrier = threading.Barrier(self.max_contexts)
+        futures = [self._executor.submit(self._close_thread_browsers, barrier)
+                   for _ in range(self.max_contexts)]
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+        self._executor.shutdown(wait=True)
+
+
+_pool: Optional[PlaywrightPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_playwright_pool() -> PlaywrightPool:
+    """Return the process-wide Playwright pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PlaywrightPool()
+        return _pool
+
+
+def run_in_context(fn: Callable[[Any], Any], headless: bool = True,
+                   context_options: Optional[Dict[str, Any]] = None, site: Optional[str] = None):
+    return get_playwright_pool().run(fn, headless=headless, context_options=context_options, site=site)
+
+
+def shutdown_playwright_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -12,12 +12,18 @@ Python linters (Pylance / pylint / pyflakes).
 """
 
 import re
-import time
-import json
 from typing import Dict, Any, List, Optional
 from urllib.parse import quote_plus, urljoin
 
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from scraper.common_utils import (
+    COUNT_TILES_JS, detail_fanout, first_valid_in_pages, listing_offer, measure_idle, scroll_until_loaded,
+)
+from scraper.playwright_pool import run_in_context
+from scraper.scrape_context import check_cancelled, measure_detail
+from scraper.site_urls import site_host, site_url
+from scraper.structured_data import apply_fast_path
 
 # ---------- Config ----------
 PLACEHOLDER_IMAGE = "https://placehold.co/300x400/EEE/31343C?text=No+Image"
@@ -25,6 +31,13 @@ DEFAULT_TIMEOUT = 15000  # milliseconds
 MAX_SCROLLS = 12
 VALID_PRICE_MIN = 1000
 VALID_PRICE_MAX = 10_000_000
+PRODUCT_CARD_SELECTOR = 'a[href*="/pd/"], a[href*="/p/"], a[href*="/product/"], .product-card, .sp__product'
+CONTEXT_OPTIONS = {
+    "user_agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                   "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"),
+    "locale": "en-IN",
+    "viewport": {"width": 1920, "height": 1080},
+}
 
 # ---------- Helpers ----------
 def clean_price_text(price_text: str) -> int:
@@ -75,7 +88,8 @@ def make_empty_details(product_url: str) -> Dict[str, Any]:
 # ---------- Page utilities ----------
 def safe_wait_for_selector(page, selector: str, timeout: int = DEFAULT_TIMEOUT) -> Optional[bool]:
     try:
-        page.wait_for_selector(selector, timeout=timeout)
+        with measure_idle():
+            page.wait_for_selector(selector, timeout=timeout)
         return True
     except PlaywrightTimeoutError:
         return False
@@ -83,17 +97,31 @@ def safe_wait_for_selector(page, selector: str, timeout: int = DEFAULT_TIMEOUT)
         return False
 
 
-def scroll_to_load(page, max_scrolls: int = MAX_SCROLLS, pause: float = 0.9):
-    """Scroll to bottom repeatedly to trigger lazy loading."""
-    for _ in range(max_scrolls):
-        try:
-            page.evaluate("window.scrollBy(0, document.body.scrollHeight);")
-            time.sleep(pause)
-            # small upward nudge to trigger frameworks which lazy-load on up-scroll
-            page.evaluate("window.scrollBy(0, -50);")
-        except Exception:
-            # swallow per-iteration errors and continue
-            time.sleep(0.5)
+def safe_wait_for_function(page, expression: str, timeout: int = DEFAULT_TIMEOUT) -> bool:
+    try:
+        with measure_idle():
+            page.wait_for_function(expression, timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+def count_product_cards(page) -> int:
+    try:
+        return page.evaluate(COUNT_TILES_JS, PRODUCT_CARD_SELECTOR)
+    except Exception:
+        return 0
+
+
+def scroll_to_load(page, target: int, max_scrolls: int = MAX_SCROLLS, settle: float = 0.5) -> int:
+    """Scroll to bottom to trigger lazy loading until `target` cards are listed or new cards stop appearing."""
+    def scroll():
+        page.evaluate("window.scrollBy(0, document.body.scrollHeight);")
+        # small upward nudge to trigger frameworks which lazy-load on up-scroll
+        page.evaluate("window.scrollBy(0, -50);")
+
+    return scroll_until_loaded(scroll, lambda: count_product_cards(page), target, max_scrolls,
+                               timeout=2.5, settle=settle)
 
 
 # ---------- Product extraction from search results ----------
@@ -103,10 +131,11 @@ def extract_products_from_search_page(page) -> List[Dict[str, Any]]:
     extract product cards and return list of dicts: {url, title, price_text, image}.
     """
     products: List[Dict[str, Any]] = []
+    host = site_host("reliance")
     try:
         # Run a robust JS snippet in the page context to collect candidate product anchors/cards.
         script = r"""
-        (() => {
+        (host) => {
             const out = [];
             const seen = new Set();
             const candidates = Array.from(document.querySelectorAll(
@@ -119,7 +148,7 @@ def extract_products_from_search_page(page) -> List[Dict[str, Any]]:
                     let href = linkEl.href || linkEl.getAttribute('href') || '';
                     if (!href) continue;
                     if (href.startsWith('/')) href = window.location.origin + href;
-                    if (!href.includes('reliancedigital.in')) continue;
+                    if (!href.includes(host)) continue;
                     if (seen.has(href)) continue;
                     seen.add(href);
 
@@ -147,10 +176,10 @@ def extract_products_from_search_page(page) -> List[Dict[str, Any]]:
                 }
             }
             return out;
-        })();
+        }
         """
         try:
-            items = page.evaluate(script)
+            items = page.evaluate(script, host)
         except Exception:
             items = []
 
@@ -158,7 +187,7 @@ def extract_products_from_search_page(page) -> List[Dict[str, Any]]:
             for it in items:
                 try:
                     url = it.get("url", "")
-                    if not url or "reliancedigital.in" not in url:
+                    if not url or host not in url:
                         continue
                     products.append({
                         "url": url,
@@ -185,7 +214,7 @@ def extract_products_from_search_page(page) -> List[Dict[str, Any]]:
                         continue
                     if href.startswith('/'):
                         href = urljoin(page.url, href)
-                    if href in seen_anchors or "reliancedigital.in" not in href:
+                    if href in seen_anchors or host not in href:
                         continue
                     seen_anchors.add(href)
 
@@ -236,676 +265,348 @@ def extract_products_from_search_page(page) -> List[Dict[str, Any]]:
 
 
 # ---------- Product details extractor ----------
-def get_product_details(page, product_url: str, pincode: Optional[str] = None) -> Optional[Dict[str, Any]]:
-    """
-    Visit the product URL and extract all details into the details dict.
-    """
-    details = make_empty_details(product_url)
-    try:
-        try:
-            page.goto(product_url, timeout=DEFAULT_TIMEOUT)
-        except PlaywrightTimeoutError:
-            # proceed even if navigation timed out (partial content may exist)
-            pass
-        except Exception:
-            pass
-
-        # Wait for body
-        safe_wait_for_selector(page, "body", timeout=8000)
-        # Give SPA time to hydrate
-        time.sleep(2.0)
-
-        # Try JSON-LD structured data first
-        try:
-            json_ld_texts = []
-            try:
-                json_ld_texts = page.evaluate("""
-                    () => {
-                        const scripts = Array.from(document.querySelectorAll('script[type="application/ld+json"]'));
-                        return scripts.map(s => s.textContent);
-                    }
-                """)
-            except Exception:
-                json_ld_texts = []
+# Everything the product page DOM fallbacks read, collected in one round trip.
+# Each list mirrors one of the former per-field page.evaluate / query_selector
+# calls; filtering and precedence stay in details_from_snapshot().
+PRODUCT_SNAPSHOT_SCRIPT = r"""
+() => {
+    const text = el => { try { return (el.innerText || '').trim(); } catch (e) { return ''; } };
+    const first = (selectors, read) => {
+        for (const sel of selectors) {
+            const el = document.querySelector(sel);
+            if (!el) continue;
+            const v = read(el, sel);
+            if (v) return v;
+        }
+        return '';
+    };
+    const collect = (nodes, keep, limit) => {
+        const out = [];
+        for (const n of nodes) {
+            const t = text(n);
+            if (t && keep(t, n)) out.push(t);
+            if (out.length >= limit) break;
+        }
+        return out;
+    };
+    const all = Array.from(document.querySelectorAll('*'));
+    const blocks = Array.from(document.querySelectorAll('span, div, p, strong'));
+    const xpathExists = xp => !!document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    const upper = "translate(., 'abcdefghijklmnopqrstuvwxyz','ABCDEFGHIJKLMNOPQRSTUVWXYZ')";
+
+    const images = [];
+    for (const img of document.querySelectorAll('img')) {
+        const src = img.src || img.getAttribute('data-src') || img.getAttribute('data-lazy-src') || img.getAttribute('data-srcset') || '';
+        if (!src || /thumb|icon|logo|50x50|100x100/i.test(src)) continue;
+        images.push(src.startsWith('//') ? window.location.protocol + src : src);
+    }
 
-            if json_ld_texts:
-                for txt in json_ld_texts:
-                    if not txt:
-                        continue
-                    data = None
-                    try:
-                        data = json.loads(txt)
-                    except Exception:
-                        # Attempt to locate an object containing "@type":"Product" via regex
-                        try:
-                            m = re.search(r'(\{[\s\S]*?"@type"\s*:\s*"?Product"?[\s\S]*?\})', txt)
-                            if m:
-                                data = json.loads(m.group(1))
-                        except Exception:
-                            data = None
-
-                    if not data:
-                        continue
+    return {
+        html: document.documentElement.outerHTML,
+        title: first(['h1.pdp__title', "h1[class*='title']", 'h1.product-title', '.pdp__product-name', 'h1', '.product-name'],
+                     el => text(el)),
+        brand: first(['.pdp__brand', "[class*='brand']", '.product-brand', "meta[itemprop='brand']"], (el, sel) => {
+            const v = sel.startsWith('meta') ? (el.getAttribute('content') || '') : text(el);
+            return v && v.length < 100 ? v : '';
+        }),
+        price_texts: collect(blocks, t => t.includes('₹') && t.length <= 120, 80),
+        mrp_texts: collect(all, (t, el) => t.includes('₹') && (/(mrp|m.r.p|strikedown|strike)/i.test(t)
+            || (el.className || '').toString().toLowerCase().includes('old')
+            || (el.className || '').toString().toLowerCase().includes('strike')), 20),
+        discount_texts: collect(blocks, t => (/%\s*off/i.test(t) || /\bSave\b/i.test(t) || /\bsave\b/.test(t)) && t.length < 120, 20),
+        images: Array.from(new Set(images)).slice(0, 20),
+        rating_texts: collect(all, t => /\d+(\.\d+)?\s*\/\s*5/.test(t) || /\d+(\.\d+)?\s*out of\s*5/i.test(t)
+            || (/rating/i.test(t) && /[0-5](\.\d)?/.test(t)), 20),
+        review_texts: collect(all, t => /\d+\s+(?:reviews|review|ratings|rating)/i.test(t), 20),
+        body_text: document.body ? (document.body.innerText || '') : '',
+        add_to_cart: xpathExists(`//button[contains(${upper}, 'ADD TO CART')]`)
+            || xpathExists(`//button[contains(${upper}, 'BUY NOW')]`)
+            || !!document.querySelector("button[class*='add-to-cart'], button[class*='buy-now'], button[id*='add'], button[id*='buy']"),
+        delivery_texts: collect(all, t => /delivery|delivered by|get it by|arrive|dispatch/i.test(t) && t.length < 250, 20),
+        warranty_texts: collect(all, t => /warranty/i.test(t) && t.length < 200, 20),
+        description: collect(document.querySelectorAll("div[class*='description'], div[class*='product-desc'], #product-description, .productDetails, .pdp-description"),
+                             t => t.length > 40, 1)[0] || '',
+        features: Array.from(document.querySelectorAll("ul[class*='features'] li, .highlights li, .feature-list li, .product-highlights li"))
+            .slice(0, 20).map(text).filter(t => t.length > 4),
+        spec_rows: Array.from(document.querySelectorAll("table.specs tr, table[class*='spec'] tr, .specification tr"))
+            .slice(0, 40).map(tr => Array.from(tr.querySelectorAll('td, th')).slice(0, 2).map(text)),
+        spec_items: Array.from(document.querySelectorAll('.specification li, .specs li, .product-specs li'))
+            .slice(0, 60).map(text),
+    };
+}
+"""
 
-                    # If data is array, pick Product object
-                    if isinstance(data, list):
-                        for d in data:
-                            if isinstance(d, dict) and d.get('@type', '').lower() == 'product':
-                                data = d
-                                break
-
-                    if isinstance(data, dict) and data.get('@type', '').lower() == 'product':
-                        try:
-                            details["title"] = data.get("name") or details["title"]
-                            brand = data.get("brand", "")
-                            if isinstance(brand, dict):
-                                details["brand"] = brand.get("name") or details["brand"]
-                            elif isinstance(brand, str):
-                                details["brand"] = brand or details["brand"]
-                            details["description"] = data.get("description") or details["description"]
-                            img = data.get("image")
-                            if isinstance(img, list) and img:
-                                details["images"] = [i for i in img if isinstance(i, str)]
-                                details["image"] = details["images"][0] if details["images"] else details["image"]
-                            elif isinstance(img, str) and img:
-                                details["image"] = img
-
-                            if "offers" in data:
-                                offers = data["offers"]
-                                if isinstance(offers, dict):
-                                    price_str = offers.get("price", "") or offers.get("priceCurrency", "")
-                                    try:
-                                        details["price"] = int(float(price_str)) if str(price_str).strip() else details["price"]
-                                    except Exception:
-                                        pass
-                                    avail = offers.get("availability", "")
-                                    details["in_stock"] = "instock" in str(avail).lower()
-                                    details["availability"] = "In stock" if details["in_stock"] else details["availability"]
-                                elif isinstance(offers, list) and offers:
-                                    try:
-                                        price_str = offers[0].get("price", "")
-                                        details["price"] = int(float(price_str)) if str(price_str).strip() else details["price"]
-                                        avail = offers[0].get("availability", "")
-                                        details["in_stock"] = "instock" in str(avail).lower()
-                                        details["availability"] = "In stock" if details["in_stock"] else details["availability"]
-                                    except Exception:
-                                        pass
-
-                            if "aggregateRating" in data:
-                                try:
-                                    rating_data = data["aggregateRating"]
-                                    details["rating"] = float(rating_data.get("ratingValue", 0) or 0)
-                                    details["review_count"] = int(rating_data.get("reviewCount", 0) or 0)
-                                except Exception:
-                                    pass
-                        except Exception:
-                            # continue trying DOM fallbacks
-                            pass
-                        # once JSON-LD product found, break
-                        break
-        except Exception:
-            pass
 
-        # Title fallback
-        if not details["title"]:
-            title_selectors = [
-                "h1.pdp__title",
-                "h1[class*='title']",
-                "h1.product-title",
-                ".pdp__product-name",
-                "h1",
-                ".product-name"
-            ]
-            for sel in title_selectors:
-                try:
-                    el = page.query_selector(sel)
-                    if el:
-                        txt = el.inner_text().strip()
-                        if txt:
-                            details["title"] = txt
-                            break
-                except Exception:
-                    continue
+def details_from_snapshot(snapshot: Dict[str, Any], product_url: str) -> Dict[str, Any]:
+    """Build the details dict from a PRODUCT_SNAPSHOT_SCRIPT result.
 
-        # Brand fallback
-        if not details["brand"]:
-            brand_selectors = [
-                ".pdp__brand",
-                "[class*='brand']",
-                ".product-brand",
-                "meta[itemprop='brand']"
-            ]
-            for sel in brand_selectors:
-                try:
-                    el = page.query_selector(sel)
-                    if el:
-                        if sel.startswith("meta"):
-                            v = el.get_attribute("content") or ""
-                        else:
-                            v = el.inner_text().strip()
-                        if v and len(v) < 100:
-                            details["brand"] = v
-                            break
-                except Exception:
-                    continue
+    Structured data (JSON-LD / app state) is merged first; the DOM values only
+    fill the fields it leaves empty, as in the original per-field extraction.
+    """
+    details = make_empty_details(product_url)
+    # No location flow on Reliance product pages, so the pincode does not gate this
+    if apply_fast_path("reliance", details, snapshot.get("html") or "", fill_partial=True):
+        return details
 
-        # Price extraction (smart)
-        if not details["price"]:
-            price_candidates: List[int] = []
+    if not details["title"]:
+        details["title"] = snapshot.get("title") or ""
+    if not details["brand"]:
+        details["brand"] = snapshot.get("brand") or ""
+
+    # Price: lowest plausible ₹ amount that isn't an EMI / MRP / savings figure
+    if not details["price"]:
+        skip = ['emi', '/mo', 'month', 'per month', 'mrp', 'was', 'save', 'exchange']
+        prices = sorted({
+            val for val in (clean_price_text(t) for t in snapshot.get("price_texts") or []
+                            if not any(word in t.lower() for word in skip))
+            if VALID_PRICE_MIN < val < VALID_PRICE_MAX
+        })
+        if prices:
+            details["price"] = prices[0]
+
+    # Original price / MRP: first ₹ amount above the selling price
+    for txt in snapshot.get("mrp_texts") or []:
+        v = clean_price_text(txt)
+        if v and v > details.get("price", 0):
+            details["original_price"] = v
+            break
+
+    if snapshot.get("discount_texts"):
+        details["discount"] = snapshot["discount_texts"][0]
+
+    if snapshot.get("images"):
+        details["images"] = snapshot["images"]
+        if not details.get("image") or details["image"] == PLACEHOLDER_IMAGE:
+            details["image"] = snapshot["images"][0]
+
+    # Rating & Reviews
+    for rt in snapshot.get("rating_texts") or []:
+        m = re.search(r'(\d+(?:\.\d+)?)', rt)
+        if m and 0 < float(m.group(1)) <= 5:
+            details["rating"] = float(m.group(1))
+            break
+    for rt in snapshot.get("review_texts") or []:
+        m = re.search(r'(\d+)\s*(?:reviews|review|ratings|rating)', rt, re.I)
+        if m:
+            details["review_count"] = int(m.group(1))
+            break
+
+    # Stock status
+    body_text = (snapshot.get("body_text") or "").lower()
+    if any(x in body_text for x in ["out of stock", "sold out", "currently unavailable", "not available"]):
+        details["in_stock"] = False
+        details["availability"] = "Out of stock"
+    else:
+        details["in_stock"] = bool(snapshot.get("add_to_cart"))
+        if details["in_stock"]:
+            details["availability"] = "In stock"
+
+    # Delivery info
+    if snapshot.get("delivery_texts"):
+        details["delivery_info"] = snapshot["delivery_texts"][0]
+        m = re.search(r'\b\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\b.*\d{4}?',
+                      details["delivery_info"], re.I)
+        if m:
+            details["delivery_date"] = m.group(0)
+
+    details["emi_available"] = 'emi' in body_text
+    if snapshot.get("warranty_texts"):
+        details["warranty"] = snapshot["warranty_texts"][0]
+
+    if not details["description"]:
+        details["description"] = snapshot.get("description") or ""
+    if snapshot.get("features"):
+        details["features"] = snapshot["features"]
+
+    # Specifications: table rows, else "Key: value" list items
+    spec: Dict[str, str] = {}
+    for cells in snapshot.get("spec_rows") or []:
+        if len(cells) >= 2 and cells[0] and cells[1]:
+            spec[cells[0]] = cells[1]
+    if not spec:
+        for txt in snapshot.get("spec_items") or []:
+            if ':' in txt:
+                k, v = txt.split(':', 1)
+                spec[k.strip()] = v.strip()
+    if spec:
+        details["specifications"] = spec
+
+    return details
+
+
+def get_product_details(page, product_url: str, pincode: Optional[str] = None,
+                        navigate: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Visit the product URL and extract all details into the details dict.
+    Pass navigate=False when the page is already loading product_url.
+    """
+    try:
+        if navigate:
             try:
-                js_collect = r"""
-                () => {
-                    const out = [];
-                    const nodes = Array.from(document.querySelectorAll('span, div, p, strong'));
-                    for (const n of nodes) {
-                        try {
-                            const txt = n.innerText || '';
-                            if (!txt || txt.indexOf('₹') === -1) continue;
-                            if (txt.length > 120) continue;
-                            out.push(txt.trim());
-                        } catch(e){}
-                    }
-                    return out.slice(0, 80);
-                }
-                """
-                price_texts = []
-                try:
-                    price_texts = page.evaluate(js_collect) or []
-                except Exception:
-                    price_texts = []
-
-                for pt in price_texts:
-                    try:
-                        low = pt.lower()
-                        if any(word in low for word in ['emi', '/mo', 'month', 'per month', 'mrp', 'was', 'save', 'exchange']):
-                            continue
-                        val = clean_price_text(pt)
-                        if VALID_PRICE_MIN < val < VALID_PRICE_MAX:
-                            price_candidates.append(val)
-                    except Exception:
-                        continue
-
-                price_candidates = sorted(set(price_candidates))
-                if price_candidates:
-                    details["price"] = price_candidates[0]
+                page.goto(product_url, timeout=DEFAULT_TIMEOUT)
+            except PlaywrightTimeoutError:
+                # proceed even if navigation timed out (partial content may exist)
+                pass
             except Exception:
                 pass
 
-        # Original price / MRP
-        try:
-            mrp_texts = []
-            try:
-                mrp_texts = page.evaluate(r"""
-                    () => {
-                        const out = [];
-                        const els = Array.from(document.querySelectorAll('*'));
-                        for (const el of els) {
-                            try {
-                                const txt = el.innerText || '';
-                                if (!txt) continue;
-                                if (/(mrp|m.r.p|strikedown|strike)/i.test(txt) || (el.className || '').toString().toLowerCase().includes('old') || (el.className || '').toString().toLowerCase().includes('strike')) {
-                                    if (txt.indexOf('₹') !== -1) out.push(txt.trim());
-                                }
-                            } catch(e){}
-                        }
-                        return out.slice(0,20);
-                    }
-                """)
-            except Exception:
-                mrp_texts = []
+        # Wait for the SPA to hydrate far enough to render a title and a price
+        safe_wait_for_selector(page, "h1", timeout=8000)
+        safe_wait_for_function(page, "() => !!document.body && document.body.innerText.includes('₹')", timeout=4000)
 
-            if mrp_texts:
-                for txt in mrp_texts:
-                    try:
-                        v = clean_price_text(txt)
-                        if v and v > details.get("price", 0):
-                            details["original_price"] = v
-                            break
-                    except Exception:
-                        continue
-        except Exception:
-            pass
+        snapshot = page.evaluate(PRODUCT_SNAPSHOT_SCRIPT)
+        return details_from_snapshot(snapshot or {}, product_url)
 
-        # Discount detection via JS
-        try:
-            disc_txts = []
-            try:
-                disc_txts = page.evaluate(r"""
-                    () => {
-                        const out = [];
-                        const nodes = Array.from(document.querySelectorAll('span, div, p, strong'));
-                        for (const n of nodes) {
-                            try {
-                                const t = (n.innerText || '').trim();
-                                if (!t) continue;
-                                if (/%\s*off/i.test(t) || /\bSave\b/i.test(t) || /\bsave\b/.test(t)) {
-                                    if (t.length < 120) out.push(t);
-                                }
-                            } catch(e){}
-                        }
-                        return out.slice(0, 20);
-                    }
-                """)
-            except Exception:
-                disc_txts = []
+    except Exception:
+        # Return None on a page-level failure
+        return None
 
-            if disc_txts:
-                details["discount"] = disc_txts[0]
-        except Exception:
-            pass
 
-        # Images (gallery)
-        try:
-            imgs = []
-            try:
-                imgs = page.evaluate(r"""
-                    () => {
-                        const out = [];
-                        const gallery = Array.from(document.querySelectorAll('img'));
-                        for (const img of gallery) {
-                            try {
-                                const src = img.src || img.getAttribute('data-src') || img.getAttribute('data-lazy-src') || img.getAttribute('data-srcset') || '';
-                                if (!src) continue;
-                                if (/thumb|icon|logo|50x50|100x100/i.test(src)) continue;
-                                out.push(src.startsWith('//') ? window.location.protocol + src : src);
-                            } catch(e){}
-                        }
-                        return Array.from(new Set(out)).slice(0, 20);
-                    }
-                """)
-            except Exception:
-                imgs = []
-
-            if imgs:
-                details["images"] = imgs
-                if not details.get("image") or details["image"] == PLACEHOLDER_IMAGE:
-                    details["image"] = imgs[0]
-        except Exception:
-            pass
+# ---------- Main scraper (Playwright) ----------
+def _scrape_in_context(context, query: str, pincode: Optional[str], max_candidates: int,
+                       preview: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Run the search/detail flow inside a BrowserContext leased from the Playwright pool.
+    With preview=True the flow stops at the search page and returns the cheapest listing.
+    """
+    page = context.new_page()
 
-        # Rating & Reviews
-        try:
-            rating_txts = []
-            try:
-                rating_txts = page.evaluate(r"""
-                    () => {
-                        const out = [];
-                        const nodes = Array.from(document.querySelectorAll('*'));
-                        for (const n of nodes) {
-                            try {
-                                const t = (n.innerText || '').trim();
-                                if (!t) continue;
-                                if (/\d+(\.\d+)?\s*\/\s*5/.test(t) || /\d+(\.\d+)?\s*out of\s*5/i.test(t) || (/rating/i.test(t) && /[0-5](\.\d)?/.test(t))) {
-                                    out.push(t);
-                                }
-                            } catch(e){}
-                        }
-                        return out.slice(0, 20);
-                    }
-                """)
-            except Exception:
-                rating_txts = []
+    query_clean = (query or "").strip()
+    q_param = quote_plus(query_clean)
+    search_url = site_url("reliance", f"/products?q={q_param}")
 
-            if rating_txts:
-                for rt in rating_txts:
-                    try:
-                        m = re.search(r'(\d+(?:\.\d+)?)', rt)
-                        if m:
-                            val = float(m.group(1))
-                            if 0 < val <= 5:
-                                details["rating"] = val
-                                break
-                    except Exception:
-                        continue
+    try:
+        page.goto(search_url, timeout=DEFAULT_TIMEOUT)
+    except PlaywrightTimeoutError:
+        # proceed even if navigation times out
+        pass
+    except Exception:
+        pass
 
-            review_texts = []
-            try:
-                review_texts = page.evaluate(r"""
-                    () => {
-                        const out = [];
-                        const nodes = Array.from(document.querySelectorAll('*'));
-                        for (const n of nodes) {
-                            try {
-                                const t = (n.innerText || '').trim();
-                                if (!t) continue;
-                                if (/\d+\s+(?:reviews|review|ratings|rating)/i.test(t)) out.push(t);
-                            } catch(e){}
-                        }
-                        return out.slice(0, 20);
-                    }
-                """)
-            except Exception:
-                review_texts = []
+    safe_wait_for_selector(page, PRODUCT_CARD_SELECTOR, timeout=6000)
+    scroll_to_load(page, max_candidates)
 
-            if review_texts:
-                for rt in review_texts:
-                    try:
-                        m = re.search(r'(\d+)\s*(?:reviews|review|ratings|rating)', rt, re.I)
-                        if m:
-                            details["review_count"] = int(m.group(1))
-                            break
-                    except Exception:
-                        continue
-        except Exception:
-            pass
+    try:
+        body_text = page.inner_text("body") or ""
+    except Exception:
+        body_text = ""
 
-        # Stock status
+    if len(body_text.strip()) < 200 or any(x in body_text.lower() for x in ["page was not found", "oops", "no results found"]):
+        category = query_clean.lower().replace(' ', '-')
+        collection_url = site_url("reliance", f"/collection/{category}")
         try:
-            body_text = ""
-            try:
-                body_text = page.inner_text("body") or ""
-            except Exception:
-                body_text = ""
-
-            if any(x in body_text.lower() for x in ["out of stock", "sold out", "currently unavailable", "not available"]):
-                details["in_stock"] = False
-                details["availability"] = "Out of stock"
-            else:
-                add_cart_selectors = [
-                    "//button[contains(translate(., 'abcdefghijklmnopqrstuvwxyz','ABCDEFGHIJKLMNOPQRSTUVWXYZ'), 'ADD TO CART')]",
-                    "//button[contains(translate(., 'abcdefghijklmnopqrstuvwxyz','ABCDEFGHIJKLMNOPQRSTUVWXYZ'), 'BUY NOW')]",
-                    "button[class*='add-to-cart'], button[class*='buy-now'], button[id*='add'], button[id*='buy']"
-                ]
-                found = False
-                for sel in add_cart_selectors:
-                    try:
-                        if sel.startswith("//"):
-                            els = page.query_selector_all(f"xpath={sel}")
-                            if els and len(els) > 0:
-                                found = True
-                                break
-                        else:
-                            els = page.query_selector_all(sel)
-                            if els and len(els) > 0:
-                                found = True
-                                break
-                    except Exception:
-                        continue
-                details["in_stock"] = found
-                details["availability"] = "In stock" if found else details["availability"]
-        except Exception:
+            page.goto(collection_url, timeout=DEFAULT_TIMEOUT)
+        except PlaywrightTimeoutError:
             pass
-
-        # Delivery info
-        try:
-            delivery_txts = []
-            try:
-                delivery_txts = page.evaluate(r"""
-                    () => {
-                        const out = [];
-                        const nodes = Array.from(document.querySelectorAll('*'));
-                        for (const n of nodes) {
-                            try {
-                                const t = (n.innerText || '').trim();
-                                if (!t) continue;
-                                if (/delivery|delivered by|get it by|arrive|dispatch/i.test(t) && t.length < 250) out.push(t);
-                            } catch(e){}
-                        }
-                        return out.slice(0, 20);
-                    }
-                """)
-            except Exception:
-                delivery_txts = []
-
-            if delivery_txts:
-                details["delivery_info"] = delivery_txts[0]
-                try:
-                    m = re.search(r'\b\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\b.*\d{4}?', delivery_txts[0], re.I)
-                    if m:
-                        details["delivery_date"] = m.group(0)
-                except Exception:
-                    pass
         except Exception:
             pass
+        safe_wait_for_selector(page, PRODUCT_CARD_SELECTOR, timeout=6000)
+        scroll_to_load(page, max_candidates)
 
-        # EMI availability
-        try:
-            emi_text = ""
-            try:
-                emi_text = page.inner_text("body") or ""
-            except Exception:
-                emi_text = ""
-            details["emi_available"] = 'emi' in emi_text.lower() or 'easy emi' in emi_text.lower()
-        except Exception:
-            pass
+    check_cancelled()
+    raw_products = extract_products_from_search_page(page)
+    if not raw_products:
+        return None
 
-        # Warranty
+    # Normalize and sort by price. Items without price become very large.
+    normalized = []
+    for prod in raw_products:
         try:
-            warranty_txts = []
-            try:
-                warranty_txts = page.evaluate(r"""
-                    () => {
-                        const out = [];
-                        const nodes = Array.from(document.querySelectorAll('*'));
-                        for (const n of nodes) {
-                            try {
-                                const t = (n.innerText || '').trim();
-                                if (!t) continue;
-                                if (/warranty/i.test(t) && t.length < 200) out.push(t);
-                            } catch(e){}
-                        }
-                        return out.slice(0, 20);
-                    }
-                """)
-            except Exception:
-                warranty_txts = []
-
-            if warranty_txts:
-                details["warranty"] = warranty_txts[0]
+            price_val = clean_price_text(prod.get("price_text", "") or "")
         except Exception:
-            pass
-
-        # Description fallback
-        if not details["description"]:
-            try:
-                desc_candidates = []
-                try:
-                    desc_candidates = page.query_selector_all("div[class*='description'], div[class*='product-desc'], #product-description, .productDetails, .pdp-description")
-                except Exception:
-                    desc_candidates = []
-                for d in desc_candidates:
-                    try:
-                        txt = d.inner_text().strip()
-                        if txt and len(txt) > 40:
-                            details["description"] = txt
-                            break
-                    except Exception:
-                        continue
-            except Exception:
-                pass
-
-        # Features
+            price_val = 0
+        normalized.append({
+            "url": prod.get("url", ""),
+            "title": prod.get("title", "") or "",
+            "price": price_val if price_val > 0 else 10**10,
+            "image": prod.get("image", PLACEHOLDER_IMAGE)
+        })
+
+    normalized = sorted(normalized, key=lambda x: x["price"])
+    accessory_keywords = ['case', 'cover', 'charger', 'cable', 'adapter', 'screen guard', 'protector', 'stand']
+    filtered = [it for it in normalized if not any(k in (it.get('title') or '').lower() for k in accessory_keywords)]
+    candidates = filtered if filtered else normalized
+
+    # Load the next few candidates in parallel pages of this context
+    priced = [c for c in candidates[:max_candidates] if c["price"] < 10**10]
+
+    def fetch(product_page, candidate):
         try:
-            features = []
-            try:
-                feat_nodes = page.query_selector_all("ul[class*='features'] li, .highlights li, .feature-list li, .product-highlights li")
-            except Exception:
-                feat_nodes = []
-            for f in feat_nodes[:20]:
-                try:
-                    txt = f.inner_text().strip()
-                    if txt and len(txt) > 4:
-                        features.append(txt)
-                except Exception:
-                    continue
-            if features:
-                details["features"] = features
+            return get_product_details(product_page, candidate["url"], pincode, navigate=False)
         except Exception:
-            pass
-
-        # Specifications
-        try:
-            spec: Dict[str, str] = {}
-            try:
-                trs = page.query_selector_all("table.specs tr, table[class*='spec'] tr, .specification tr")
-            except Exception:
-                trs = []
-            for tr in trs[:40]:
-                try:
-                    tds = tr.query_selector_all("td, th")
-                    if len(tds) >= 2:
-                        k = tds[0].inner_text().strip()
-                        v = tds[1].inner_text().strip()
-                        if k and v:
-                            spec[k] = v
-                except Exception:
-                    continue
+            return None
 
-            if not spec:
-                try:
-                    items = page.query_selector_all(".specification li, .specs li, .product-specs li")
-                except Exception:
-                    items = []
-                for it in items[:60]:
-                    try:
-                        txt = it.inner_text().strip()
-                        if ':' in txt:
-                            k, v = txt.split(':', 1)
-                            spec[k.strip()] = v.strip()
-                    except Exception:
-                        continue
+    def accept(details):
+        return bool(details and isinstance(details.get("price", 0), int) and details.get("price", 0) >= VALID_PRICE_MIN)
 
-            if spec:
-                details["specifications"] = spec
-        except Exception:
-            pass
+    page.close()
+    if preview:
+        first = next((c for c in priced if c["price"] >= VALID_PRICE_MIN), None)
+        return listing_offer(make_empty_details(first["url"]), first["title"], first["price"], first["image"]) if first else None
 
-        # Final adjustments
-        details["url"] = product_url
+    candidate, details = first_valid_in_pages(context, priced, fetch, accept, detail_fanout("reliance"))
+    if details:
+        if not details.get("image") or details["image"] == PLACEHOLDER_IMAGE:
+            details["image"] = candidate.get("image", PLACEHOLDER_IMAGE)
         return details
 
-    except Exception:
-        # Return None on a page-level failure
-        return None
+    # Fallback
+    if normalized:
+        first = normalized[0]
+        fallback = make_empty_details(first["url"])
+        fallback.update({
+            "title": first.get("title", "") or "",
+            "price": first.get("price", 0) if first.get("price", 0) < 10**10 else 0,
+            "image": first.get("image", PLACEHOLDER_IMAGE),
+            "in_stock": True
+        })
+        return fallback
 
+    return None
 
-# ---------- Main scraper (Playwright) ----------
-def scrape_reliance_digital_playwright(query: str, pincode: Optional[str] = None, headless: bool = True, max_candidates: int = 30) -> Optional[Dict[str, Any]]:
+
+def scrape_reliance_digital_playwright(query: str, pincode: Optional[str] = None, headless: bool = True, max_candidates: int = 30,
+                                       preview: bool = False) -> Optional[Dict[str, Any]]:
     """
     Uses Playwright to search Reliance Digital and return the best (lowest-priced) product's details.
+    With preview=True only the search page is read (see _scrape_in_context).
     """
     try:
-        with sync_playwright() as pw:
-            browser = pw.chromium.launch(headless=headless)
-            try:
-                context = browser.new_context(
-                    user_agent=("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                                "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"),
-                    locale="en-IN",
-                    viewport={"width": 1920, "height": 1080},
-                )
-            except Exception:
-                context = browser.new_context()
-
-            page = context.new_page()
-
-            query_clean = (query or "").strip()
-            q_param = quote_plus(query_clean)
-            search_url = f"https://www.reliancedigital.in/products?q={q_param}"
-
-            try:
-                page.goto(search_url, timeout=DEFAULT_TIMEOUT)
-            except PlaywrightTimeoutError:
-                # proceed even if navigation times out
-                pass
-            except Exception:
-                pass
-
-            safe_wait_for_selector(page, "body", timeout=6000)
-            time.sleep(1.2)
-            scroll_to_load(page, max_scrolls=MAX_SCROLLS, pause=0.8)
-
-            try:
-                body_text = page.inner_text("body") or ""
-            except Exception:
-                body_text = ""
-
-            if len(body_text.strip()) < 200 or any(x in body_text.lower() for x in ["page was not found", "oops", "no results found"]):
-                category = query_clean.lower().replace(' ', '-')
-                collection_url = f"https://www.reliancedigital.in/collection/{category}"
-                try:
-                    page.goto(collection_url, timeout=DEFAULT_TIMEOUT)
-                except PlaywrightTimeoutError:
-                    pass
-                except Exception:
-                    pass
-                safe_wait_for_selector(page, "body", timeout=6000)
-                time.sleep(1.2)
-                scroll_to_load(page, max_scrolls=MAX_SCROLLS, pause=0.8)
+        return run_in_context(
+            lambda context: _scrape_in_context(context, query, pincode, max_candidates, preview),
+            headless=headless,
+            context_options=CONTEXT_OPTIONS,
+            site="reliance",
+        )
+    except Exception as e:
+        # Top-level failure
+        # print(f"scrape_reliance_digital_playwright error: {e}")
+        return None
 
-            raw_products = extract_products_from_search_page(page)
-            if not raw_products:
-                try:
-                    browser.close()
-                except Exception:
-                    pass
-                return None
 
-            # Normalize and sort by price. Items without price become very large.
-            normalized = []
-            for prod in raw_products:
-                try:
-                    price_val = clean_price_text(prod.get("price_text", "") or "")
-                except Exception:
-                    price_val = 0
-                normalized.append({
-                    "url": prod.get("url", ""),
-                    "title": prod.get("title", "") or "",
-                    "price": price_val if price_val > 0 else 10**10,
-                    "image": prod.get("image", PLACEHOLDER_IMAGE)
-                })
-
-            normalized = sorted(normalized, key=lambda x: x["price"])
-            accessory_keywords = ['case', 'cover', 'charger', 'cable', 'adapter', 'screen guard', 'protector', 'stand']
-            filtered = [it for it in normalized if not any(k in (it.get('title') or '').lower() for k in accessory_keywords)]
-            candidates = filtered if filtered else normalized
-
-            checks = 0
-            for candidate in candidates:
-                if checks >= max_candidates:
-                    break
-                checks += 1
-                if candidate["price"] >= 10**10:
-                    continue
-                try:
-                    details = get_product_details(page, candidate["url"], pincode)
-                except Exception:
-                    details = None
-                if details and isinstance(details.get("price", 0), int) and details.get("price", 0) >= VALID_PRICE_MIN:
-                    if not details.get("image") or details["image"] == PLACEHOLDER_IMAGE:
-                        details["image"] = candidate.get("image", PLACEHOLDER_IMAGE)
-                    try:
-                        browser.close()
-                    except Exception:
-                        pass
-                    return details
-                time.sleep(0.4)
-
-            # Fallback
-            if normalized:
-                first = normalized[0]
-                fallback = make_empty_details(first["url"])
-                fallback.update({
-                    "title": first.get("title", "") or "",
-                    "price": first.get("price", 0) if first.get("price", 0) < 10**10 else 0,
-                    "image": first.get("image", PLACEHOLDER_IMAGE),
-                    "in_stock": True
-                })
-                try:
-                    browser.close()
-                except Exception:
-                    pass
-                return fallback
+def _product_in_context(context, product_url: str, pincode: Optional[str]) -> Optional[Dict[str, Any]]:
+    page = context.new_page()
+    try:
+        with measure_detail():
+            details = get_product_details(page, product_url, pincode)
+    finally:
+        page.close()
+    return details if details and details.get("price", 0) >= VALID_PRICE_MIN else None
 
-            try:
-                browser.close()
-            except Exception:
-                pass
-            return None
 
-    except Exception as e:
-        # Top-level failure
-        # print(f"scrape_reliance_digital_playwright error: {e}")
+def scrape_reliance_digital_product(product_url: str, pincode: Optional[str] = None,
+                                    headless: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Full details for one product URL (used to enrich a preview offer).
+    """
+    try:
+        return run_in_context(
+            lambda context: _product_in_context(context, product_url, pincode),
+            headless=headless,
+            context_options=CONTEXT_OPTIONS,
+            site="reliance",
+        )
+    except Exception:
         return None
 
 
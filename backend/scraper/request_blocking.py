@@ -0,0 +1,191 @@
+"""
+Per-site request blocking for scraper browsers.
+
+Scrapers only read text and attribute values, so images, fonts, media and
+third-party analytics are downloaded for nothing. Each site gets a policy of
+resource types to drop, plus tracker host patterns:
+
+    - Selenium: CDP Network.setBlockedURLs with URL patterns, applied once per
+      pooled driver. Blocked requests are counted from Chrome's performance log.
+    - Playwright: context.route() aborts requests by resource type / host.
+
+Image URLs stay in the DOM (src attributes are still read for results); only
+the downloads are skipped. Configure with SCRAPER_BLOCK_RESOURCES=false to
+disable, or SCRAPER_BLOCK_<SITE>="image,font,media,tracker" per site.
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from scraper.scrape_context import current_context
+
+# ---------- Config ----------
+BLOCKING_ENABLED = os.getenv("SCRAPER_BLOCK_RESOURCES", "true").lower() == "true"
+
+DEFAULT_BLOCKED_TYPES = {"image", "font", "media", "tracker"}
+
+# Sites whose prices render fine without images/fonts/media. Stylesheets are
+# never blocked: several scrapers rely on is_displayed() and layout-driven
+# lazy loading.
+SITE_BLOCKED_TYPES: Dict[str, Set[str]] = {
+    "amazon": DEFAULT_BLOCKED_TYPES,
+    "flipkart": DEFAULT_BLOCKED_TYPES,
+    "snapdeal": DEFAULT_BLOCKED_TYPES,
+    "croma": DEFAULT_BLOCKED_TYPES,
+    "ajio": DEFAULT_BLOCKED_TYPES,
+    "reliance": DEFAULT_BLOCKED_TYPES,
+}
+
+# URL patterns for Network.setBlockedURLs ('*' wildcard), by resource type
+URL_PATTERNS = {
+    "image": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.ico*", "*.bmp*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.ogg*", "*.mov*"],
+}
+
+TRACKER_HOSTS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googleadservices.com",
+    "googlesyndication.com", "facebook.net", "connect.facebook.com", "hotjar.com", "clarity.ms",
+    "criteo.com", "criteo.net", "moengage.com", "clevertap", "branch.io", "appsflyer.com",
+    "newrelic.com", "nr-data.net", "segment.io", "mixpanel.com", "taboola.com", "outbrain.com",
+    "amazon-adsystem.com", "scorecardresearch.com", "webengage.com", "bing.com/bat", "quantserve.com",
+]
+
+# Rough average transfer sizes used to estimate bytes saved
+ESTIMATED_BYTES = {
+    "image": 45_000,
+    "font": 35_000,
+    "media": 400_000,
+    "tracker": 25_000,
+}
+
+# Playwright resource types mapped onto policy types
+PLAYWRIGHT_TYPES = {"image": "image", "font": "font", "media": "media"}
+
+_stats_lock = threading.Lock()
+_site_stats: Dict[str, Dict[str, int]] = {}
+
+
+def blocked_types(site: str) -> Set[str]:
+    """Resource types blocked for a site (empty when blocking is disabled)."""
+    if not BLOCKING_ENABLED:
+        return set()
+    override = os.getenv(f"SCRAPER_BLOCK_{site.upper()}")
+    if override is not None:
+        return {t.strip() for t in override.split(",") if t.strip()}
+    return set(SITE_BLOCKED_TYPES.get(site, DEFAULT_BLOCKED_TYPES))
+
+
+def blocked_url_patterns(site: str) -> List[str]:
+    types = blocked_types(site)
+    patterns = [p for t in types for p in URL_PATTERNS.get(t, [])]
+    if "tracker" in types:
+        patterns += [f"*{host}*" for host in TRACKER_HOSTS]
+    return patterns
+
+
+def is_tracker(url: str) -> bool:
+    return any(host in url for host in TRACKER_HOSTS)
+
+
+def _classify(url: str, resource_type: str = "") -> str:
+    if is_tracker(url):
+        return "tracker"
+    resource_type = resource_type.lower()
+    if resource_type in ESTIMATED_BYTES:
+        return resource_type
+    lowered = url.lower().split("?")[0]
+    for kind, patterns in URL_PATTERNS.items():
+        if any(lowered.endswith(p.strip("*")) for p in patterns):
+            return kind
+    return "tracker"
+
+
+def record_blocked(site: str, kinds: Iterable[str], ctx=None):
+    """Add blocked requests to a scrape's metrics (default: the current one) and the process totals."""
+    kinds = list(kinds)
+    if not kinds:
+        return
+    estimated = sum(ESTIMATED_BYTES.get(kind, 0) for kind in kinds)
+    ctx = ctx or current_context()
+    if ctx is not None:
+        ctx.metrics["blocked_requests"] = ctx.metrics.get("blocked_requests", 0) + len(kinds)
+        ctx.metrics["blocked_bytes_est"] = ctx.metrics.get("blocked_bytes_est", 0) + estimated
+    with _stats_lock:
+        stats = _site_stats.setdefault(site, {"blocked_requests": 0, "blocked_bytes_est": 0})
+        stats["blocked_requests"] += len(kinds)
+        stats["blocked_bytes_est"] += estimated
+
+
+def snapshot() -> Dict[str, Any]:
+    with _stats_lock:
+        return {"enabled": BLOCKING_ENABLED, "sites": {site: dict(v) for site, v in _site_stats.items()}}
+
+
+# ---------- Selenium ----------
+def apply_selenium_policy(driver, site: str) -> bool:
+    """Install the site's URL block list on a Chrome driver; True if anything is blocked."""
+    patterns = blocked_url_patterns(site)
+    if not patterns:
+        return False
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not enable request blocking for {site}: {e}")
+        return False
+
+
+def drain_performance_log(driver) -> List[dict]:
+    """Read (and thereby clear) Chrome's performance log; [] if logging is off."""
+    try:
+        return driver.get_log("performance")
+    except Exception:
+        return []
+
+
+def record_selenium_blocked(driver, site: str):
+    """Count requests blocked since the last drain from the performance log."""
+    requests: Dict[str, tuple] = {}
+    kinds = []
+    for entry in drain_performance_log(driver):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError, TypeError):
+            continue
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            requests[params.get("requestId")] = (params.get("request", {}).get("url", ""), params.get("type", ""))
+        elif method == "Network.loadingFailed" and params.get("blockedReason") == "inspector":
+            url, resource_type = requests.get(params.get("requestId"), ("", params.get("type", "")))
+            kinds.append(_classify(url, resource_type))
+    record_blocked(site, kinds)
+
+
+# ---------- Playwright ----------
+def apply_playwright_policy(context, site: str) -> bool:
+    """Abort blocked resource types / tracker hosts for every page in a BrowserContext."""
+    types = blocked_types(site)
+    if not types:
+        return False
+    ctx = current_context()
+
+    def handle(route):
+        request = route.request
+        kind: Optional[str] = None
+        if "tracker" in types and is_tracker(request.url):
+            kind = "tracker"
+        elif PLAYWRIGHT_TYPES.get(request.resource_type) in types:
+            kind = PLAYWRIGHT_TYPES[request.resource_type]
+        if kind is None:
+            route.continue_()
+            return
+        route.abort()
+        # Route callbacks run outside the scraper's contextvars, so credit the captured scrape
+        record_blocked(site, [kind], ctx)
+
+    context.route("**/*", handle)
+    return True
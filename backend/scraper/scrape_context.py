@@ -0,0 +1,147 @@
+"""
+Per-scrape context shared between the price_fetcher orchestrator and the scrapers.
+
+The orchestrator creates one ScrapeContext per site run and installs it with
+use_context() on the thread that executes the scraper. Scrapers and the browser
+pools look it up with current_context() to:
+    - honour the site's deadline (remaining()),
+    - register cleanups that tear down their browser if the run is cancelled,
+    - stop cooperatively at safe points (check()),
+    - record how long they sat idle waiting on the page (record_idle()),
+    - time product-page work and count candidates (measure_detail()),
+    - count search page scrolls and the ones adaptive scrolling skipped (record_scrolls()).
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ScrapeCancelled(Exception):
+    """Raised inside a scraper once the orchestrator has given up on it."""
+
+
+class ScrapeContext:
+    def __init__(self, site: str, timeout: Optional[float] = None):
+        self.site = site
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + timeout if timeout else None
+        self._cancelled = threading.Event()
+        self._cleanups: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self.metrics: Dict[str, Any] = {"idle_seconds": 0.0, "waits": 0, "wait_timeouts": 0,
+                                        "detail_seconds": 0.0, "candidates": 0,
+                                        "scrolls": 0, "scrolls_saved": 0, "scroll_seconds_saved": 0.0}
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self, default: Optional[float] = None) -> Optional[float]:
+        """Seconds left before the deadline (never negative), or default if unbounded."""
+        if self.deadline is None:
+            return default
+        left = max(0.0, self.deadline - time.monotonic())
+        return min(left, default) if default is not None else left
+
+    def check(self):
+        if self.cancelled:
+            raise ScrapeCancelled(f"{self.site} scrape cancelled")
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.metrics["idle_seconds"] += seconds
+            self.metrics["waits"] += 1
+            if timed_out:
+                self.metrics["wait_timeouts"] += 1
+
+    def record_detail(self, seconds: float, candidates: int = 1):
+        with self._lock:
+            self.metrics["detail_seconds"] += seconds
+            self.metrics["candidates"] += candidates
+
+    def record_scrolls(self, scrolls: int, saved: int, seconds_saved: float):
+        with self._lock:
+            self.metrics["scrolls"] += scrolls
+            self.metrics["scrolls_saved"] += saved
+            self.metrics["scroll_seconds_saved"] += seconds_saved
+
+    def add_cleanup(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Register fn to run on cancel(); runs immediately if already cancelled."""
+        with self._lock:
+            if not self.cancelled:
+                self._cleanups.append(fn)
+                return fn
+        self._run_cleanup(fn)
+        return fn
+
+    def remove_cleanup(self, fn: Callable[[], None]):
+        with self._lock:
+            if fn in self._cleanups:
+                self._cleanups.remove(fn)
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self._cancelled.set()
+            cleanups, self._cleanups = self._cleanups, []
+        for fn in cleanups:
+            self._run_cleanup(fn)
+
+    @staticmethod
+    def _run_cleanup(fn: Callable[[], None]):
+        try:
+            fn()
+        except Exception:
+            pass
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("scrape_context", default=None)
+
+
+def current_context() -> Optional[ScrapeContext]:
+    return _current.get()
+
+
+@contextmanager
+def use_context(ctx: ScrapeContext):
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
+
+
+def check_cancelled():
+    """Raise ScrapeCancelled if the current scrape has been cancelled."""
+    ctx = current_context()
+    if ctx is not None:
+        ctx.check()
+
+
+def record_idle(seconds: float, timed_out: bool = False):
+    """Add time spent waiting on the page to the current scrape's metrics."""
+    ctx = current_context()
+    if ctx is not None:
+        ctx.record_wait(seconds, timed_out)
+
+
+def record_scrolls(scrolls: int, saved: int, seconds_saved: float):
+    """Add a search page's scrolls, and those skipped against its fixed budget, to the current scrape."""
+    ctx = current_context()
+    if ctx is not None:
+        ctx.record_scrolls(scrolls, saved, seconds_saved)
+
+
+@contextmanager
+def measure_detail(candidates: int = 1):
+    """Time a block spent on candidate product pages; the rest of a run counts as search time."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        ctx = current_context()
+        if ctx is not None:
+            ctx.record_detail(time.monotonic() - start, candidates)
@@ -0,0 +1,37 @@
+"""
+Base URLs of the scraped sites.
+
+Every scraper builds its search and product URLs through site_url(), so a site
+can be pointed somewhere else with SCRAPER_BASE_URL_<SITE>, e.g. the local
+fixture-replay server used by benchmarks/bench_scrapers.py:
+
+    SCRAPER_BASE_URL_CROMA=http://127.0.0.1:8431
+
+The variables are read on every call, so they can be changed at runtime.
+"""
+import os
+from urllib.parse import urlparse
+
+DEFAULT_BASE_URLS = {
+    "amazon": "https://www.amazon.in",
+    "flipkart": "https://www.flipkart.com",
+    "snapdeal": "https://www.snapdeal.com",
+    "croma": "https://www.croma.com",
+    "reliance": "https://www.reliancedigital.in",
+    "ajio": "https://www.ajio.com",
+}
+
+
+def base_url(site: str) -> str:
+    return os.getenv(f"SCRAPER_BASE_URL_{site.upper()}", DEFAULT_BASE_URLS[site]).rstrip("/")
+
+
+def site_url(site: str, path: str) -> str:
+    """Absolute URL for a site-relative path ("/s?k=...")."""
+    return base_url(site) + path
+
+
+def site_host(site: str) -> str:
+    """Host used to recognise the site's own links ("reliancedigital.in", "127.0.0.1:8431")."""
+    host = urlparse(base_url(site)).netloc
+    return host[4:] if host.startswith("www.") else host
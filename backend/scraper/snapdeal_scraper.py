@@ -3,19 +3,19 @@ Perfect Snapdeal Scraper 2025 - Enhanced with complete details extraction
 Returns comprehensive product information with accurate pricing and delivery
 """
 import re
-import time
-import tempfile
-import os
-import shutil
 from typing import Optional, Dict, Any, List
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from webdriver_manager.chrome import ChromeDriverManager
+
+from scraper.common_utils import (
+    count_tiles, first_valid_in_tabs, listing_offer, make_empty_details, scroll_until_loaded, wait_for_network_idle, wait_for_selector, wait_until,
+)
+from scraper.driver_pool import lease_driver
+from scraper.extraction import SNAPDEAL_PRODUCT, parse_html
+from scraper.location_sessions import ensure_location, preload_location
+from scraper.scrape_context import measure_detail
+from scraper.site_urls import site_url
+from scraper.structured_data import apply_fast_path
 
 PLACEHOLDER_IMAGE = "https://placehold.co/300x400/EEE/31343C?text=No+Image"
 
@@ -28,57 +28,22 @@ def clean_price_text(price_text: str) -> int:
         return int(m.group(0).replace(',', ''))
     return 0
 
-def setup_driver(headless=True):
-    """Setup Chrome driver with unique user data directory."""
-    chrome_options = Options()
-    
-    temp_dir = tempfile.mkdtemp(prefix="chrome_snapdeal_")
-    chrome_options.add_argument(f"--user-data-dir={temp_dir}")
-    
-    if headless:
-        chrome_options.add_argument('--headless=new')
-    
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-    chrome_options.add_argument('--window-size=1920,1080')
-    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36')
-    
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    chrome_options.add_experimental_option("prefs", {
-        "profile.default_content_setting_values.notifications": 2
-    })
-    
-    driver = webdriver.Chrome(
-        service=Service(ChromeDriverManager().install()), 
-        options=chrome_options
-    )
-    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-    driver.temp_dir = temp_dir
-    
-    return driver
-
 def enter_pincode_snapdeal(driver, pincode: str):
     """Enter pincode on Snapdeal product page with multiple strategies."""
     print(f"   📍 Setting pincode to {pincode}...")
-    time.sleep(2)
     
     # Strategy 1: Direct input field
     try:
-        pincode_input = WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.ID, "pincode"))
-        )
-        if pincode_input.is_displayed():
+        pincode_input = wait_for_selector(driver, "#pincode", timeout=5)
+        if pincode_input and pincode_input.is_displayed():
             pincode_input.clear()
             pincode_input.send_keys(pincode)
-            time.sleep(1)
             
             try:
                 check_btn = driver.find_element(By.ID, "checkServiceability")
                 check_btn.click()
                 print(f"   ✓ Pincode set successfully")
-                time.sleep(3)
+                wait_for_network_idle(driver, timeout=5)
                 return True
             except:
                 pass
@@ -95,13 +60,12 @@ def enter_pincode_snapdeal(driver, pincode: str):
                 input.dispatchEvent(new Event('change', {{ bubbles: true }}));
             }}
         """)
-        time.sleep(1)
         driver.execute_script("""
             var btn = document.getElementById('checkServiceability');
             if(btn) btn.click();
         """)
         print(f"   ✓ Pincode set via JavaScript")
-        time.sleep(4)
+        wait_for_network_idle(driver, timeout=5)
         return True
     except:
         pass
@@ -114,19 +78,18 @@ def enter_pincode_snapdeal(driver, pincode: str):
             try:
                 if elem.is_displayed():
                     driver.execute_script("arguments[0].scrollIntoView(true);", elem)
-                    time.sleep(1)
                     elem.click()
-                    time.sleep(2)
                     
-                    pincode_input = driver.find_element(By.ID, "pincode")
+                    pincode_input = wait_for_selector(driver, "#pincode", timeout=3, visible=True)
+                    if not pincode_input:
+                        continue
                     pincode_input.clear()
                     pincode_input.send_keys(pincode)
-                    time.sleep(1)
                     
                     check_btn = driver.find_element(By.ID, "checkServiceability")
                     check_btn.click()
                     print(f"   ✓ Pincode set after clicking delivery section")
-                    time.sleep(4)
+                    wait_for_network_idle(driver, timeout=5)
                     return True
             except:
                 continue
@@ -136,18 +99,14 @@ def enter_pincode_snapdeal(driver, pincode: str):
     print("   ⚠️  Could not set pincode")
     return False
 
-def extract_delivery_info(driver, pincode_entered=False):
-    """Extract delivery information with better formatting."""
+def parse_delivery_info(page_text: str, pincode_entered=False):
+    """Extract delivery information with better formatting from the visible page text."""
     delivery_info = {
         'delivery_date': None,
         'delivery_text': None
     }
     
-    time.sleep(2)
-    
     try:
-        page_text = driver.find_element(By.TAG_NAME, "body").text
-        
         # Pattern 1: "Delivery by DD Month" or "Delivered by DD Month"
         match = re.search(r'Deliver(?:ed|y) by\s+(\d{1,2}\s+\w{3,}(?:\s+\d{4})?)', page_text, re.IGNORECASE)
         if match:
@@ -196,342 +155,158 @@ def extract_delivery_info(driver, pincode_entered=False):
     
     return delivery_info
 
-def get_snapdeal_product_details(driver, product_url: str, pincode: str = None):
-    """Fetch comprehensive product details from Snapdeal product page."""
+def get_snapdeal_product_details(driver, product_url: str, pincode: str = None, navigate: bool = True):
+    """Product details from one snapshot of the page, parsed once with SNAPDEAL_PRODUCT.
+
+    Pass navigate=False when the page is already loading in the current tab.
+    """
     try:
-        driver.get(product_url)
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        time.sleep(3)
+        if navigate:
+            driver.get(product_url)
+        if not wait_for_selector(driver, "h1", timeout=15):
+            raise TimeoutException("Product page did not render a title")
         
-        details = {
-            "url": product_url,
-            "title": "",
-            "price": 0,
-            "original_price": 0,
-            "discount": "",
-            "rating": 0.0,
-            "review_count": 0,
-            "image": PLACEHOLDER_IMAGE,
-            "images": [],
-            "delivery_date": "",
-            "delivery_info": "",
-            "availability": "",
-            "brand": "",
-            "description": "",
-            "features": [],
-            "specifications": {},
-            "seller": "",
-            "in_stock": False,
-            "highlights": [],
-            "offers": []
-        }
+        details = make_snapdeal_details(product_url)
+
+        # JSON-LD / embedded state is enough when no location flow is needed
+        if apply_fast_path("snapdeal", details, parse_html(driver.page_source), pincode):
+            return details
         
         # Enter pincode if provided
         pincode_entered = False
         if pincode:
-            pincode_entered = enter_pincode_snapdeal(driver, pincode)
-            time.sleep(2)
-        
-        # ==================== TITLE ====================
-        title_selectors = [
-            "h1.pdp-e-i-head",
-            "h1[itemprop='name']",
-            "h1.product-title",
-            "h1.pdpTitle",
-            "h1"
-        ]
-        for selector in title_selectors:
-            try:
-                elem = driver.find_element(By.CSS_SELECTOR, selector)
-                title = elem.text.strip()
-                if title and len(title) > 10:
-                    details['title'] = title
-                    break
-            except:
-                continue
-        
-        # ==================== IMAGES ====================
-        try:
-            # Main image
-            image_selectors = [
-                "img.cloudzoom",
-                "img[itemprop='image']",
-                "img.product-image",
-                "img.pdpCarouselImg"
-            ]
-            for selector in image_selectors:
-                try:
-                    img = driver.find_element(By.CSS_SELECTOR, selector)
-                    src = img.get_attribute('src')
-                    if src:
-                        details['image'] = src
-                        break
-                except:
-                    continue
-            
-            # Additional images
-            img_elements = driver.find_elements(By.CSS_SELECTOR, 
-                "img.pdpCarouselImg, div.bx-viewport img, ul.bx-list img")
-            collected = []
-            for img in img_elements:
-                src = img.get_attribute('src') or img.get_attribute('data-src') or ""
-                if src and src.startswith('http') and src not in collected:
-                    collected.append(src)
-                if len(collected) >= 8:
-                    break
-            
-            if collected:
-                details['images'] = collected
-                if not details['image'] or details['image'] == PLACEHOLDER_IMAGE:
-                    details['image'] = collected[0]
-        except:
-            pass
-        
-        # ==================== PRICE ====================
-        price_selectors = [
-            "span.pdp-final-price",
-            "span.payBlkBig",
-            "span[itemprop='price']",
-            "span.lfloat.product-price",
-            "span.selling-price"
-        ]
-        for selector in price_selectors:
-            try:
-                elem = driver.find_element(By.CSS_SELECTOR, selector)
-                price_text = elem.text.strip()
-                price = clean_price_text(price_text)
-                if price > 0:
-                    details['price'] = price
-                    break
-            except:
-                continue
-        
-        # ==================== ORIGINAL PRICE ====================
-        mrp_selectors = [
-            "span.pdp-mrp",
-            "span.lfloat.markedPrice",
-            "span.strikedPriceText",
-            "span.list-price"
-        ]
-        for selector in mrp_selectors:
-            try:
-                elem = driver.find_element(By.CSS_SELECTOR, selector)
-                mrp_text = elem.text.strip()
-                original = clean_price_text(mrp_text)
-                if original > details['price']:
-                    details['original_price'] = original
-                    break
-            except:
-                continue
-        
-        # ==================== DISCOUNT ====================
-        discount_selectors = [
-            "span.percent-desc",
-            "div.percent-desc",
-            "span.pdp-discount",
-            "div.discount-badge"
-        ]
-        for selector in discount_selectors:
-            try:
-                elem = driver.find_element(By.CSS_SELECTOR, selector)
-                discount = elem.text.strip()
-                if discount and '%' in discount:
-                    details['discount'] = discount
-                    break
-            except:
-                continue
-        
-        # ==================== RATING ====================
-        rating_selectors = [
-            "span[itemprop='ratingValue']",
-            "span.avrg-rating",
-            "div.rating-value",
-            "span.filled-stars"
-        ]
-        for selector in rating_selectors:
-            try:
-                elem = driver.find_element(By.CSS_SELECTOR, selector)
-                rating_text = elem.text.strip()
-                match = re.search(r'(\d+\.?\d*)', rating_text)
-                if match:
-                    rating_val = float(match.group(1))
-                    if 0 <= rating_val <= 5:
-                        details['rating'] = rating_val
-                        break
-            except:
-                continue
-        
-        # ==================== REVIEW COUNT ====================
-        review_selectors = [
-            "span[itemprop='ratingCount']",
-            "span.total-rating",
-            "span.review-count",
-            "p.rating-count"
-        ]
-        for selector in review_selectors:
-            try:
-                elem = driver.find_element(By.CSS_SELECTOR, selector)
-                review_text = elem.text.strip()
-                match = re.search(r'(\d+)', review_text.replace(',', ''))
-                if match:
-                    details['review_count'] = int(match.group(1))
-                    break
-            except:
-                continue
-        
-        # ==================== DELIVERY INFO ====================
-        delivery_info = extract_delivery_info(driver, pincode_entered)
-        if delivery_info['delivery_date']:
-            details['delivery_date'] = delivery_info['delivery_date']
-            details['delivery_info'] = delivery_info['delivery_text']
-        else:
-            details['delivery_date'] = "Check on website"
-            details['delivery_info'] = "Enter pincode on website for delivery details"
-        
-        # ==================== STOCK STATUS ====================
-        try:
-            add_to_cart = driver.find_element(By.CSS_SELECTOR, 
-                "div#add-cart-button-id, button.buy-button, div.cart-button")
-            details['in_stock'] = add_to_cart.is_displayed() and add_to_cart.is_enabled()
-            details['availability'] = "In stock" if details['in_stock'] else "Out of stock"
-        except:
-            # Check for out of stock indicators
-            try:
-                oos = driver.find_elements(By.XPATH, 
-                    "//*[contains(text(), 'Out of Stock') or contains(text(), 'Sold Out')]")
-                details['in_stock'] = len(oos) == 0
-                details['availability'] = "In stock" if details['in_stock'] else "Out of stock"
-            except:
-                details['in_stock'] = False
-                details['availability'] = "Check website"
-        
-        # ==================== SELLER ====================
-        seller_selectors = [
-            "div.seller-name",
-            "a.seller-link",
-            "span[itemprop='seller']",
-            "div.sold-by"
-        ]
-        for selector in seller_selectors:
-            try:
-                elem = driver.find_element(By.CSS_SELECTOR, selector)
-                seller = elem.text.strip()
-                if seller and len(seller) < 100:
-                    details['seller'] = seller
-                    break
-            except:
-                continue
-        
-        # ==================== BRAND ====================
-        try:
-            brand_patterns = [
-                "//tr//td[contains(text(),'Brand')]/following-sibling::td",
-                "//div[contains(@class, 'spec')]//td[contains(text(),'Brand')]/following-sibling::td",
-                "//span[@itemprop='brand']",
-            ]
-            for xpath in brand_patterns:
-                try:
-                    elem = driver.find_element(By.XPATH, xpath)
-                    brand = elem.text.strip()
-                    if brand and len(brand) < 50:
-                        details['brand'] = brand
-                        break
-                except:
-                    continue
-        except:
-            pass
-        
-        # ==================== HIGHLIGHTS/FEATURES ====================
-        try:
-            highlight_elements = driver.find_elements(By.XPATH, 
-                "//div[contains(@class, 'key-features')]//li | " +
-                "//div[contains(@class, 'highlights')]//li | " +
-                "//ul[contains(@class, 'features')]//li"
-            )
-            
-            highlights = []
-            for elem in highlight_elements[:10]:
-                text = elem.text.strip()
-                if text and len(text) > 5 and len(text) < 300:
-                    highlights.append(text)
-            
-            if highlights:
-                details['highlights'] = highlights
-                details['features'] = highlights
-        except:
-            pass
-        
-        # ==================== SPECIFICATIONS ====================
-        try:
-            spec_dict = {}
-            spec_rows = driver.find_elements(By.XPATH, 
-                "//table[contains(@class, 'spec')]//tr | " +
-                "//div[contains(@class, 'specification')]//tr"
-            )
-            
-            for row in spec_rows[:20]:
-                try:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    if len(cells) >= 2:
-                        key = cells[0].text.strip()
-                        val = cells[1].text.strip()
-                        if key and val:
-                            spec_dict[key] = val
-                except:
-                    continue
-            
-            if spec_dict:
-                details['specifications'] = spec_dict
-        except:
-            pass
-        
-        # ==================== DESCRIPTION ====================
-        try:
-            desc_selectors = [
-                "div.product-desc-content",
-                "div[itemprop='description']",
-                "div.description-text",
-                "div.product-description p"
-            ]
-            
-            for selector in desc_selectors:
-                try:
-                    elem = driver.find_element(By.CSS_SELECTOR, selector)
-                    desc = elem.text.strip()
-                    if desc and len(desc) > 50:
-                        details['description'] = desc
-                        break
-                except:
-                    continue
-        except:
-            pass
-        
-        # ==================== OFFERS ====================
-        try:
-            offer_elements = driver.find_elements(By.XPATH, 
-                "//div[contains(@class, 'offer')]//li | " +
-                "//div[contains(@class, 'bank-offer')]"
-            )
-            
-            offers = []
-            for elem in offer_elements[:5]:
-                text = elem.text.strip()
-                if text and len(text) > 10 and len(text) < 200:
-                    offers.append(text)
-            
-            if offers:
-                details['offers'] = offers
-        except:
-            pass
-        
+            pincode_entered = ensure_location(driver, "snapdeal", pincode,
+                                              lambda: enter_pincode_snapdeal(driver, pincode))
+        
+        # Delivery estimates are rendered after the serviceability check returns,
+        # so the page is snapshotted once they are there
+        wait_until(
+            lambda: re.search(r'deliver|get it by', driver.find_element(By.TAG_NAME, "body").text, re.IGNORECASE),
+            timeout=3
+        )
+        details.update(parse_product_details(driver.page_source, product_url, pincode_entered))
         return details
         
     except Exception as e:
         print(f"   ❌ Error fetching details: {e}")
         return None
 
+def make_snapdeal_details(product_url: str) -> Dict[str, Any]:
+    return {**make_empty_details(product_url), "highlights": [], "offers": []}
+
+def parse_product_details(html, product_url: str, pincode_entered: bool = False) -> Dict[str, Any]:
+    """Map SNAPDEAL_PRODUCT fields onto the details dict; html may be page source or a parsed tree."""
+    fields = SNAPDEAL_PRODUCT.extract(html)
+    details = make_snapdeal_details(product_url)
+
+    # ==================== TITLE / IMAGES ====================
+    details['title'] = fields['title'] or ""
+    if fields['image']:
+        details['image'] = fields['image']
+    if fields['images']:
+        details['images'] = fields['images']
+        if details['image'] == PLACEHOLDER_IMAGE:
+            details['image'] = fields['images'][0]
+
+    # ==================== PRICE / ORIGINAL PRICE / DISCOUNT ====================
+    details['price'] = fields['price'] or 0
+    details['original_price'] = next((p for p in fields['original_price'] if p > details['price']), 0)
+    details['discount'] = fields['discount'] or ""
+
+    # ==================== RATING / REVIEW COUNT ====================
+    details['rating'] = fields['rating'] if fields['rating'] is not None else 0.0
+    details['review_count'] = fields['review_count'] or 0
+
+    # ==================== DELIVERY INFO ====================
+    delivery_info = parse_delivery_info(fields['body_text'], pincode_entered)
+    if delivery_info['delivery_date']:
+        details['delivery_date'] = delivery_info['delivery_date']
+        details['delivery_info'] = delivery_info['delivery_text']
+    else:
+        details['delivery_date'] = "Check on website"
+        details['delivery_info'] = "Enter pincode on website for delivery details"
+
+    # ==================== STOCK STATUS ====================
+    # The cart button decides when there is one, else out of stock indicators
+    if fields['add_to_cart'] is not None:
+        details['in_stock'] = fields['add_to_cart']
+    else:
+        details['in_stock'] = not fields['out_of_stock']
+    details['availability'] = "In stock" if details['in_stock'] else "Out of stock"
+
+    # ==================== SELLER / BRAND ====================
+    details['seller'] = fields['seller'] or ""
+    details['brand'] = fields['brand'] or ""
+
+    # ==================== HIGHLIGHTS / SPECIFICATIONS / DESCRIPTION / OFFERS ====================
+    details['highlights'] = fields['highlights']
+    details['features'] = fields['highlights']
+    details['specifications'] = fields['specifications']
+    details['description'] = fields['description'] or ""
+    details['offers'] = fields['offers']
+
+    return details
+
+# Product containers, first product link in each and the text of its price-like elements
+SEARCH_RESULTS_SCRIPT = """
+const xpath = "//div[contains(@class, 'col') and .//a[contains(@href, '/product/')]] | " +
+              "//div[contains(@class, 'product-tuple-listing') and .//a[contains(@href, '/product/')]]";
+const snapshot = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const text = el => (el.innerText || '').trim();
+const limit = Math.min(snapshot.snapshotLength, arguments[0]);
+const seen = new Set();
+const out = [];
+for (let i = 0; i < limit; i++) {
+    const container = snapshot.snapshotItem(i);
+    try {
+        const link = container.querySelector('a[href*="/product/"]');
+        const url = link ? link.href : '';
+        if (!url || seen.has(url)) continue;
+        seen.add(url);
+
+        let title = text(link);
+        if (title.length < 5) {
+            title = '';
+            for (const el of container.querySelectorAll('p.product-title, div.product-desc-rating p')) {
+                const t = text(el);
+                if (t && !t.includes('₹') && t.length > 10) { title = t; break; }
+            }
+        }
+
+        // Same candidates as .//*[contains(@class, 'product-price') or contains(text(), '₹') or contains(text(), 'Rs')]
+        const price_texts = [];
+        for (const el of container.querySelectorAll('*')) {
+            const own = Array.from(el.childNodes).filter(n => n.nodeType === 3).map(n => n.nodeValue).join('');
+            if ((el.getAttribute('class') || '').includes('product-price') || own.includes('₹') || own.includes('Rs')) {
+                price_texts.push(text(el));
+            }
+        }
+
+        const img = container.querySelector('img');
+        const image = img ? (img.getAttribute('src') || img.getAttribute('data-src') || '') : '';
+        out.push({url, title, price_texts, image: image.startsWith('http') ? image : ''});
+    } catch (e) {}
+}
+return out;
+"""
+
+def extract_products_from_search(driver, max_products: int = 40) -> List[Dict[str, Any]]:
+    """All search result cards in one execute_script call: [{url, title, price_texts, image}]."""
+    try:
+        items = driver.execute_script(SEARCH_RESULTS_SCRIPT, max_products) or []
+    except Exception as e:
+        print(f"   ⚠️ Search extraction error: {e}")
+        return []
+    return [
+        {
+            "url": item.get("url") or "",
+            "title": (item.get("title") or "").strip(),
+            "price_texts": [t for t in item.get("price_texts") or [] if t],
+            "image": item.get("image") or "",
+        }
+        for item in items if isinstance(item, dict) and item.get("url")
+    ]
+
 def is_accessory(title: str) -> bool:
     """Check if product is an accessory."""
     title_lower = (title or "").lower()
@@ -542,10 +317,20 @@ def is_accessory(title: str) -> bool:
     ]
     return any(k in title_lower for k in accessory_keywords)
 
+def scrape_snapdeal_product(product_url: str, pincode: str = None, headless: bool = True) -> Optional[Dict[str, Any]]:
+    """Complete details for one product URL (used to enrich a preview offer)."""
+    with lease_driver("snapdeal", headless=headless) as driver:
+        preload_location(driver, "snapdeal", pincode)
+        with measure_detail():
+            details = get_snapdeal_product_details(driver, product_url, pincode)
+    return details if details and details.get('price', 0) > 0 else None
+
 def scrape_snapdeal(query: str, pincode: str = None, headless: bool = True, 
-                    max_products: int = 40) -> Optional[Dict[str, Any]]:
-    """Scrape Snapdeal for best (lowest priced) product with complete details."""
-    driver = None
+                    max_products: int = 40, preview: bool = False) -> Optional[Dict[str, Any]]:
+    """Scrape Snapdeal for best (lowest priced) product with complete details.
+
+    With preview=True the cheapest listing is returned straight from the search page.
+    """
     try:
         print("\n" + "="*70)
         print("🛍️  PERFECT SNAPDEAL SCRAPER 2025")
@@ -555,143 +340,101 @@ def scrape_snapdeal(query: str, pincode: str = None, headless: bool = True,
             print(f"📍 Pincode: {pincode}")
         print()
         
-        driver = setup_driver(headless=headless)
+        with lease_driver("snapdeal", headless=headless) as driver:
+            preload_location(driver, "snapdeal", pincode)
         
-        search_url = f"https://www.snapdeal.com/search?keyword={query.replace(' ', '+')}"
-        print(f"🔍 Searching Snapdeal...\n")
+            search_url = site_url("snapdeal", f"/search?keyword={query.replace(' ', '+')}")
+            print(f"🔍 Searching Snapdeal...\n")
         
-        driver.get(search_url)
+            driver.get(search_url)
         
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        time.sleep(4)
-        
-        # Scroll to load products
-        for _ in range(3):
-            driver.execute_script("window.scrollBy(0, window.innerHeight * 0.7);")
-            time.sleep(1.5)
+            product_link = "a[href*='/product/']"
+            if not wait_for_selector(driver, product_link, timeout=15):
+                raise TimeoutException("Search results did not load")
         
-        products = []
-        seen_urls = set()
-        
-        # Find product containers
-        product_containers = driver.find_elements(By.XPATH, 
-            "//div[contains(@class, 'col') and .//a[contains(@href, '/product/')]] | " +
-            "//div[contains(@class, 'product-tuple-listing') and .//a[contains(@href, '/product/')]]"
-        )
+            # Scroll to load products, until max_products are listed or the listing stops growing
+            scroll_until_loaded(lambda: driver.execute_script("window.scrollBy(0, window.innerHeight * 0.7);"),
+                                lambda: count_tiles(driver, product_link), max_products, 3,
+                                timeout=2.5, settle=0.5)
         
-        print(f"📦 Found {len(product_containers)} product containers\n")
-        
-        for container in product_containers[:max_products]:
-            try:
-                # Get product link
-                link = container.find_element(By.XPATH, ".//a[contains(@href, '/product/')]")
-                href = link.get_attribute('href')
-                
-                if not href or href in seen_urls:
+            products = []
+            for item in extract_products_from_search(driver, max_products):
+                # Valid price: the first price-like text within bounds
+                price = next((p for p in map(clean_price_text, item["price_texts"]) if 50 < p < 10000000), 0)
+                if price <= 50:
                     continue
-                
-                seen_urls.add(href)
-                
-                # Get title
-                title = ""
-                try:
-                    title = link.text.strip()
-                    if not title or len(title) < 5:
-                        text_elems = container.find_elements(By.XPATH, 
-                            ".//p[@class='product-title'] | .//div[@class='product-desc-rating']//p")
-                        for elem in text_elems:
-                            text = elem.text.strip()
-                            if text and '₹' not in text and len(text) > 10:
-                                title = text
-                                break
-                except:
-                    pass
-                
-                # Get price
-                price = 0
-                try:
-                    price_elements = container.find_elements(By.XPATH, 
-                        ".//*[contains(@class, 'product-price') or contains(text(), '₹') or contains(text(), 'Rs')]")
-                    for price_elem in price_elements:
-                        price_text = price_elem.text.strip()
-                        temp_price = clean_price_text(price_text)
-                        if 50 < temp_price < 10000000:  # Valid price
-                            price = temp_price
-                            break
-                except:
-                    pass
-                
-                if price > 50:  # Valid product found
-                    if not title:
-                        title = f"Product at ₹{price}"
-                    
-                    products.append({
-                        "price": price,
-                        "url": href,
-                        "preview_title": title
-                    })
-                    print(f"   [{len(products)}] ₹{price:,} - {title[:55]}...")
-                    
-            except Exception:
-                continue
-        
-        if not products:
-            print("\n❌ No products found")
-            return None
-        
-        print(f"\n✓ Total products found: {len(products)}")
-        print(f"📊 Sorting by price...\n")
-        
-        # Remove duplicates and sort by price
-        unique_products = {p['url']: p for p in products}.values()
-        sorted_products = sorted(unique_products, key=lambda x: x['price'])
-        
-        # Filter out accessories
-        filtered = [p for p in sorted_products if not is_accessory(p['preview_title'])]
-        candidates = filtered if filtered else sorted_products
-        
-        print(f"🔍 Checking top products for best match...\n")
-        
-        # Get details of best products
-        for i, product in enumerate(candidates[:10]):
-            print(f"[{i+1}] Checking: ₹{product['price']:,} - {product['preview_title'][:55]}...")
-            
-            details = get_snapdeal_product_details(driver, product['url'], pincode)
-            
-            if details and details.get('price', 0) > 0:
+                title = item["title"] or f"Product at ₹{price}"
+                products.append({
+                    "price": price,
+                    "url": item["url"],
+                    "preview_title": title,
+                    "image": item["image"] or PLACEHOLDER_IMAGE
+                })
+                print(f"   [{len(products)}] ₹{price:,} - {title[:55]}...")
+        
+            if not products:
+                print("\n❌ No products found")
+                return None
+        
+            print(f"\n✓ Total products found: {len(products)}")
+            print(f"📊 Sorting by price...\n")
+        
+            # Remove duplicates and sort by price
+            unique_products = {p['url']: p for p in products}.values()
+            sorted_products = sorted(unique_products, key=lambda x: x['price'])
+        
+            # Filter out accessories
+            filtered = [p for p in sorted_products if not is_accessory(p['preview_title'])]
+            candidates = filtered if filtered else sorted_products
+
+            if preview:
+                first = candidates[0]
+                return listing_offer(make_snapdeal_details(first['url']),
+                                     first['preview_title'], first['price'], first['image'])
+        
+            print(f"🔍 Checking top products for best match...\n")
+        
+            # Get details of best products, loading the next few pages in parallel tabs
+            def fetch(driver, product):
+                print(f"Checking: ₹{product['price']:,} - {product['preview_title'][:55]}...")
+                details = get_snapdeal_product_details(driver, product['url'], pincode, navigate=False)
+                if not (details and details.get('price', 0) > 0):
+                    print(f"   ⚠️  Could not extract details\n")
+                return details
+
+            _, details = first_valid_in_tabs(
+                driver, "snapdeal", candidates[:10], fetch,
+                accept=lambda details: bool(details and details.get('price', 0) > 0),
+            )
+            if details:
                 print(f"   ✅ BEST MATCH FOUND!\n")
                 return details
-            else:
-                print(f"   ⚠️  Could not extract details\n")
-                time.sleep(0.5)
         
-        # Fallback: return first product with basic info
-        print("⚠️  Using fallback data from search results\n")
-        first = candidates[0]
-        return {
-            "url": first['url'],
-            "title": first['preview_title'],
-            "price": first['price'],
-            "original_price": 0,
-            "discount": "",
-            "rating": 0.0,
-            "review_count": 0,
-            "image": PLACEHOLDER_IMAGE,
-            "images": [],
-            "delivery_date": "Check website",
-            "delivery_info": "Check website for delivery details",
-            "availability": "Check website",
-            "brand": "",
-            "description": "",
-            "features": [],
-            "specifications": {},
-            "seller": "",
-            "in_stock": True,
-            "highlights": [],
-            "offers": []
-        }
+            # Fallback: return first product with basic info
+            print("⚠️  Using fallback data from search results\n")
+            first = candidates[0]
+            return {
+                "url": first['url'],
+                "title": first['preview_title'],
+                "price": first['price'],
+                "original_price": 0,
+                "discount": "",
+                "rating": 0.0,
+                "review_count": 0,
+                "image": first['image'],
+                "images": [],
+                "delivery_date": "Check website",
+                "delivery_info": "Check website for delivery details",
+                "availability": "Check website",
+                "brand": "",
+                "description": "",
+                "features": [],
+                "specifications": {},
+                "seller": "",
+                "in_stock": True,
+                "highlights": [],
+                "offers": []
+            }
         
     except TimeoutException:
         print("❌ Timeout: Page took too long to load")
@@ -699,17 +442,6 @@ def scrape_snapdeal(query: str, pincode: str = None, headless: bool = True,
     except Exception as e:
         print(f"❌ Scraping error: {e}")
         return None
-    
-    finally:
-        if driver:
-            try:
-                temp_dir = getattr(driver, 'temp_dir', None)
-                driver.quit()
-                if temp_dir and os.path.exists(temp_dir):
-                    time.sleep(0.5)
-                    shutil.rmtree(temp_dir, ignore_errors=True)
-            except:
-                pass
 
 def print_result(product: Optional[Dict[str, Any]]):
     """Pretty-print the comprehensive product result."""
@@ -0,0 +1,284 @@
+"""
+Structured product data embedded in product pages.
+
+Most product pages ship the data their DOM is rendered from:
+    - JSON-LD <script type="application/ld+json"> Product / Offer blocks
+    - the app's initial state (window.__INITIAL_STATE__, __PRELOADED_STATE__,
+      Next.js __NEXT_DATA__, ...)
+    - OpenGraph / product:price meta tags
+
+extract_structured() reads all of them in one pass over the raw HTML and maps
+them onto the make_empty_details() schema. Scrapers try it before walking the
+DOM and skip DOM scraping when every required field is present:
+
+    if apply_fast_path("snapdeal", details, driver.page_source, pincode):
+        return details
+
+Pages scraped with a pincode always go through the DOM, because delivery
+information only appears after the location flow. How often the fast path was
+enough is tracked per site (snapshot()).
+"""
+import json
+import re
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+from scraper.common_utils import clean_price_text
+from scraper.extraction import parse_html
+
+# ---------- Config ----------
+REQUIRED_FIELDS = ("title", "price", "image")
+
+STATE_ASSIGNMENTS = re.compile(
+    r"window\.(__INITIAL_STATE__|__PRELOADED_STATE__|__NEXT_DATA__|__APOLLO_STATE__|__INITIAL_DATA__)\s*=\s*"
+)
+
+# Keys used by the sites' embedded state for product fields
+STATE_TITLE_KEYS = ("productName", "title", "name", "displayName")
+STATE_PRICE_KEYS = ("sellingPrice", "finalPrice", "offerPrice", "specialPrice", "salePrice", "price")
+STATE_MRP_KEYS = ("mrp", "maximumRetailPrice", "listPrice", "originalPrice", "wasPrice")
+STATE_IMAGE_KEYS = ("imageUrl", "imageURL", "image", "images", "thumbnail")
+STATE_MAX_NODES = 50_000
+
+_stats_lock = threading.Lock()
+_site_stats: Dict[str, Dict[str, int]] = {}
+
+
+# ---------- Value helpers ----------
+def _price(value: Any) -> int:
+    if isinstance(value, bool) or value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, dict):
+        for key in ("value", "amount", "decimalValue", "price"):
+            if key in value:
+                return _price(value[key])
+        return 0
+    return clean_price_text(str(value))
+
+
+def _image(value: Any) -> str:
+    if isinstance(value, list):
+        return next((img for img in (_image(v) for v in value) if img), "")
+    if isinstance(value, dict):
+        return _image(value.get("url") or value.get("contentUrl") or value.get("src"))
+    if isinstance(value, str) and value.startswith(("http", "//")):
+        return "https:" + value if value.startswith("//") else value
+    return ""
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, dict):
+        value = value.get("name", "")
+    return " ".join(str(value).split()) if isinstance(value, (str, int, float)) else ""
+
+
+def _tokens(text: str):
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _same_product(title: str, page_title: str) -> bool:
+    """Loose title match, used to tell the page's product from recommendations in app state."""
+    a, b = _tokens(title), _tokens(page_title)
+    if not a or not b:
+        return False
+    return len(a & b) / min(len(a), len(b)) >= 0.6
+
+
+# ---------- JSON-LD ----------
+def _load_json(text: str) -> Any:
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        return None
+
+
+def _walk_ld(data: Any) -> Iterator[Dict[str, Any]]:
+    if isinstance(data, list):
+        for item in data:
+            yield from _walk_ld(item)
+    elif isinstance(data, dict):
+        yield data
+        if "@graph" in data:
+            yield from _walk_ld(data["@graph"])
+
+
+def _is_product(node: Dict[str, Any]) -> bool:
+    types = node.get("@type", "")
+    types = types if isinstance(types, list) else [types]
+    return any(str(t).lower() in ("product", "productgroup") for t in types)
+
+
+def _from_json_ld(product: Dict[str, Any]) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    data["title"] = _text(product.get("name"))
+    data["brand"] = _text(product.get("brand"))
+    data["description"] = _text(product.get("description"))
+    images = product.get("image")
+    if isinstance(images, list):
+        data["images"] = [img for img in (_image(i) for i in images) if img]
+    data["image"] = _image(images)
+
+    offers = product.get("offers") or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    if isinstance(offers, dict):
+        data["price"] = _price(offers.get("price") or offers.get("lowPrice"))
+        spec = offers.get("priceSpecification")
+        if isinstance(spec, dict):
+            data["original_price"] = _price(spec.get("price"))
+        availability = str(offers.get("availability", ""))
+        if availability:
+            data["in_stock"] = "instock" in availability.lower().replace("_", "")
+            data["availability"] = "In stock" if data["in_stock"] else "Out of stock"
+        elif data["price"]:
+            data["in_stock"] = True
+        data["seller"] = _text(offers.get("seller"))
+
+    rating = product.get("aggregateRating")
+    if isinstance(rating, dict):
+        try:
+            data["rating"] = float(rating.get("ratingValue") or 0)
+            data["review_count"] = int(float(rating.get("reviewCount") or rating.get("ratingCount") or 0))
+        except (TypeError, ValueError):
+            pass
+    return {k: v for k, v in data.items() if v not in ("", 0, 0.0, [], None) or k == "in_stock"}
+
+
+# ---------- Embedded app state ----------
+def _state_blobs(tree) -> Iterator[Any]:
+    for script in tree.xpath('//script[@id="__NEXT_DATA__"]/text()'):
+        data = _load_json(script)
+        if data is not None:
+            yield data
+    decoder = json.JSONDecoder(strict=False)
+    for script in tree.xpath("//script[not(@src)]/text()"):
+        for match in STATE_ASSIGNMENTS.finditer(script):
+            start = script.find("{", match.end())
+            if start == -1:
+                continue
+            try:
+                yield decoder.raw_decode(script, start)[0]
+            except ValueError:
+                continue
+
+
+def _state_title(node: Dict[str, Any]) -> str:
+    return next((_text(node[k]) for k in STATE_TITLE_KEYS if isinstance(node.get(k), str)), "")
+
+
+def _state_price(node: Dict[str, Any], keys) -> int:
+    return next((_price(node[k]) for k in keys if k in node and _price(node[k])), 0)
+
+
+def _state_products(blob: Any) -> Iterator[Dict[str, Any]]:
+    """Depth-first search for dicts with a title and a price, bounded in size."""
+    stack, seen = [blob], 0
+    while stack and seen < STATE_MAX_NODES:
+        node = stack.pop()
+        seen += 1
+        if isinstance(node, dict):
+            if _state_title(node) and _state_price(node, STATE_PRICE_KEYS):
+                yield node
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def _from_state(node: Dict[str, Any]) -> Dict[str, Any]:
+    data = {
+        "title": _state_title(node),
+        "price": _state_price(node, STATE_PRICE_KEYS),
+        "original_price": _state_price(node, STATE_MRP_KEYS),
+        "image": next((_image(node[k]) for k in STATE_IMAGE_KEYS if _image(node.get(k))), ""),
+        "brand": _text(node.get("brand")),
+    }
+    return {k: v for k, v in data.items() if v}
+
+
+# ---------- Public API ----------
+def extract_structured(page) -> Dict[str, Any]:
+    """Product fields found in a page's JSON-LD, embedded state and meta tags.
+
+    `page` is raw HTML or a tree from extraction.parse_html. Only fields that
+    were found are returned, using make_empty_details() key names.
+    """
+    tree = parse_html(page) if isinstance(page, str) else page
+    data: Dict[str, Any] = {}
+
+    for script in tree.xpath('//script[@type="application/ld+json"]/text()'):
+        for node in _walk_ld(_load_json(script)):
+            if _is_product(node):
+                data = _from_json_ld(node)
+                break
+        if data:
+            break
+
+    meta = {m.get("property") or m.get("name"): m.get("content")
+            for m in tree.xpath("//meta[@content][@property or @name]")}
+    page_title = data.get("title") or meta.get("og:title") or " ".join(tree.xpath("string(//h1)").split())
+
+    if not all(data.get(field) for field in REQUIRED_FIELDS) and page_title:
+        for blob in _state_blobs(tree):
+            node = next((n for n in _state_products(blob) if _same_product(_state_title(n), page_title)), None)
+            if node is not None:
+                for key, value in _from_state(node).items():
+                    data.setdefault(key, value)
+                break
+
+    if not data.get("image") and _image(meta.get("og:image")):
+        data["image"] = _image(meta["og:image"])
+    if not data.get("price"):
+        price = _price(meta.get("product:price:amount") or meta.get("og:price:amount"))
+        if price:
+            data["price"] = price
+    if data.get("price") and "in_stock" not in data:
+        data["in_stock"] = True
+    return data
+
+
+def is_complete(data: Dict[str, Any], required=REQUIRED_FIELDS) -> bool:
+    return all(data.get(field) for field in required)
+
+
+def record_fast_path(site: str, hit: bool):
+    with _stats_lock:
+        stats = _site_stats.setdefault(site, {"attempts": 0, "hits": 0})
+        stats["attempts"] += 1
+        stats["hits"] += int(hit)
+
+
+def apply_fast_path(site: str, details: Dict[str, Any], page, pincode: Optional[str] = None,
+                    fill_partial: bool = False) -> bool:
+    """Fill `details` from structured data when it covers every required field.
+
+    Returns True if the caller can skip DOM scraping. On a miss `details` is
+    left untouched (so DOM extraction output is unchanged) unless fill_partial
+    is set, for scrapers whose DOM fallbacks only fill empty fields.
+    """
+    if pincode and not fill_partial:
+        return False
+    try:
+        data = extract_structured(page)
+    except Exception as e:
+        print(f"⚠️ {site.capitalize()} structured data parse failed: {str(e)[:80]}")
+        data = {}
+    hit = is_complete(data) and not pincode
+    if not pincode:
+        record_fast_path(site, hit)
+    if hit or fill_partial:
+        for key, value in data.items():
+            if key in details:
+                details[key] = value
+    if hit:
+        print(f"⚡ {site.capitalize()}: product page served from structured data")
+    return hit
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    with _stats_lock:
+        return {
+            site: {**stats, "hit_rate": round(stats["hits"] / stats["attempts"], 3) if stats["attempts"] else 0.0}
+            for site, stats in _site_stats.items()
+        }
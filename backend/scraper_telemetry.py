@@ -0,0 +1,231 @@
+"""
+ShopThrone - Scraper Telemetry
+Per-run scraper records behind /api/admin/scrapers/status.
+
+Every site run reports its outcome, duration (excluding scheduler queue time),
+the candidates it inspected and how that time split between the search page
+and candidate product pages:
+
+    telemetry.record("croma", OUTCOME_OK, duration=7.4, search_seconds=2.1,
+                     detail_seconds=5.3, candidates=2, query="iphone 15")
+
+record() only appends to an in-memory buffer; a background thread writes the
+buffer to the scraper_runs table in batches every TELEMETRY_FLUSH_INTERVAL
+seconds (sooner once TELEMETRY_BATCH_SIZE runs are waiting). If the database
+is unavailable rows are kept for the next flush, up to TELEMETRY_MAX_BUFFER.
+A short per-site history is also kept in memory so stats still work without
+the database.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import dbop as crud
+from db import SessionLocal
+
+# ---------- Config ----------
+TELEMETRY_ENABLED = os.getenv("SCRAPER_TELEMETRY_ENABLED", "true").lower() == "true"
+FLUSH_INTERVAL = float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "10"))  # seconds
+BATCH_SIZE = int(os.getenv("TELEMETRY_BATCH_SIZE", "200"))
+MAX_BUFFER = int(os.getenv("TELEMETRY_MAX_BUFFER", "5000"))
+RECENT_RUNS = int(os.getenv("TELEMETRY_RECENT_RUNS", "500"))  # per site, in memory
+RETENTION_DAYS = int(os.getenv("TELEMETRY_RETENTION_DAYS", "30"))
+DEFAULT_WINDOW_HOURS = float(os.getenv("TELEMETRY_WINDOW_HOURS", "24"))
+
+OUTCOME_OK = "ok"
+OUTCOME_NO_RESULTS = "no_results"
+OUTCOME_IRRELEVANT = "irrelevant"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_EXCEPTION = "exception"
+OUTCOMES = (OUTCOME_OK, OUTCOME_NO_RESULTS, OUTCOME_IRRELEVANT, OUTCOME_TIMEOUT, OUTCOME_EXCEPTION)
+
+PURGE_INTERVAL = 3600  # seconds between retention purges
+
+
+class ScraperTelemetry:
+    """Buffered scraper run records with a background batch writer."""
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, batch_size: int = BATCH_SIZE,
+                 max_buffer: int = MAX_BUFFER):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self._buffer: List[Dict[str, Any]] = []
+        self._recent: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_purge = 0.0
+        self.stats = {"recorded": 0, "flushed": 0, "dropped": 0, "flush_errors": 0}
+
+    # ---------- Recording ----------
+    def record(self, site: str, outcome: str, duration: float, queued: float = 0.0,
+               search_seconds: float = 0.0, detail_seconds: float = 0.0, candidates: int = 0,
+               query: Optional[str] = None):
+        """Buffer one run; never blocks on the database"""
+        if not TELEMETRY_ENABLED:
+            return
+        row = {
+            "site": site,
+            "outcome": outcome,
+            "duration": round(duration, 3),
+            "queued": round(queued, 3),
+            "search_seconds": round(search_seconds, 3),
+            "detail_seconds": round(detail_seconds, 3),
+            "candidates": candidates,
+            "query": (query or "")[:200] or None,
+            "created_at": datetime.utcnow(),
+        }
+        with self._lock:
+            self._buffer.append(row)
+            self._trim_buffer()
+            self._recent.setdefault(site, deque(maxlen=RECENT_RUNS)).append(row)
+            self.stats["recorded"] += 1
+            full = len(self._buffer) >= self.batch_size
+        self._ensure_writer()
+        if full:
+            self._wake.set()
+
+    def _trim_buffer(self):
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.stats["dropped"] += overflow
+
+    # ---------- Background writer ----------
+    def _ensure_writer(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run_writer, name="scraper-telemetry", daemon=True)
+            self._thread.start()
+
+    def _run_writer(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered runs to the database; returns how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            db = SessionLocal()
+            try:
+                written = 0
+                for start in range(0, len(rows), self.batch_size):
+                    written += crud.bulk_insert_scraper_runs(db, rows[start:start + self.batch_size])
+                if time.monotonic() - self._last_purge > PURGE_INTERVAL:
+                    self._last_purge = time.monotonic()
+                    crud.purge_scraper_runs(db, datetime.utcnow() - timedelta(days=RETENTION_DAYS))
+            except Exception as e:
+                db.rollback()
+                with self._lock:
+                    # Keep the unwritten rows for the next attempt, oldest first
+                    self._buffer[:0] = rows[written:]
+                    self._trim_buffer()
+                    self.stats["flush_errors"] += 1
+                print(f"⚠️ Scraper telemetry flush failed: {str(e)}")
+                return written
+            finally:
+                db.close()
+
+            with self._lock:
+                self.stats["flushed"] += written
+            return written
+
+    # ---------- Stats ----------
+    def window_stats(self, hours: float = DEFAULT_WINDOW_HOURS, db=None) -> Dict[str, Dict[str, Any]]:
+        """Per-site success rate and latency percentiles over the last `hours`.
+
+        Served from the scraper_runs table (after flushing the buffer); falls
+        back to this process's in-memory history if the query fails.
+        """
+        since = datetime.utcnow() - timedelta(hours=hours)
+        self.flush()
+
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            raw = crud.get_scraper_run_stats(db, since)
+            source = "database"
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Scraper telemetry query failed, using in-memory stats: {str(e)}")
+            raw = self._memory_stats(since)
+            source = "memory"
+        finally:
+            if own_session:
+                db.close()
+
+        return {site: {**_summarize(values), "source": source} for site, values in raw.items()}
+
+    def _memory_stats(self, since: datetime) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            recent = {site: [r for r in runs if r["created_at"] >= since] for site, runs in self._recent.items()}
+
+        stats = {}
+        for site, runs in recent.items():
+            if not runs:
+                continue
+            durations = sorted(r["duration"] for r in runs)
+            outcomes: Dict[str, int] = {}
+            for r in runs:
+                outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+            stats[site] = {
+                "runs": len(runs),
+                "avg_duration": sum(durations) / len(durations),
+                "p50": _percentile(durations, 0.50),
+                "p95": _percentile(durations, 0.95),
+                "p99": _percentile(durations, 0.99),
+                "avg_search_seconds": sum(r["search_seconds"] for r in runs) / len(runs),
+                "avg_detail_seconds": sum(r["detail_seconds"] for r in runs) / len(runs),
+                "avg_candidates": sum(r["candidates"] for r in runs) / len(runs),
+                "outcomes": outcomes,
+            }
+        return stats
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": TELEMETRY_ENABLED,
+                "buffered": len(self._buffer),
+                "flush_interval": self.flush_interval,
+                **self.stats,
+            }
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _summarize(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Raw per-site aggregates -> the shape served by the admin endpoint"""
+    runs = values["runs"]
+    outcomes = {outcome: values["outcomes"].get(outcome, 0) for outcome in OUTCOMES}
+    return {
+        "runs": runs,
+        "success_rate": round(outcomes[OUTCOME_OK] / runs * 100, 1) if runs else 0.0,
+        "outcomes": outcomes,
+        "avg_response_time": round(values["avg_duration"], 2),
+        "p50": round(values["p50"], 2),
+        "p95": round(values["p95"], 2),
+        "p99": round(values["p99"], 2),
+        "avg_search_seconds": round(values["avg_search_seconds"], 2),
+        "avg_detail_seconds": round(values["avg_detail_seconds"], 2),
+        "avg_candidates": round(values["avg_candidates"], 1),
+    }
+
+
+telemetry = ScraperTelemetry()